@@ -9,14 +9,23 @@
 """
 
 import asyncio
-import httpx
-import pandas as pd
 import math
+import time
+import contextlib
+from collections import deque
+from typing import NamedTuple
 import sys
 import os
 import re
-import tkinter as tk
-from tkinter import filedialog
+
+import httpx
+
+from taxcrawl.store import PolicyStore, to_row
+from taxcrawl.export import export_excel
+from taxcrawl.importer import import_workbook
+from taxcrawl.sweep import apply_status
+from taxcrawl import profiling
+from taxcrawl.client import make_client
 
 # ========== 🟢 你的指挥中心 ==========
 
@@ -66,36 +75,43 @@ def parse_config(config, full_map):
     return []
 
 
-target_regions_list = parse_config(TARGET_REGIONS_CONFIG, REGION_MAP)
-target_categories_list = parse_config(TARGET_CATEGORIES_CONFIG, CATEGORY_MAP)
+def make_labels(regions, categories):
+    reg_label = "全国" if len(regions) > 5 else "&".join(regions)
+    cat_label = "全栏目" if len(categories) > 3 else "&".join(categories)
+    return reg_label, cat_label
+
 
-reg_label = "全国" if len(target_regions_list) > 5 else "&".join(target_regions_list)
-cat_label = "全栏目" if len(target_categories_list) > 3 else "&".join(target_categories_list)
+def default_filename(regions, categories):
+    reg_label, cat_label = make_labels(regions, categories)
+    return f"{reg_label}_{cat_label}.xlsx"
 
-# ========== 🟢 弹出窗口选择保存路径 ==========
 
-default_filename = f"{reg_label}_{cat_label}.xlsx"
-print("⏳ 正在唤起保存窗口，请选择 Excel 存放位置...")
+# ========== 🟢 弹出窗口选择保存路径 (仅双击运行时) ==========
 
-root = tk.Tk()
-root.withdraw()
-root.attributes('-topmost', True)
-OUTPUT_FILE = filedialog.asksaveasfilename(
-    title="请选择保存位置",
-    initialfile=default_filename,
-    defaultextension=".xlsx",
-    filetypes=[("Excel 文件", "*.xlsx"), ("所有文件", "*.*")]
-)
+def choose_output_file(initialfile):
+    import tkinter as tk
+    from tkinter import filedialog
 
-if not OUTPUT_FILE:
-    print("❌ 你取消了保存，程序已停止。")
-    sys.exit()
+    print("⏳ 正在唤起保存窗口，请选择 Excel 存放位置...")
+    root = tk.Tk()
+    root.withdraw()
+    root.attributes('-topmost', True)
+    return filedialog.asksaveasfilename(
+        title="请选择保存位置",
+        initialfile=initialfile,
+        defaultextension=".xlsx",
+        filetypes=[("Excel 文件", "*.xlsx"), ("所有文件", "*.*")]
+    )
 
-print(f"✅ 文件将保存至: {OUTPUT_FILE}")
 
 # =================================================
 
 SAVE_INTERVAL = 300
+PAGE_SIZE = 20  # 保底页大小 (协商失败时使用)
+PAGE_SIZE_CANDIDATES = [1000, 500, 200, 100, 50]  # 从大到小试探
+PAGE_SIZE_TTL = 7 * 24 * 3600  # 协商结果缓存一周
+LIST_RETRIES = 3  # 列表页出错 (超时 / 非 JSON) 的重试次数
+IN_FLIGHT_RECORDS = 800  # 同时在途的列表条目上限 (按条算，页大小协商变大后内存也不涨)，和总量无关
 LIST_API = "https://znhd.beijing.chinatax.gov.cn:8443/zsknsrd/api/zsknsrdsjjsService/search/v1/listKnowledge"
 SEMAPHORE = asyncio.Semaphore(20)
 
@@ -108,98 +124,213 @@ HEADERS = {
 }
 
 
-def get_payload(page, region_id, category_id):
+def get_payload(page, region_id, category_id, page_size=PAGE_SIZE):
     return {
         "Field": category_id,
         "SortBy": "UpdateTime",
-        "PageNumber": page, "PageSize": 20, "Order": "desc",
+        "PageNumber": page, "PageSize": page_size, "Order": "desc",
         "Range": [1, 2, 6], "Ztfl": [], "Yxx": [], "Zssx": [[], []], "Text": "",
         "Zsqy": [region_id]
     }
 
 
-def load_existing_ids(filepath):
-    if not os.path.exists(filepath): return set()
-    print(f">>> [断点续抓] 正在读取历史存档: {filepath} ...")
-    try:
-        df = pd.read_excel(filepath, usecols=["链接"], engine='openpyxl')
-        ids = set()
-        for link in df["链接"].dropna().astype(str):
-            match = re.search(r"id=(\d+)", link)
-            if match: ids.add(match.group(1))
-        print(f">>> [断点续抓] 已加载 {len(ids)} 条历史记录。")
-        return ids
-    except:
-        return set()
+class PolicyRecord(NamedTuple):
+    """一条记录 = 一个 tuple (无 __dict__)，入库后即释放"""
+    地区: str
+    栏目: str
+    标题: str
+    文号: str
+    发布日期: str
+    生效日期: str
+    更新时间: str
+    正文: str
+    链接: str
 
 
-async def process_one_item(client, item, region_name, category_name):
-    doc_id = item.get("id", "")
-    content = item.get("answer", "")
+COLUMNS = list(PolicyRecord._fields)
 
-    # === 核心逻辑 ===
-    yxx_code = item.get("yxx")
 
+def doc_key(doc_id):
+    return f"beijing:{doc_id}"
+
+
+def translate_yxx(yxx_code):
     # 1. 优先查字典 (961-966)
     if yxx_code in YXX_CODE_MAP:
-        sxrq_result = YXX_CODE_MAP[yxx_code]
+        return YXX_CODE_MAP[yxx_code]
 
     # 2. 如果没有代码 (None)，分情况处理
-    elif yxx_code is None:
+    if yxx_code is None:
         # 无论是政策法规，还是问题解答、办税指南
         # 只要没有标记失效代码，统一默认为“全文有效”
         # (这是最安全的策略，避免漏掉有效文件)
-        sxrq_result = "全文有效"
+        return "全文有效"
+
+    # 3. 未知代码兜底
+    return f"未知状态({yxx_code})"
 
-        # 3. 未知代码兜底
-    else:
-        sxrq_result = f"未知状态({yxx_code})"
-
-    info = {
-        "地区": region_name,
-        "栏目": category_name,
-        "标题": item.get("question", ""),
-        "文号": item.get("fwzh", ""),
-        "发布日期": item.get("fwrq", ""),
-        "生效日期": sxrq_result,
-        "更新时间": item.get("updateTime", ""),
-        "正文": content,
-        "链接": f"https://znhd.beijing.chinatax.gov.cn:8443/znhdzsknsrd/index?from=zcfg&id={doc_id}"
-    }
 
-    return info
+def seed_from_excel(filepath, store):
+    """库里还没有北京数据时，把旧 Excel 存档导入一次 (兼容老的断点续抓)"""
+    if not os.path.exists(filepath) or store.count("beijing"): return
+    print(f">>> [断点续抓] 正在导入历史存档: {filepath} ...")
+    try:
+        n = import_workbook(filepath, store, site="beijing").get("beijing", 0)
+        print(f">>> [断点续抓] 已导入 {n} 条历史记录。")
+    except Exception as e:
+        print(f">>> [断点续抓] 导入失败: {e}")
 
 
-async def fetch_page_and_details(client, page, existing_ids, region_id, category_id, region_name, category_name):
-    payload = get_payload(page, region_id, category_id)
-    async with SEMAPHORE:
+async def process_one_item(client, item, region_name, category_name):
+    doc_id = item.get("id", "")
+    content = item.get("answer", "")
+
+    return PolicyRecord(
+        地区=region_name,
+        栏目=category_name,
+        标题=item.get("question") or "",
+        文号=item.get("fwzh") or "",
+        发布日期=item.get("fwrq") or "",
+        生效日期=translate_yxx(item.get("yxx")),
+        更新时间=item.get("updateTime") or "",
+        正文=content or "",
+        链接=f"https://znhd.beijing.chinatax.gov.cn:8443/znhdzsknsrd/index?from=zcfg&id={doc_id}"
+    )
+
+
+async def fetch_list(client, page, region_id, category_id, page_size=PAGE_SIZE):
+    """请求一页列表，返回 (items, total)；出错直接抛异常"""
+    payload = get_payload(page, region_id, category_id, page_size)
+    resp = await client.post(LIST_API, json=payload, headers=HEADERS, timeout=20)
+    data = resp.json().get("Response", {}).get("Data", {})
+    return data.get("List", []) or [], data.get("Total", 0)
+
+
+async def process_items(client, store, items, region_name, category_name):
+    # 只处理 新文档 / 更新时间变了 / 有效性变了 的条目
+    new_items = [i for i in items
+                 if store.needs_fetch(doc_key(i.get("id", "")), i.get("updateTime") or "",
+                                      translate_yxx(i.get("yxx")))]
+    if not new_items: return []
+
+    tasks = [process_one_item(client, i, region_name, category_name) for i in new_items]
+    return await asyncio.gather(*tasks)
+
+
+async def verify_page_size(client, region_id, category_id, size):
+    """
+    用 size 取第 1、2 页，确认服务器真的按 size 分页：
+    条数 = min(size, 剩余量)、两页 id 不重叠，且总数一致。
+    返回实际可用的页大小 (服务器封顶时返回封顶值)，不可用返回 None。
+    总数不超过 size 时只验得了第 1 页，封顶没试出来，调用方不要缓存这个结果
+    """
+    items, total = await fetch_list(client, 1, region_id, category_id, size)
+    if not total or not items: return None
+    if len(items) < min(size, total):
+        # 服务器把页大小封顶了：按封顶值再验一次
+        cap = len(items)
+        return await verify_page_size(client, region_id, category_id, cap) if PAGE_SIZE < cap < size else None
+    if total <= size: return size
+    items2, total2 = await fetch_list(client, 2, region_id, category_id, size)
+    ids1 = {i.get("id") for i in items}
+    ids2 = {i.get("id") for i in items2}
+    if total2 == total and len(items2) == min(size, total - size) and not ids1 & ids2:
+        return size
+    return None
+
+
+async def negotiate_page_size(client, store, region_id, category_id):
+    """
+    试探接口接受的最大页大小，按接口缓存到库里 (只缓存用超过一页的数据验证过的结果)。
+    当前 地区×栏目 没数据、无法验证时返回 None (下一个有数据的再试)
+    """
+    cache_key = page_size_key()
+    cached = store.get_meta(cache_key)
+    if cached and time.time() - cached["at"] < PAGE_SIZE_TTL:
+        return cached["size"]
+
+    try:
+        _, total = await fetch_list(client, 1, region_id, category_id)
+    except Exception as e:
+        # 超时 / 防火墙返回的非 JSON 页面：这次用保底页大小，不缓存，下次运行再协商
+        print(f"    ⚠️ 页大小协商失败，使用 {PAGE_SIZE}: {e}")
+        return PAGE_SIZE
+    if not total: return None
+    size = PAGE_SIZE
+    for candidate in PAGE_SIZE_CANDIDATES:
         try:
-            resp = await client.post(LIST_API, json=payload, timeout=20)
-            data = resp.json()
-            items = data.get("Response", {}).get("Data", {}).get("List", [])
-            total = data.get("Response", {}).get("Data", {}).get("Total", 0)
-            if not items: return [], total
+            ok = await verify_page_size(client, region_id, category_id, candidate)
+        except Exception:
+            ok = None
+        if ok:
+            size = ok
+            break
+    if total > size:
+        store.set_meta(cache_key, {"size": size, "at": time.time()})
+        print(f"    📐 列表页大小协商结果: {size}")
+    else:
+        # 这组数据不满一页，封顶与否看不出来：本次先用，不缓存；抓取时发现非末页不满再重新协商
+        print(f"    📐 列表页大小协商结果: {size} (数据不足一页，未缓存)")
+    return size
+
+
+def page_size_key():
+    return f"page_size:{LIST_API}"
+
+
+def forget_page_size(store):
+    """作废缓存的页大小 (抓取中发现服务器封顶了)，下次 negotiate_page_size 重新试探"""
+    store.set_meta(page_size_key(), None)
+
 
-            new_items = [i for i in items if str(i.get("id", "")) not in existing_ids]
-            if not new_items: return [], total
+def is_capped(n_items, page, total, page_size):
+    """非末页却不满 page_size 条：服务器把页大小封顶了"""
+    return n_items < page_size and page < math.ceil(total / page_size)
 
-            tasks = [process_one_item(client, i, region_name, category_name) for i in new_items]
-            results = await asyncio.gather(*tasks)
-            return results, total
-        except:
-            return [], 0
 
+def in_flight_pages(page_size):
+    """滑动窗口的页数：在途条目不超过 IN_FLIGHT_RECORDS"""
+    return max(1, IN_FLIGHT_RECORDS // page_size)
 
-def save_to_excel_safe(data, filepath):
-    if not data: return
-    print(f"    💾 正在存档 (新增 {len(data)} 条)...")
+
+async def fetch_page_and_details(client, page, store, region_id, category_id, region_name, category_name,
+                                 page_size=PAGE_SIZE):
+    """
+    返回 (新增/变更的记录, 总数, 本页条数)。
+    列表出错重试 LIST_RETRIES 次，仍失败就把 httpx.HTTPError / ValueError 抛给调用方 (由它重投或记下页码)
+    """
+    for attempt in range(1, LIST_RETRIES + 1):
+        try:
+            async with SEMAPHORE:
+                items, total = await fetch_list(client, page, region_id, category_id, page_size)
+            break
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"\n    ⚠️ 第 {page} 页列表出错 (第 {attempt} 次): {e!r}")
+            if attempt == LIST_RETRIES: raise
+            await asyncio.sleep(attempt)
+    if not items: return [], total, 0
+    results = await process_items(client, store, items, region_name, category_name)
+    return results, total, len(items)
+
+
+def persist(store, results):
+    """入库，返回 新增/变更 条数"""
+    n = 0
+    for rec in results:
+        m = re.search(r"id=(\d+)", rec.链接)
+        if not m: continue
+        status = store.save("beijing", doc_key(m.group(1)), rec._asdict())
+        if status == "changed":
+            print(f"\n    🔁 [变更] {rec.标题[:20]} -> {rec.生效日期}")
+        if status != "unchanged": n += 1
+    return n
+
+
+def save_to_excel_safe(store, filepath):
+    print(f"    💾 正在存档 (库内 {store.count('beijing')} 条)...")
     try:
-        df = pd.DataFrame(data)
-        cols = ["地区", "栏目", "标题", "文号", "发布日期", "生效日期", "更新时间", "正文", "链接"]
-        for c in cols:
-            if c not in df.columns: df[c] = ""
-        df = df[cols]
-        df.to_excel(filepath, index=False, engine='openpyxl')
+        rows = (("Sheet1", to_row(d, COLUMNS)) for d in store.iter_documents("beijing"))
+        export_excel(filepath, {"Sheet1": COLUMNS}, rows)
         print(f"    ✅ [成功] 文件已更新")
     except PermissionError:
         print("    ⚠️ [警告] Excel文件被占用，请关闭它！")
@@ -207,30 +338,96 @@ def save_to_excel_safe(data, filepath):
         print(f"    ❌ [错误] {e}")
 
 
-async def main():
+async def main(target_regions_list, target_categories_list, output_file, client=None, store=None):
+    reg_label, cat_label = make_labels(target_regions_list, target_categories_list)
     print("=" * 60)
     print(f"🚀 启动 V17.0 全能融合版")
     print(f"🎯 地区: {reg_label}")
     print(f"📚 栏目: {cat_label}")
-    print(f"📁 输出: {OUTPUT_FILE}")
+    print(f"📁 输出: {output_file}")
     print("=" * 60)
 
-    existing_ids = load_existing_ids(OUTPUT_FILE)
-    all_data = []
-
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            df_old = pd.read_excel(OUTPUT_FILE, engine='openpyxl')
-            all_data = df_old.to_dict('records')
-        except:
-            pass
-
-    limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
-
-    async with httpx.AsyncClient(headers=HEADERS, verify=False, limits=limits) as client:
+    own_store = store is None
+    store = store or PolicyStore()
+    seed_from_excel(output_file, store)
+    profiling.checkpoint("历史数据载入")
+    saved = 0
+
+    # 调度器会传入共享连接池；单独跑时用按域名配好的连接池 (装了 h2 就走 HTTP/2 多路复用)
+    own_client = client is None
+    client_ctx = contextlib.nullcontext(client) if client else make_client(headers=HEADERS)
+    async with client_ctx as client:
+
+        async def crawl_combo(rid, cid, reg_name, cat_name, size, check_cap=True):
+            """抓一个 地区×栏目；check_cap 时发现页大小被服务器封顶就停下返回 False"""
+            nonlocal saved
+            try:
+                first, total, n = await fetch_page_and_details(client, 1, store, rid, cid, reg_name, cat_name, size)
+            except (httpx.HTTPError, ValueError):
+                print(f"    ❌ 第 1 页多次出错，跳过这一组")
+                return True
+
+            if total == 0 and not first:
+                print(f"    ⚪ 无数据")
+                return True
+
+            if first:
+                saved += persist(store, first)
+            if check_cap and is_capped(n, 1, total, size):
+                print(f"    📐 第 1 页只有 {n} 条 (页大小 {size})，服务器封顶了")
+                return False
+
+            pages = math.ceil(total / size)
+            print(f"    🟢 发现 {total} 条数据，共 {pages} 页")
+
+            # 滑动窗口：最多 IN_FLIGHT_RECORDS 条 (折成页数) 在途，每页入库后结果立即释放
+            window = in_flight_pages(size)
+            done_cnt = 0
+            last_save = saved
+            todo = deque(range(2, pages + 1))
+            requeued, failed = set(), []
+            in_flight = {}
+            while todo or in_flight:
+                while todo and len(in_flight) < window:
+                    page = todo.popleft()
+                    in_flight[asyncio.ensure_future(
+                        fetch_page_and_details(client, page, store, rid, cid, reg_name, cat_name, size))] = page
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        res, _, n = future.result()
+                    except (httpx.HTTPError, ValueError):
+                        # 重试用完了：放回队尾再来一轮，还不行就记下页码
+                        if page in requeued:
+                            failed.append(page)
+                        else:
+                            requeued.add(page)
+                            todo.append(page)
+                        continue
+                    done_cnt += 1
+                    if res:
+                        saved += persist(store, res)
+                    if check_cap and is_capped(n, page, total, size):
+                        print(f"\n    📐 第 {page} 页只有 {n} 条 (页大小 {size})，服务器封顶了")
+                        for f in in_flight: f.cancel()
+                        return False
+
+                    if done_cnt % 5 == 0:
+                        sys.stdout.write(f"\r    ▶️  进度: {done_cnt}/{pages - 1} 页")
+                        sys.stdout.flush()
+
+                    if saved - last_save >= SAVE_INTERVAL:
+                        print("")
+                        save_to_excel_safe(store, output_file)
+                        last_save = saved
+            if failed:
+                print(f"\n    ❌ 以下页多次出错，已跳过: {sorted(failed)}")
+            return True
 
         total_tasks = len(target_regions_list) * len(target_categories_list)
         current_task = 0
+        page_size = None
 
         for reg_name in target_regions_list:
             for cat_name in target_categories_list:
@@ -242,55 +439,192 @@ async def main():
 
                 print(f"\n🔄 [{current_task}/{total_tasks}] 正在抓取: {reg_name} - {cat_name}")
 
-                first, total = await fetch_page_and_details(client, 1, existing_ids, rid, cid, reg_name, cat_name)
-
-                if total == 0 and not first:
-                    print(f"    ⚪ 无数据")
-                    continue
-
-                if first:
-                    all_data.extend(first)
-                    for i in first:
-                        m = re.search(r"id=(\d+)", i['链接'])
-                        if m: existing_ids.add(m.group(1))
-
-                page_size = 20
-                pages = math.ceil(total / page_size)
-                print(f"    🟢 发现 {total} 条数据，共 {pages} 页")
-
-                tasks = [fetch_page_and_details(client, p, existing_ids, rid, cid, reg_name, cat_name) for p in
-                         range(2, pages + 1)]
-
-                if tasks:
-                    done_cnt = 0
-                    last_save = len(all_data)
-                    for future in asyncio.as_completed(tasks):
-                        res, _ = await future
-                        done_cnt += 1
-                        if res:
-                            all_data.extend(res)
-                            for i in res:
-                                m = re.search(r"id=(\d+)", i['链接'])
-                                if m: existing_ids.add(m.group(1))
-
-                        if done_cnt % 5 == 0:
-                            sys.stdout.write(f"\r    ▶️  进度: {done_cnt}/{len(tasks)} 页")
-                            sys.stdout.flush()
-
-                        if len(all_data) - last_save >= SAVE_INTERVAL:
-                            print("")
-                            save_to_excel_safe(all_data, OUTPUT_FILE)
-                            last_save = len(all_data)
+                if page_size is None:
+                    page_size = await negotiate_page_size(client, store, rid, cid)
+
+                if not await crawl_combo(rid, cid, reg_name, cat_name, page_size or PAGE_SIZE):
+                    # 缓存的页大小不可信了：作废、用这一组重新协商，再从第 1 页抓 (已入库的条目会跳过)
+                    forget_page_size(store)
+                    page_size = await negotiate_page_size(client, store, rid, cid)
+                    await crawl_combo(rid, cid, reg_name, cat_name, page_size or PAGE_SIZE, check_cap=False)
 
         print("\n\n" + "=" * 60)
-        print("🎉 全部完成！")
-        save_to_excel_safe(all_data, OUTPUT_FILE)
+        print(f"🎉 全部完成！本次新增/变更 {saved} 条")
+        profiling.checkpoint("列表和详情抓完")
+        save_to_excel_safe(store, output_file)
+        profiling.checkpoint("Excel 导出")
+        if own_client:
+            client.pool_metrics.report()
+    if own_store:
+        store.close()
+
+
+# ========== 🟢 有效性巡检 (只读列表里的 yxx，不抓正文) ==========
+
+async def sweep_status(target_regions_list, target_categories_list, client=None, store=None):
+    """
+    把列表接口的 yxx 翻译成有效性，和库里比对，变了的只改有效性 (记一版)。
+    不走 process_items，正文不入库、不做比对；返回 taxcrawl.sweep.Change 列表
+    """
+    own_store = store is None
+    store = store or PolicyStore()
+    known = store.statuses("beijing")
+    changes = []
+
+    def check(items):
+        for item in items:
+            change = apply_status(store, doc_key(item.get("id", "")), translate_yxx(item.get("yxx")), known)
+            if change:
+                changes.append(change)
+
+    async def list_page(page, rid, cid, size):
+        async with SEMAPHORE:
+            try:
+                items, _ = await fetch_list(client, page, rid, cid, size)
+            except Exception as e:
+                print(f"    ❌ 第 {page} 页出错: {e}")
+                return []
+        # 只留比对要用的字段，answer 正文立刻丢掉
+        return [{"id": i.get("id", ""), "yxx": i.get("yxx")} for i in items]
+
+    client_ctx = contextlib.nullcontext(client) if client else make_client(headers=HEADERS)
+    async with client_ctx as client:
+        page_size = None
+        for reg_name in target_regions_list:
+            for cat_name in target_categories_list:
+                rid, cid = REGION_MAP.get(reg_name), CATEGORY_MAP.get(cat_name)
+                if not rid or not cid: continue
+                if page_size is None:
+                    page_size = await negotiate_page_size(client, store, rid, cid)
+                size = page_size or PAGE_SIZE
+                async with SEMAPHORE:
+                    try:
+                        first, total = await fetch_list(client, 1, rid, cid, size)
+                    except Exception as e:
+                        print(f"    ❌ {reg_name}-{cat_name} 出错: {e}")
+                        continue
+                check({"id": i.get("id", ""), "yxx": i.get("yxx")} for i in first)
+                pages = math.ceil(total / size)
+                window = in_flight_pages(size)
+                for start in range(2, pages + 1, window):
+                    batch = range(start, min(start + window, pages + 1))
+                    for items in await asyncio.gather(*(list_page(p, rid, cid, size) for p in batch)):
+                        check(items)
+                print(f"🔍 {reg_name}-{cat_name}: {total} 条已比对，累计变更 {len(changes)} 篇")
+
+    if own_store:
+        store.close()
+    return changes
+
+
+# ========== 🟢 分布式模式 (任务队列) ==========
+
+def seed_queue(queue, regions, categories):
+    """每个 地区×栏目 先投第 1 页，后续页码由处理第 1 页的 worker 补投"""
+    return queue.add((r, c, 1) for r in regions for c in categories if r in REGION_MAP and c in CATEGORY_MAP)
+
+
+async def queue_page_size(client, store, queue, task):
+    """所有 worker 必须用同一个页大小 (页码才对得上)，第一个协商出来的写进队列文件"""
+    size = queue.get_meta("page_size")
+    if size is None:
+        size = await negotiate_page_size(client, store, REGION_MAP[task["region"]], CATEGORY_MAP[task["category"]])
+        if size is None: return PAGE_SIZE if task["page"] > 1 else None
+        size = queue.setdefault_meta("page_size", size)
+    return size
+
+
+async def run_queue_task(client, store, queue, task):
+    reg_name, cat_name, page = task["region"], task["category"], task["page"]
+    rid, cid = REGION_MAP[reg_name], CATEGORY_MAP[cat_name]
+    page_size = await queue_page_size(client, store, queue, task) or PAGE_SIZE
+    async with SEMAPHORE:
+        items, total = await fetch_list(client, page, rid, cid, page_size)
+    if is_capped(len(items), page, total, page_size):
+        # 服务器把页大小封顶了：重新协商 (别的 worker 已经换过就直接用新值)，这一组按新页大小整组重投
+        if queue.get_meta("page_size") == page_size:
+            forget_page_size(store)
+            queue.set_meta("page_size", await negotiate_page_size(client, store, rid, cid) or PAGE_SIZE)
+        size = queue.get_meta("page_size")
+        print(f"    📐 [{reg_name}-{cat_name}] 第 {page} 页只有 {len(items)} 条，按页大小 {size} 重投")
+        queue.requeue((reg_name, cat_name, p) for p in range(1, math.ceil(total / size) + 1))
+    elif page == 1 and total:
+        queue.add((reg_name, cat_name, p) for p in range(2, math.ceil(total / page_size) + 1))
+    results = await process_items(client, store, items, reg_name, cat_name) if items else []
+    return persist(store, results)
+
+
+async def _heartbeat(queue, task_id, worker_id):
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        if not queue.heartbeat(task_id, worker_id): return
+
+
+async def queue_worker(queue, store, client, worker_id, slots=4):
+    """不停领取任务直到队列清空；slots 为本进程同时处理的任务数"""
+    stats = {"done": 0, "saved": 0, "failed": 0}
+
+    async def slot():
+        while True:
+            task = queue.claim(worker_id)
+            if task is None:
+                if not queue.has_open(): return
+                await asyncio.sleep(2)  # 别的 worker 还在处理第 1 页，可能还会补投
+                continue
+            hb = asyncio.create_task(_heartbeat(queue, task["id"], worker_id))
+            try:
+                n = await run_queue_task(client, store, queue, task)
+                stats["saved"] += n
+                queue.complete(task["id"], worker_id)
+                stats["done"] += 1
+            except Exception as e:
+                queue.fail(task["id"], worker_id, e)
+                stats["failed"] += 1
+            finally:
+                hb.cancel()
+            if stats["done"] and stats["done"] % 20 == 0:
+                print(f"    ▶️  [{worker_id}] 完成 {stats['done']} 页, 入库 {stats['saved']} 条")
+
+    await asyncio.gather(*[slot() for _ in range(slots)])
+    print(f"    ✅ [{worker_id}] 队列已空：完成 {stats['done']} 页, 入库 {stats['saved']} 条, 失败 {stats['failed']} 次")
+    return stats
+
+
+def run_worker(queue_path, slots=4, worker_id=None):
+    """单个 worker 进程入口 (可在多台机器上同时运行，指向同一个队列文件)"""
+    from taxcrawl.taskqueue import TaskQueue, new_worker_id
+
+    worker_id = worker_id or new_worker_id()
+
+    async def go():
+        with TaskQueue(queue_path) as queue, PolicyStore() as store:
+            async with make_client(headers=HEADERS) as client:
+                return await queue_worker(queue, store, client, worker_id, slots)
+
+    if sys.platform.startswith('win'):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    return asyncio.run(go())
 
 
-if __name__ == "__main__":
+def run(regions=None, categories=None, output_file=None):
+    """命令行 / 定时任务入口：不弹窗，参数缺省时用上面的指挥中心配置"""
     import warnings
 
     warnings.filterwarnings("ignore")
+    regions = parse_config(regions if regions is not None else TARGET_REGIONS_CONFIG, REGION_MAP)
+    categories = parse_config(categories if categories is not None else TARGET_CATEGORIES_CONFIG, CATEGORY_MAP)
+    output_file = output_file or default_filename(regions, categories)
     if sys.platform.startswith('win'):
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(regions, categories, output_file))
+
+
+if __name__ == "__main__":
+    regions = parse_config(TARGET_REGIONS_CONFIG, REGION_MAP)
+    categories = parse_config(TARGET_CATEGORIES_CONFIG, CATEGORY_MAP)
+    OUTPUT_FILE = choose_output_file(default_filename(regions, categories))
+    if not OUTPUT_FILE:
+        print("❌ 你取消了保存，程序已停止。")
+        sys.exit()
+    print(f"✅ 文件将保存至: {OUTPUT_FILE}")
+    run(regions, categories, OUTPUT_FILE)
\ No newline at end of file
@@ -1,14 +1,26 @@
 # -*- coding: utf-8 -*-
 from DrissionPage import ChromiumPage, ChromiumOptions
-import pandas as pd
 import time
 import random
 import os
-from urllib.parse import urljoin
+import re
+import json
+import asyncio
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl
+
+from taxcrawl.store import PolicyStore, to_row
+from taxcrawl.export import export_excel
+from taxcrawl.attachments import download_attachments
+from taxcrawl.browser import TabPool
+from taxcrawl.sessions import SessionVault
+from taxcrawl.importer import import_workbook
+from taxcrawl import profiling
 
 # ================= 配置区域 =================
 TARGET_URL = "https://ningbo.chinatax.gov.cn/zcwj/zcfgk/index.html"
-VERSION = "v10.0 (稳如老狗版 - 强制休眠翻页)"
+HOST = "ningbo.chinatax.gov.cn"
+VERSION = "v11.0 (列表直取版 - 并发枚举列表页)"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 
 def get_desktop_path():
@@ -17,6 +29,21 @@ def get_desktop_path():
 
 OUTPUT_FILE = os.path.join(get_desktop_path(), "宁波税务_政策法规库_全量抓取.xlsx")
 
+# 附件下载 (按内容哈希存放，同一份文件只存一次)
+DOWNLOAD_ATTACHMENTS = True
+ATTACHMENT_DIR = os.path.join(get_desktop_path(), "宁波税务_附件")
+ATTACHMENT_CONCURRENCY = 8
+
+# 无界面模式 (Linux 服务器 / 定时任务)
+HEADLESS = False
+BROWSER_PORT = 9223  # 各站点用不同端口，可同时开两个浏览器
+TABS = 4  # 详情页并行标签页数
+
+# 列表直取：找到分页器背后的数据源后并发拉取所有列表页
+LIST_CONCURRENCY = 4
+MAX_LIST_PAGES = 1000  # 拿不到总页数时的安全上限
+PAGE_WAIT_TIMEOUT = 10  # 点击翻页后等列表变化的最长时间
+
 
 # ================= 核心逻辑 =================
 
@@ -71,31 +98,302 @@ def extract_detail(tab):
         return {}
 
 
-def save_to_excel(data_list, filepath):
-    if not data_list: return
+# ================= 列表发现 =================
+# 分页器 (layui laypage) 只是个壳，数据要么来自静态 index_N.html，要么来自一个 XHR 接口。
+# 找到之后直接并发拉所有页，不再 "点下一页 + sleep(3)"；都找不到才回退到点击翻页。
+
+def is_article_link(url, title):
+    """混合过滤器：是文章 且 不是分类页"""
+    if not url or "javascript" in url: return False
+    if not title or len(title) < 5: return False
+    is_article = ("/art/" in url) or ("/content/" in url) or ("202" in url)
+    return is_article and not url.endswith("index.html")
+
+
+def links_from_html(html, base):
+    from bs4 import BeautifulSoup
+
+    out = []
+    for a in BeautifulSoup(html, "lxml").find_all("a", href=True):
+        url, title = urljoin(base, a["href"].strip()), a.get("title") or a.get_text(strip=True)
+        if is_article_link(url, title):
+            out.append({"title": title, "url": url})
+    return out
+
+
+def links_from_json(data, base):
+    """在 JSON 里找 "像文章" 的对象：某个字段是文章链接，另一个字段是标题"""
+    out = []
+    if isinstance(data, dict):
+        strings = {k: v for k, v in data.items() if isinstance(v, str)}
+        url = next((v for k, v in strings.items() if re.search(r"url|link|href", k, re.I)), "")
+        title = next((v for k, v in strings.items() if re.search(r"title|name|bt", k, re.I)), "")
+        url = urljoin(base, url) if url else ""
+        if is_article_link(url, re.sub(r"<[^>]+>", "", title)):
+            out.append({"title": re.sub(r"<[^>]+>", "", title), "url": url})
+        for v in data.values():
+            if isinstance(v, (dict, list)): out += links_from_json(v, base)
+    elif isinstance(data, list):
+        for v in data: out += links_from_json(v, base)
+    elif isinstance(data, str) and "<a" in data:
+        out += links_from_html(data, base)  # 接口里夹着 HTML 片段
+    return out
+
+
+def extract_links(body, base):
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return links_from_html(body, base)
+    return links_from_json(body, base)
+
+
+def dedupe_links(items):
+    seen, out = set(), []
+    for it in items:
+        if it["url"] not in seen:
+            seen.add(it["url"])
+            out.append(it)
+    return out
+
+
+def pager_total(page):
+    """从 layui 分页器读总页数，读不到返回 None"""
+    try:
+        last = page.ele('.layui-laypage-last', timeout=2)
+        if last and str(last.attr('data-page') or "").isdigit():
+            return int(last.attr('data-page'))
+        nums = [int(e.text) for e in page.eles('css:.layui-laypage a, .layui-laypage span')
+                if e.text and e.text.strip().isdigit()]
+        return max(nums) if nums else None
+    except Exception:
+        return None
+
+
+class ListSource:
+    """
+    一个可以按页码直接请求的列表数据源。
+    page_value(n) 把第 n 页换算成请求里的值 (TRS 静态页 index_1.html 是第 2 页，所以有偏移)
+    """
+
+    def __init__(self, method, url, key=None, where="static", params=None, data=None, offset=0, json_body=False):
+        self.method, self.url, self.key, self.where = method, url, key, where
+        self.params, self.data, self.offset, self.json_body = params or {}, data, offset, json_body
+
+    def __str__(self):
+        return f"{self.method} {self.url} [{self.where}:{self.key}]"
+
+    def request(self, n):
+        value = n + self.offset
+        if self.where == "static":
+            return {"method": "GET", "url": TARGET_URL if n == 1 else urljoin(TARGET_URL, f"index_{value}.html")}
+        if self.where == "path":
+            return {"method": self.method, "url": re.sub(r"(_)\d+(\.s?html?)$", rf"\g<1>{value}\2", self.url)}
+        params, data = dict(self.params), self.data
+        if self.where == "query":
+            params[self.key] = str(value)
+        elif self.where == "json":
+            data = {**data, self.key: value}
+        elif self.where == "form":
+            data = {**data, self.key: str(value)}
+        req = {"method": self.method, "url": self.url, "params": params}
+        if self.json_body:
+            req["json"] = data
+        elif data:
+            req["data"] = data
+        return req
+
+
+PAGE_KEY_RE = re.compile(r"page|pageno|pageindex|curpage|currentpage|^p$|^pn$", re.I)
+
+
+def source_from_packet(packet, page_no=2):
+    """把抓到的 "第 page_no 页" 请求还原成 ListSource：找出哪个参数等于页码"""
+    parts = urlsplit(packet.url)
+    base = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    post = packet.request.postData
+    json_body = isinstance(post, dict)
+    form = dict(parse_qsl(post, keep_blank_values=True)) if isinstance(post, str) else {}
+    method = packet.method
+
+    candidates = [("json", k, v) for k, v in (post.items() if json_body else [])]
+    candidates += [("form", k, v) for k, v in form.items()] + [("query", k, v) for k, v in params.items()]
+    candidates = [(w, k, v) for w, k, v in candidates if str(v).isdigit() and int(v) in (page_no, page_no - 1)]
+    candidates.sort(key=lambda c: (not PAGE_KEY_RE.search(c[1]), int(c[2]) != page_no))
+    if candidates:
+        where, key, value = candidates[0]
+        return ListSource(method, base, key, where, params, post if json_body else form,
+                          offset=int(value) - page_no, json_body=json_body)
+    m = re.search(r"_(\d+)\.s?html?$", parts.path)
+    if m:
+        return ListSource(method, packet.url, where="path", offset=int(m.group(1)) - page_no)
+    return None
+
+
+async def _fetch_list_page(client, semaphore, source, n):
+    async with semaphore:
+        try:
+            resp = await client.request(**source.request(n), timeout=20)
+            if resp.status_code >= 400: return []
+            try:
+                body = resp.json()
+            except ValueError:
+                body = resp.text
+            return extract_links(body, str(resp.url))
+        except Exception as e:
+            print(f"   ❌ 列表页 {n} 请求失败: {e}")
+            return []
+
+
+async def enumerate_source(source, cookies, total=None):
+    """并发拉所有列表页；不知道总页数时一批一批拉，直到整批都没有新链接"""
+    from taxcrawl.client import make_client
+
+    semaphore = asyncio.Semaphore(LIST_CONCURRENCY)
+    found = []
+    async with make_client(headers={"User-Agent": USER_AGENT, "Referer": TARGET_URL}, cookies=cookies,
+                           follow_redirects=True) as client:
+        if total:
+            pages = await asyncio.gather(*(_fetch_list_page(client, semaphore, source, n)
+                                           for n in range(1, total + 1)))
+            return dedupe_links(link for links in pages for link in links)
+        start = 1
+        seen = set()
+        while start <= MAX_LIST_PAGES:
+            batch = range(start, min(start + LIST_CONCURRENCY * 2, MAX_LIST_PAGES + 1))
+            pages = await asyncio.gather(*(_fetch_list_page(client, semaphore, source, n) for n in batch))
+            new = [link for links in pages for link in links if link["url"] not in seen]
+            if not new: break
+            seen.update(link["url"] for link in new)
+            found += new
+            start = batch[-1] + 1
+        return dedupe_links(found)
+
+
+def probe_static_source(page, cookies):
+    """TRS 栏目常见的静态分页：index.html, index_1.html ... 能拿到不同文章就用它"""
+    import httpx
+
+    first = {link["url"] for link in links_from_html(page.html, TARGET_URL)}
+    with httpx.Client(headers={"User-Agent": USER_AGENT}, cookies=cookies, verify=False,
+                      follow_redirects=True) as client:
+        for offset in (-1, 0):  # index_1.html 是第 2 页 (TRS) 还是第 1 页
+            try:
+                resp = client.get(urljoin(TARGET_URL, f"index_{2 + offset}.html"), timeout=10)
+            except Exception:
+                continue
+            links = {link["url"] for link in links_from_html(resp.text, str(resp.url))} if resp.status_code < 400 else set()
+            if links and links - first:
+                return ListSource("GET", TARGET_URL, offset=offset)
+    return None
+
+
+def capture_pager_source(page):
+    """监听网络，点一次 "下一页"，看分页器到底请求了什么"""
+    next_btn = find_next_button(page)
+    if not next_btn: return None
+    page.listen.start(res_type=('XHR', 'Fetch', 'Document'))
+    try:
+        next_btn.click(by_js=True)
+        for packet in page.listen.steps(timeout=PAGE_WAIT_TIMEOUT):
+            if packet.response and packet.response.body and extract_links(packet.response.body, packet.url):
+                return source_from_packet(packet)
+    finally:
+        page.listen.stop()
+    return None
+
+
+def discover_list(page):
+    """
+    列表直取：返回全部 [{"title","url"}]；找不到可直接请求的数据源时返回 None (走点击翻页)
+    """
+    cookies = {c["name"]: c["value"] for c in page.cookies()}
+    total = pager_total(page)
+    source = probe_static_source(page, cookies)
+    if source is None:
+        source = capture_pager_source(page)
+        page.get(TARGET_URL)  # 点过下一页了，回到第 1 页 (回退时从头走)
+    if source is None:
+        return None
+    print(f"🔎 找到列表数据源: {source} (共 {total or '?'} 页)，并发拉取列表...")
+    links = asyncio.run(enumerate_source(source, cookies, total))
+    return links or None
+
+
+# ================= 点击翻页 (回退) =================
+
+def find_next_button(page):
+    right_box = page.ele('.right-box')  # 锁定右侧
+    return right_box.ele('.layui-laypage-next') if right_box else page.ele('.layui-laypage-next')
+
+
+def scan_page_links(page):
+    links = [{"title": link.text, "url": link.attr('href')} for link in page.eles('tag:a')]
+    return dedupe_links(it for it in links if is_article_link(it["url"], it["title"]))
+
+
+def wait_list_change(page, before, timeout=PAGE_WAIT_TIMEOUT):
+    """等列表内容变化 (而不是固定 sleep)，超时返回 False"""
+    end = time.time() + timeout
+    while time.time() < end:
+        now = {it["url"] for it in scan_page_links(page)}
+        if now and now != before:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def fetch_detail(tab, item):
+    """在标签页池的某个标签页里打开详情页并解析 (工作线程里执行)；解析失败抛异常，计入标签页失败数"""
+    tab.get(item["url"])
+    tab.ele('#zoom', timeout=8)
+    detail = extract_detail(tab)
+    if not detail:
+        raise RuntimeError("详情页解析失败")
+    return detail
+
+
+DOC_COLUMNS = ["标题", "发布日期", "发文单位", "文号", "正文", "附件数", "链接"]
+ATT_COLUMNS = ["链接", "附件文件名", "附件链接", "本地文件"]
+SAVE_INTERVAL = 50  # 每抓多少篇导出一次 Excel
+
+
+def doc_key(url):
+    return f"ningbo:{url}"
+
+
+def seed_from_excel(filepath, store):
+    """库里还没有宁波数据时，把旧 Excel 导入一次 (老的"一附件一行"格式会折叠成一篇一行)"""
+    if not os.path.exists(filepath) or store.count("ningbo"): return
+    try:
+        n = import_workbook(filepath, store, site="ningbo").get("ningbo", 0)
+    except Exception as e:
+        print(f"   ❌ 读取历史存档失败: {e}")
+        return
+    print(f"📚 已从旧表导入 {n} 篇")
+
+
+def save_to_excel(store, filepath):
+    """文档一张表、附件一张表，正文只写一次"""
     while True:
         try:
-            df_new = pd.DataFrame(data_list)
-            if os.path.exists(filepath):
-                try:
-                    with pd.ExcelWriter(filepath, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
-                        pass
-                    df_old = pd.read_excel(filepath, engine="openpyxl")
-                    df = pd.concat([df_old, df_new], ignore_index=True)
-                    df.drop_duplicates(subset=["链接", "附件链接"], keep="last", inplace=True)
-                except PermissionError:
-                    raise PermissionError
-                except:
-                    df = df_new
-            else:
-                df = df_new
-
-            cols = ["标题", "发布日期", "发文单位", "文号", "正文", "附件文件名", "附件链接", "链接"]
-            for c in cols:
-                if c not in df.columns: df[c] = ""
-            df = df[cols]
-            df.to_excel(filepath, index=False, engine="openpyxl")
-            print(f"   💾 已保存 (总行数: {len(df)})")
+            counts = store.attachment_counts("ningbo")
+
+            def rows(counts):
+                for d in store.iter_documents("ningbo"):
+                    row = to_row(d, DOC_COLUMNS)
+                    row["附件数"] = counts.get(d["url"], 0)
+                    yield "政策", row
+                for a in store.iter_attachments("ningbo"):
+                    yield "附件", {"链接": a["doc_url"], "附件文件名": a["name"], "附件链接": a["url"],
+                                   "本地文件": a["path"] or ""}
+
+            n = export_excel(filepath, {"政策": DOC_COLUMNS, "附件": ATT_COLUMNS}, rows(counts))
+            print(f"   💾 已保存 (文档 {n['政策']} 篇, 附件 {n['附件']} 个)")
             break
         except PermissionError:
             print("\n🚨 错误：Excel 文件被占用！请关闭文件...")
@@ -105,91 +403,63 @@ def save_to_excel(data_list, filepath):
             break
 
 
-def main():
+def download_stage(store):
+    """把库里所有附件链接下载到 ATTACHMENT_DIR"""
+    urls = [a["url"] for a in store.iter_attachments("ningbo")]
+    asyncio.run(download_attachments(urls, ATTACHMENT_DIR, store, concurrency=ATTACHMENT_CONCURRENCY))
+
+
+def main(output_file=None, headless=None, download=None, store=None, tabs=None):
+    output_file = output_file or OUTPUT_FILE
+    headless = HEADLESS if headless is None else headless
+    tabs = tabs or TABS
+    download = DOWNLOAD_ATTACHMENTS if download is None else download
     print(f"🚀 启动采集器 - {VERSION}")
 
     co = ChromiumOptions()
-    co.set_user_agent(
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    co.set_user_agent(user_agent=USER_AGENT)
     co.set_argument('--blink-settings=imagesEnabled=false')
     co.set_argument('--mute-audio')
     co.set_argument('--window-position=-3000,-3000')  # 移出屏幕
     co.ignore_certificate_errors()
+    co.set_local_port(BROWSER_PORT)
+    if headless:
+        co.headless(True)
+        co.set_argument('--no-sandbox')
 
     page = ChromiumPage(addr_or_opts=co)
 
+    # 上次的会话还有效就先装回浏览器，首页直接出内容
+    vault = SessionVault()
+    vault.restore(page, HOST, TARGET_URL)
+
     print(f"🌐 正在访问: {TARGET_URL}")
     page.get(TARGET_URL)
-    time.sleep(3)  # 首次加载多等一会
-
-    processed_urls = set()
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            try:
-                df = pd.read_excel(OUTPUT_FILE, engine="openpyxl")
-                processed_urls = set(df["链接"].dropna().tolist())
-                print(f"📚 已读取 {len(processed_urls)} 条历史记录")
-            except:
-                pass
-        except:
-            pass
-
-    page_num = 1
-    empty_page_count = 0
-
-    while True:
-        print(f"\n🔄 正在处理第 {page_num} 页...")
-
-        # 1. 扫描链接 (v3.0 风格)
-        try:
-            page.wait.ele('tag:a', timeout=10)
-        except:
-            pass
-
-        all_links = page.eles('tag:a')
-        article_links = []
-        for link in all_links:
-            url = link.attr('href')
-            title = link.text
-
-            if not url or "javascript" in url: continue
-            if not title or len(title) < 5: continue
-
-            # 混合过滤器：是文章 且 不是分类页
-            is_article = ("/art/" in url) or ("/content/" in url) or ("202" in url)
-            is_category = url.endswith("index.html")
-
-            if is_article and not is_category:
-                if url not in processed_urls:
-                    article_links.append({"title": title, "url": url})
-
-        unique_links = []
-        seen = set()
-        for item in article_links:
-            if item['url'] not in seen:
-                unique_links.append(item)
-                seen.add(item['url'])
-
-        if not unique_links:
-            print("⚠️ 本页未发现新数据。")
-            empty_page_count += 1
-            if empty_page_count >= 3:
-                print("🛑 连续 3 页无数据，判断为结束。")
-                break
-        else:
-            print(f"   📄 筛选出 {len(unique_links)} 篇新文章")
-            empty_page_count = 0
-
-        # 2. 抓取
-        for item in unique_links:
-            print(f"   Downloading: {item['title'][:15]}...")
+    try:
+        page.wait.ele_displayed('.layui-laypage', timeout=PAGE_WAIT_TIMEOUT)  # 等分页器渲染出来
+    except Exception:
+        pass
+    vault.capture(page, HOST)
+
+    own_store = store is None
+    store = store or PolicyStore()
+    seed_from_excel(output_file, store)
+    processed_urls = {k[len("ningbo:"):] for k in store.keys("ningbo")}
+    print(f"📚 已读取 {len(processed_urls)} 条历史记录")
+    profiling.checkpoint("历史数据载入")
+    unsaved = 0
+    pool = TabPool(page, size=tabs)
+
+    def crawl(items):
+        nonlocal unsaved
+        todo = [it for it in items if it["url"] not in processed_urls]
+        for item, detail, error in pool.run(fetch_detail, todo):
+            if error:
+                # 打开 / 解析失败：不入库、不记为已处理，下次运行再抓
+                print(f"   ❌ {item['title'][:15]}: {error}")
+                continue
+            print(f"   Downloaded: {item['title'][:15]}...")
             try:
-                new_tab = page.new_tab(item["url"])
-                new_tab.ele('#zoom', timeout=8)
-
-                detail = extract_detail(new_tab)
-                new_tab.close()
-
                 row_base = {
                     "标题": item["title"],
                     "链接": item["url"],
@@ -199,60 +469,87 @@ def main():
                     "正文": detail.get("正文", "")
                 }
 
-                current_data = []
-                if detail["附件"]:
-                    for att in detail["附件"]:
-                        row = row_base.copy()
-                        row["附件文件名"] = att["文件名"]
-                        row["附件链接"] = att["链接"]
-                        current_data.append(row)
-                else:
-                    row_base["附件文件名"] = ""
-                    row_base["附件链接"] = ""
-                    current_data.append(row_base)
+                # 文档一行 + 附件另存，按链接关联
+                store.save("ningbo", doc_key(item["url"]), row_base)
+                store.save_attachments(item["url"], detail.get("附件", []))
 
                 processed_urls.add(item["url"])
-                save_to_excel(current_data, OUTPUT_FILE)
-                time.sleep(0.05)
+                unsaved += 1
+                if unsaved >= SAVE_INTERVAL:
+                    save_to_excel(store, output_file)
+                    unsaved = 0
             except Exception as e:
                 print(f"   ❌: {e}")
-                if page.tabs_count > 1: page.close_tabs(page.tab_ids[1:])
 
-                # 3. 翻页 (v10.0: 傻瓜式强制休眠)
-        print("👆 翻页中...")
-        try:
-            # 锁定右侧
-            right_box = page.ele('.right-box')
-            if right_box:
-                next_btn = right_box.ele('.layui-laypage-next')
+    # 1. 列表直取 (并发枚举所有列表页)
+    try:
+        all_links = discover_list(page)
+    except Exception as e:
+        print(f"⚠️ 列表数据源探测失败: {e}")
+        all_links = None
+
+    if all_links is not None:
+        new_links = [it for it in all_links if it["url"] not in processed_urls]
+        print(f"   📄 列表共 {len(all_links)} 篇，其中新文章 {len(new_links)} 篇")
+        crawl(new_links)
+    else:
+        # 2. 回退：点击翻页，等列表内容变化后再扫 (不再固定休眠)
+        print("⚠️ 未找到可直接请求的列表数据源，回退到点击翻页")
+        page_num = 1
+        empty_page_count = 0
+        while True:
+            print(f"\n🔄 正在处理第 {page_num} 页...")
+            try:
+                page.wait.ele_displayed('tag:a', timeout=PAGE_WAIT_TIMEOUT)
+            except Exception:
+                pass
+
+            page_links = scan_page_links(page)
+            unique_links = [it for it in page_links if it["url"] not in processed_urls]
+            if not unique_links:
+                print("⚠️ 本页未发现新数据。")
+                empty_page_count += 1
+                if empty_page_count >= 3:
+                    print("🛑 连续 3 页无数据，判断为结束。")
+                    break
             else:
-                next_btn = page.ele('.layui-laypage-next')
+                print(f"   📄 筛选出 {len(unique_links)} 篇新文章")
+                empty_page_count = 0
+
+            crawl(unique_links)
 
-            if next_btn:
-                # 检查禁用
+            print("👆 翻页中...")
+            try:
+                next_btn = find_next_button(page)
+                if not next_btn:
+                    print("🛑 未找到翻页按钮，结束。")
+                    break
                 class_val = next_btn.attr("class")
                 if class_val and "disabled" in class_val:
                     print(f"🛑 按钮变灰，抓取结束 (共 {page_num} 页)")
                     break
 
-                # 🌟 关键修改：使用 JS 点击 + 强制休眠
-                # 这种方式最无脑，但也最稳
                 next_btn.click(by_js=True)
-
-                print("   ⏳ 等待页面刷新 (3秒)...")
-                time.sleep(3)
-
-                print("   ✅ 假定翻页成功，继续下一轮")
+                if not wait_list_change(page, {it["url"] for it in page_links}):
+                    print(f"🛑 翻页后 {PAGE_WAIT_TIMEOUT} 秒列表没有变化，结束 (共 {page_num} 页)")
+                    break
                 page_num += 1
-            else:
-                print("🛑 未找到翻页按钮，结束。")
+            except Exception as e:
+                print(f"🛑 翻页流程出错: {e}")
                 break
 
-        except Exception as e:
-            print(f"🛑 翻页流程出错: {e}")
-            break
-
-    print(f"\n🎉 完成！文件: {OUTPUT_FILE}")
+    pool.close()
+    profiling.checkpoint("列表和详情抓完")
+    save_to_excel(store, output_file)
+    profiling.checkpoint("Excel 导出")
+    if download:
+        download_stage(store)
+        profiling.checkpoint("附件下载")
+        save_to_excel(store, output_file)  # 补上本地文件路径
+    if own_store:
+        store.close()
+
+    print(f"\n🎉 完成！文件: {output_file}")
 
 
 if __name__ == "__main__":
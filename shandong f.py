@@ -1,21 +1,27 @@
 # -*- coding: utf-8 -*-
 from DrissionPage import ChromiumPage, ChromiumOptions
-import pandas as pd
 import time
 import os
 import re
 from bs4 import BeautifulSoup
-from datetime import datetime
-from openpyxl import load_workbook, Workbook
-from urllib.parse import urlencode, quote
-import sys
+from urllib.parse import urlencode
 import shutil
 import math
 
+from taxcrawl.store import PolicyStore, to_row
+from taxcrawl.export import export_excel
+from taxcrawl.browser import TabPool
+from taxcrawl.sessions import SessionVault
+from taxcrawl.frontier import Frontier
+from taxcrawl.importer import import_workbook
+from taxcrawl.sweep import apply_status
+from taxcrawl import profiling
+
 # ================= 🔧 配置区域 =================
 API_URL_BASE = "https://shandong.chinatax.gov.cn/module/web/jpage/dataproxy.jsp"
 HOME_URL = "https://shandong.chinatax.gov.cn/col/col1053/index.html?number=A0301"
 BASE_URL = "https://shandong.chinatax.gov.cn"
+HOST = "shandong.chinatax.gov.cn"
 
 COLUMN_ID = 1053
 UNIT_ID = 48166
@@ -24,6 +30,16 @@ UNIT_ID = 48166
 FILE_NAME = "山东税务_全量数据.xlsx"
 VERSION = "v21.0 (直接导航 + 双重分页参数)"
 
+COLUMNS = ["标题", "发文机构", "发文字号", "发文日期", "有效性", "是否涉税法律", "正文内容", "链接"]
+SAVE_INTERVAL = 50  # 每入库多少条导出一次 Excel
+
+# 无界面模式 (Linux 服务器 / 定时任务)
+HEADLESS = False
+BROWSER_PORT = 9224  # 各站点用不同端口，可同时开两个浏览器
+TABS = 2  # 详情页并行标签页数 (防火墙较严，别开太多)
+MAX_RECORDS = 3000  # 列表最多翻到第几条
+BATCH_SIZE = 45  # dataproxy 每个窗口的条数
+
 
 # ================= 📂 自动化文件管理 =================
 
@@ -47,34 +63,40 @@ def init_or_check_excel(filepath):
     else:
         print("🆕 [检测结果] 文件不存在。")
         print("   -> 模式：【全新抓取】")
-        wb = Workbook()
-        ws = wb.active
-        ws.append(["标题", "发文机构", "发文字号", "发文日期", "有效性", "是否涉税法律", "正文内容", "链接"])
-        wb.save(filepath)
 
 
-def get_history_links(filepath):
-    """读取历史链接"""
-    if not os.path.exists(filepath): return set()
-    try:
-        df = pd.read_excel(filepath, engine="openpyxl", usecols=["链接"])
-        return set(df["链接"].dropna().astype(str).tolist())
-    except:
-        return set()
+def doc_key(url):
+    return f"shandong:{url}"
+
+
+def get_history_links(filepath, store):
+    """读取历史链接 (库里没有山东数据时先把旧 Excel 导入一次)"""
+    if os.path.exists(filepath) and not store.count("shandong"):
+        try:
+            import_workbook(filepath, store, site="shandong")
+        except Exception as e:
+            print(f"❌ 读取历史存档失败: {e}")
+    return {k[len("shandong:"):] for k in store.keys("shandong")}
 
 
-def save_row_immediately(row_data, filepath):
-    """实时写入"""
+def save_row_immediately(row_data, store):
+    """实时入库 (Excel 由 export_to_excel 批量导出)"""
     try:
-        wb = load_workbook(filepath)
-        ws = wb.active
-        ws.append(list(row_data.values()))
-        wb.save(filepath)
+        store.save("shandong", doc_key(row_data["链接"]), row_data)
         print(".", end="", flush=True)
+    except Exception as e:
+        print(f"\n❌ 写入失败: {e}")
+
+
+def export_to_excel(store, filepath):
+    try:
+        rows = (("Sheet", to_row(d, COLUMNS)) for d in store.iter_documents("shandong"))
+        n = export_excel(filepath, {"Sheet": COLUMNS}, rows)
+        print(f"\n💾 已导出 {n['Sheet']} 条 -> {filepath}")
     except PermissionError:
         print(f"\n🚨 [严重] 文件被占用！请关闭桌面的 Excel 文件！")
     except Exception as e:
-        print(f"\n❌ 写入失败: {e}")
+        print(f"\n❌ 导出失败: {e}")
 
 
 # ================= 🧠 提取逻辑 =================
@@ -138,7 +160,7 @@ def extract_detail(page, url):
                         info['发文字号'] = tds[i + 1].get_text(strip=True)
                     if not info['发文日期'] and ('日期' in txt) and i + 1 < len(tds):
                         info['发文日期'] = tds[i + 1].get_text(strip=True)
-                    if not info['有效性'] and '有效性' in txt and i + 1 < len(tds):
+                    if info['有效性'] == "未注明" and '有效性' in txt and i + 1 < len(tds):
                         info['有效性'] = tds[i + 1].get_text(strip=True)
                     if '是否涉税法律' in txt and i + 1 < len(tds):
                         info['是否涉税法律'] = tds[i + 1].get_text(strip=True)
@@ -163,10 +185,10 @@ def extract_detail(page, url):
         # 正文
         content_div = soup.find(id='zoom') or soup.find(class_='TRS_Editor')
         if content_div:
-            info['正文内容'] = content_div.get_text(strip=True)[:30000]
+            info['正文内容'] = content_div.get_text(strip=True)
         else:
             div3 = soup.find('div', class_='main_content3')
-            if div3: info['正文内容'] = div3.get_text(strip=True)[:30000]
+            if div3: info['正文内容'] = div3.get_text(strip=True)
 
         print(f"  [ok] {info['标题'][:10]}... | 涉税:{info['是否涉税法律']}")
         return info
@@ -176,76 +198,187 @@ def extract_detail(page, url):
         return None
 
 
+def fetch_detail(tab, item):
+    """标签页池里执行：抓 item = (标题, 链接) 的详情；解析失败抛异常，计入标签页失败数"""
+    detail = extract_detail(tab, item[1])
+    if not detail:
+        raise RuntimeError("详情页解析失败")
+    return detail
+
+
+def list_url(start_rec, end_rec, batch_size):
+    """dataproxy.jsp 的一个窗口 (第 start_rec 到 end_rec 条)"""
+    # 【核心修复】计算页码：TRS系统有时依赖page参数
+    # start=1 -> page=1, start=46 -> page=2
+    page_num = math.ceil(start_rec / batch_size)
+    # 包含了所有可能的参数，确保分页生效
+    params = {
+        "col": "1",
+        "appid": "1",
+        "webid": "1",
+        "path": "/",
+        "columnid": str(COLUMN_ID),
+        "unitid": str(UNIT_ID),
+        "webname": "国家税务总局山东省税务局",
+        "permissiontype": "0",
+        "page": str(page_num),  # 显式指定页码
+        "startrecord": str(start_rec),  # 显式指定起始行
+        "endrecord": str(end_rec)  # 显式指定结束行
+    }
+    return f"{API_URL_BASE}?{urlencode(params)}"
+
+
+def open_browser(headless):
+    co = ChromiumOptions()
+    co.set_user_agent(
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    co.set_argument('--blink-settings=imagesEnabled=false')
+    co.ignore_certificate_errors()
+    co.set_local_port(BROWSER_PORT)
+    if headless:
+        co.headless(True)
+        co.set_argument('--no-sandbox')
+    page = ChromiumPage(addr_or_opts=co)
+
+    # 上次的防火墙放行 cookie 还有效就直接开抓，否则先过一遍首页
+    vault = SessionVault()
+    if not vault.restore(page, HOST, list_url(1, 1, BATCH_SIZE)):
+        print(f"🌐 初始化: {HOME_URL}")
+        page.get(HOME_URL)
+        time.sleep(2)
+    return page, vault
+
+
+# ================= 🔍 有效性巡检 =================
+def read_status(tab, url):
+    """只取 xxgkbg 表里的有效性 (表里没有再看正文区的 "有效性：")，不解析正文"""
+    tab.get(url, timeout=10)
+    if "安全检查" in tab.title:
+        time.sleep(5)
+    table = tab.ele('#xxgkbg', timeout=3)
+    if table:
+        tds = BeautifulSoup(table.html, 'html.parser').find_all('td')
+        for i, td in enumerate(tds):
+            if '有效性' in td.get_text(strip=True) and i + 1 < len(tds):
+                return tds[i + 1].get_text(strip=True)
+    main_div = tab.ele('.main_content', timeout=1)
+    if main_div:
+        return safe_re_extract(r"有效性[：:]\s*(.*?)(?:\s|$)", main_div.text)
+    return ""
+
+
+def sweep_status(headless=None, store=None, tabs=None):
+    """库里每篇山东文件重读一次有效性，变了的只改有效性；返回 taxcrawl.sweep.Change 列表"""
+    headless = HEADLESS if headless is None else headless
+    own_store = store is None
+    store = store or PolicyStore()
+    known = store.statuses("shandong")
+    urls = [k[len("shandong:"):] for k in known]
+    print(f"🔍 山东有效性巡检: {len(urls)} 篇")
+
+    page, vault = open_browser(headless)
+    changes = []
+    with TabPool(page, size=tabs or TABS) as pool:
+        for url, status, error in pool.run(read_status, urls):
+            if error:
+                print(f"\n    ❌ {url}: {error}")
+                continue
+            change = apply_status(store, doc_key(url), status, known)
+            if change:
+                changes.append(change)
+    vault.capture(page, HOST)
+    if own_store:
+        store.close()
+    return changes
+
+
 # ================= 🚀 主程序 =================
-def main():
+def main(output_file=None, headless=None, store=None, tabs=None):
+    headless = HEADLESS if headless is None else headless
+    tabs = tabs or TABS
     print(f"🚀 启动采集器 - {VERSION}")
 
-    # 1. 自动获取桌面路径
-    save_path = get_desktop_path()
+    # 1. 自动获取桌面路径 (命令行可用 --out 指定)
+    save_path = output_file or get_desktop_path()
 
     # 2. 初始化检查
     init_or_check_excel(save_path)
 
     # 3. 读取断点
-    processed_urls = get_history_links(save_path)
+    own_store = store is None
+    store = store or PolicyStore()
+    processed_urls = get_history_links(save_path, store)
+    unsaved = 0
     print(f"📚 历史记录: {len(processed_urls)} 条 (将自动跳过)")
-
-    # 4. 浏览器
-    co = ChromiumOptions()
-    co.set_user_agent(
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    co.set_argument('--blink-settings=imagesEnabled=false')
-    co.ignore_certificate_errors()
-    page = ChromiumPage(addr_or_opts=co)
-
-    print(f"🌐 初始化: {HOME_URL}")
-    page.get(HOME_URL)
-    time.sleep(2)
-
-    BATCH_SIZE = 45
+    profiling.checkpoint("历史数据载入")
+
+    # 4. 浏览器 (先恢复上次的会话)
+    page, vault = open_browser(headless)
+    pool = TabPool(page, size=tabs)
+    session_saved = False
+
+    def crawl(todo):
+        """详情页分给标签页池并行抓，返回 (新入库条数, 没抓成的 (标题, 链接))"""
+        nonlocal unsaved
+        new_count, failed = 0, []
+        for (title, full_url), detail_data, error in pool.run(fetch_detail, todo):
+            if error:
+                print(f"\n    ❌ {full_url}: {error}")
+                failed.append((title, full_url))
+                continue
+            if not detail_data['标题']: detail_data['标题'] = title
+            save_row_immediately(detail_data, store)
+            processed_urls.add(full_url)
+            new_count += 1
+            unsaved += 1
+            if unsaved >= SAVE_INTERVAL:
+                export_to_excel(store, save_path)
+                unsaved = 0
+        return new_count, failed
+
+    # 断点：上次停在哪个窗口、还有哪些详情没抓完
+    frontier = Frontier(store, "shandong", fingerprint={"columnid": COLUMN_ID, "batch": BATCH_SIZE})
+    start_rec = frontier.cursor or 1
+    retry = []  # 没抓成的详情一直留在 pending 里，直到抓成或这一轮走完
+    if frontier.cursor:
+        print(f"⏩ 从上次的位置继续: 第 {start_rec} 条起 (待补详情 {len(frontier.pending)} 条)")
+        _, retry = crawl([p for p in frontier.pending if p[1] not in processed_urls])
+        frontier.checkpoint(start_rec, retry)
 
     # 抓取循环 (从第1条到第3000条)
-    for start_rec in range(1, 3000, BATCH_SIZE):
+    blocked = 0
+    while start_rec < MAX_RECORDS:
         end_rec = start_rec + BATCH_SIZE - 1
-
-        # 【核心修复】计算页码：TRS系统有时依赖page参数
-        # start=1 -> page=1, start=46 -> page=2
         page_num = math.ceil(start_rec / BATCH_SIZE)
 
         print(f"\n🔄 请求区间: {start_rec} - {end_rec} (第 {page_num} 页)")
 
         # 【核心修复】构造完整的 URL，直接让浏览器跳转过去！
-        # 包含了所有可能的参数，确保分页生效
-        params = {
-            "col": "1",
-            "appid": "1",
-            "webid": "1",
-            "path": "/",
-            "columnid": str(COLUMN_ID),
-            "unitid": str(UNIT_ID),
-            "webname": "国家税务总局山东省税务局",
-            "permissiontype": "0",
-            "page": str(page_num),  # 显式指定页码
-            "startrecord": str(start_rec),  # 显式指定起始行
-            "endrecord": str(end_rec)  # 显式指定结束行
-        }
-
-        full_api_url = f"{API_URL_BASE}?{urlencode(params)}"
+        full_api_url = list_url(start_rec, end_rec, BATCH_SIZE)
 
         # 让浏览器直接访问 XML 接口
         page.get(full_api_url)
         xml_text = page.html  # 获取页面内容
 
         if not xml_text or "wzws" in xml_text:
-            print("⚠️ 防火墙拦截，暂停5秒...")
+            blocked += 1
+            if blocked >= 3:
+                print("🛑 连续 3 次被防火墙拦截，先停下 (下次从这个窗口继续)")
+                break
+            print("⚠️ 防火墙拦截，暂停5秒后重试本窗口...")
             time.sleep(5)
             continue
+        blocked = 0
+        if not session_saved:
+            vault.capture(page, HOST)  # 已经放行：存下 cookie，下次启动直接用
+            session_saved = True
 
         pattern = r'<record><!\[CDATA\[(.*?)\]\]></record>'
         matches = re.findall(pattern, xml_text, re.DOTALL)
 
         if not matches:
             print(f"🏁 本页无数据 (抓取结束)。")
+            frontier.clear()
             break
 
         print(f"   📄 发现 {len(matches)} 条")
@@ -255,7 +388,7 @@ def main():
             print("⚠️ 严重警告：服务器依然返回全部数据（分页彻底失效）。")
             print("   -> 正在启动【强制跳过】模式，直到找到新数据为止...")
 
-        new_count = 0
+        todo = []
         for html_snippet in matches:
             soup = BeautifulSoup(html_snippet, 'html.parser')
             link_tag = soup.find('a')
@@ -265,28 +398,31 @@ def main():
             href = link_tag.get('href')
             full_url = BASE_URL + href if href.startswith('/') else href
 
-            # 断点跳过
-            if full_url in processed_urls:
+            # 断点跳过 (同一窗口里重复的、待补的也只抓一次)
+            if full_url in processed_urls or any(full_url == u for _, u in todo + retry):
                 continue
+            todo.append((title, full_url))
 
-            print(f"   Downloading: {title[:15]}...", end="")
-
-            detail_data = extract_detail(page, full_url)
-
-            if detail_data:
-                if not detail_data['标题']: detail_data['标题'] = title
-                save_row_immediately(detail_data, save_path)
-                processed_urls.add(full_url)
-                new_count += 1
-
-            # 抓完详情页后，休息一下
-            time.sleep(0.1)
+        # 先记下本窗口待抓的详情，再开抓；抓完游标前移，没抓成的继续留在 pending
+        frontier.checkpoint(start_rec, retry + todo)
+        new_count, failed = crawl(todo)
+        retry += failed
+        start_rec += BATCH_SIZE
+        frontier.checkpoint(start_rec, retry)
 
         if len(matches) > 0 and new_count == 0:
             print("   (本页数据已全部存在，跳过)")
         elif new_count > 0:
             print(f"   (本页新增入库 {new_count} 条)")
-
+    else:
+        frontier.clear()  # 到了记录上限，这一轮也算走完
+
+    pool.close()
+    profiling.checkpoint("列表和详情抓完")
+    export_to_excel(store, save_path)
+    profiling.checkpoint("Excel 导出")
+    if own_store:
+        store.close()
     print(f"\n🎉 全部完成！")
     print(f"📁 文件位置: {save_path}")
 
@@ -6,6 +6,7 @@
 - 按税种分类使用静态列表页（index.html, index_1.html, ...）
 - 所有税种合并到 "按税种分类" Sheet
 - 自动断点续抓（跳过已抓链接）
+- 链接规范化 + 文章 id 去重：同一篇在多个栏目/税种目录出现只抓一次详情
 """
 
 import os
@@ -13,14 +14,21 @@ import re
 import time
 import math
 import traceback
-import pandas as pd
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from bs4 import BeautifulSoup
 import asyncio  # 导入 asyncio
+import contextlib
 import httpx  # 导入 httpx 替代 requests
 
+from taxcrawl.store import PolicyStore, to_row
+from taxcrawl.urls import canonical_url, dedup_key
+from taxcrawl.importer import import_workbook
+from taxcrawl.export import export_excel
+from taxcrawl import profiling
+from taxcrawl.client import make_client
+
 # ========== 用户配置 ==========
-OUTPUT_FILE = r"C:\Users\锦\Desktop\上海税收政策.xlsx"
+OUTPUT_FILE = os.path.join(os.path.expanduser("~"), "Desktop", "上海税收政策.xlsx")
 BASE_DOMAIN = "https://shanghai.chinatax.gov.cn"
 WAS_SEARCH_URL = BASE_DOMAIN + "/was5/web/search"
 CHANNEL_ID = "123952"  # 源码中政策法规库使用的 channelid
@@ -53,12 +61,10 @@ SHEET_ORDER = ["国务院文件", "总局文件", "市政府文件", "市局文
 # ========== 内部函数 ==========
 
 def norm_link(href, base):
-    """使用 urljoin 将相对链接转换为绝对链接"""
+    """使用 urljoin 将相对链接转换为绝对链接 (抓取用原样地址；规范化只用于入库键和去重，见 doc_key / take_new)"""
     if not href:
         return ""
-    href = href.strip()
-    full_url = urljoin(base, href)
-    return full_url
+    return urljoin(base, href.strip())
 
 
 def parse_was_xml(xml_text):
@@ -213,54 +219,73 @@ async def fetch_detail(client, semaphore, url):
 
 
 # ========== 主流程 ==========
-def load_existing_links(output_file):
-    """如果 Excel 已存在，读取所有 sheet 的链接（无需修改）"""
-    existing = set()
-    if os.path.exists(output_file):
+COLUMNS = ["标题", "链接", "文号", "发布日期", "发文单位", "栏目", "正文"]
+
+
+def doc_key(url):
+    return f"shanghai:{canonical_url(url)}"
+
+
+def sheet_of(rec):
+    """四大栏目各占一个 Sheet，其余 (税种目录) 都归到 "按税种分类" Sheet"""
+    return rec["栏目"] if rec.get("栏目") in EXTRASQL_MAP else "按税种分类"
+
+
+def load_existing_links(output_file, store):
+    """
+    已抓文章的去重键集合 (见 taxcrawl.urls.dedup_key)，以库为准；
+    库里还没有上海数据时，先把已有 Excel 的所有 sheet 导入一次
+    """
+    if os.path.exists(output_file) and not store.count("shanghai"):
         try:
-            xls = pd.read_excel(output_file, sheet_name=None, engine="openpyxl")
-            for sheet, df in xls.items():
-                if "链接" in df.columns:
-                    existing.update(df["链接"].dropna().astype(str).tolist())
-            print(f"[断点续抓] 读取已有链接 {len(existing)} 条")
+            import_workbook(output_file, store, site="shanghai")
         except Exception as e:
             print(f"[读取现有 Excel 失败] {e}")
+    existing = {dedup_key(k[len("shanghai:"):]) for k in store.keys("shanghai")}
+    print(f"[断点续抓] 读取已有链接 {len(existing)} 条")
     return existing
 
 
-def save_to_excel(grouped_records, output_file):
-    """按 sheet 写入 Excel（无需修改）"""
-    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-        for sheet in SHEET_ORDER:
-            recs = grouped_records.get(sheet, [])
-            if not recs:
-                pd.DataFrame(columns=["标题", "链接", "文号", "发布日期", "发文单位", "栏目", "正文"]).to_excel(writer,
-                                                                                                                sheet_name=sheet[
-                                                                                                                    :31],
-                                                                                                                index=False)
-            else:
-                df = pd.DataFrame(recs)
-                cols = ["标题", "链接", "文号", "发布日期", "发文单位", "栏目", "正文"]
-                for c in cols:
-                    if c not in df.columns:
-                        df[c] = ""
-                df = df[cols]
-                df.to_excel(writer, sheet_name=sheet[:31], index=False)
-    print(f"[保存完成] {output_file}")
+def take_new(candidates, seen):
+    """
+    过滤掉已抓 / 本轮已排队的条目 (跨 sheet 也算)，并把新条目登记进 seen。
+    详情抓取前调用，同一篇不会被下载两次
+    """
+    fresh = []
+    for it in candidates:
+        key = dedup_key(it["链接"]) if it["链接"] else ""
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        fresh.append(it)
+    return fresh
+
 
+def save_to_excel(store, output_file):
+    """从库里流式导出，各 sheet 一趟写完"""
+    rows = ((sheet_of(r), r) for r in (to_row(d, COLUMNS) for d in store.iter_documents("shanghai")))
+    counts = export_excel(output_file, {sheet: COLUMNS for sheet in SHEET_ORDER}, rows)
+    print(f"[保存完成] {output_file} {counts}")
 
-async def main():
+
+async def main(output_file=None, client=None, store=None):
+    output_file = output_file or OUTPUT_FILE
     start = time.time()
-    existing_links = load_existing_links(OUTPUT_FILE)
-    grouped = {k: [] for k in SHEET_ORDER}
+    own_store = store is None
+    store = store or PolicyStore()
+    existing_links = load_existing_links(output_file, store)
+    profiling.checkpoint("历史数据载入")
 
     semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
     }
 
-    # verify=False 忽略 SSL 证书错误
-    async with httpx.AsyncClient(headers=headers, follow_redirects=True, verify=False) as client:
+    # 调度器会传入共享连接池；单独跑时用按域名配好的连接池 (忽略证书错误；装了 h2 时 200 个并发请求
+    # 复用几条 HTTP/2 连接，不再各自握手)
+    own_client = client is None
+    client_ctx = contextlib.nullcontext(client) if client else make_client(headers=headers, follow_redirects=True)
+    async with client_ctx as client:
 
         # ---------- 1) 四大栏目：通过 WAS 接口抓取（带分页） ----------
         print("开始抓取四大栏目（WAS 接口）...")
@@ -272,16 +297,11 @@ async def main():
                 recs, pagecount, recordcount = await was_fetch_list(client, extrasql, page=page)
                 if not recs:
                     break
-                items = []
-                for r in recs:
-                    url = r.get("URL") or ""
-                    if not url or url in existing_links:
-                        continue
-                    items.append({
-                        "标题": r.get("TITLE") or "", "链接": url, "文号": r.get("WH") or "",
-                        "发布日期": r.get("PRINTTIME") or "", "发文单位": r.get("FWDW") or "",
-                        "栏目": sheet_name, "正文": ""
-                    })
+                items = take_new(({
+                    "标题": r.get("TITLE") or "", "链接": r.get("URL") or "", "文号": r.get("WH") or "",
+                    "发布日期": r.get("PRINTTIME") or "", "发文单位": r.get("FWDW") or "",
+                    "栏目": sheet_name, "正文": ""
+                } for r in recs), existing_links)
 
                 if items:
                     tasks = []
@@ -296,8 +316,7 @@ async def main():
                         it["文号"] = it["文号"] or detail.get("文号", "")
                         it["发文单位"] = it["发文单位"] or detail.get("发文单位", "")
                         it["发布日期"] = it["发布日期"] or detail.get("发布日期", "")
-                        grouped[sheet_name].append(it)
-                        existing_links.add(it["链接"])
+                        store.save("shanghai", doc_key(it["链接"]), it)
 
                 total_count += len(items)
                 print(f"    page {page} -> 采集 {len(items)} 条 (累计 {total_count})")
@@ -306,6 +325,8 @@ async def main():
                     break
                 page += 1
 
+        profiling.checkpoint("四大栏目抓完")
+
         # ---------- 2) 按税种分类：遍历各税种静态目录 ----------
         print("开始抓取按税种分类（静态目录每个子目录分页）...")
         sheet_tax = "按税种分类"  # (V4 结构)
@@ -314,15 +335,11 @@ async def main():
             print(f"  → 税种: {tax} (将存入 '{sheet_tax}' Sheet)")
             list_items = await fetch_static_list_for_path(client, tax)
 
-            to_fetch = []
-            for it in list_items:
-                if not it["链接"] or it["链接"] in existing_links:
-                    continue
-                to_fetch.append({
-                    "标题": it["标题"], "链接": it["链接"], "文号": it.get("文号", ""),
-                    "发布日期": it.get("发布日期", ""), "发文单位": it.get("发文单位", ""),
-                    "栏目": tax, "正文": ""
-                })
+            to_fetch = take_new(({
+                "标题": it["标题"], "链接": it["链接"], "文号": it.get("文号", ""),
+                "发布日期": it.get("发布日期", ""), "发文单位": it.get("发文单位", ""),
+                "栏目": tax, "正文": ""
+            } for it in list_items), existing_links)
 
             if not to_fetch:
                 print(f"    {tax} 无新增条目，跳过")
@@ -341,25 +358,27 @@ async def main():
                 rec["发文单位"] = rec["发文单位"] or d.get("发文单位", "")
                 rec["发布日期"] = rec["发布日期"] or d.get("发布日期", "")
 
-                grouped[sheet_tax].append(rec)  # (V4 结构)
-                existing_links.add(rec["链接"])
+                store.save("shanghai", doc_key(rec["链接"]), rec)  # 导出时归入 sheet_tax
 
             print(f"    {tax} 抓取完成，新增 {len(to_fetch)} 条")
 
+        if own_client:
+            client.pool_metrics.report()
+
+    profiling.checkpoint("按税种分类抓完")
+
     # ---------- 保存 Excel ----------
     print("开始写入 Excel ...")
     try:
-        save_to_excel(grouped, OUTPUT_FILE)
+        save_to_excel(store, output_file)
     except Exception as e:
-        print(f"[写入 Excel 出错] {e}\n尝试分批写入...")
-        with pd.ExcelWriter(OUTPUT_FILE, engine="openpyxl") as writer:
-            for sheet in SHEET_ORDER:
-                recs = grouped.get(sheet, [])
-                df = pd.DataFrame(recs)
-                df.to_excel(writer, sheet_name=sheet[:31], index=False)
+        print(f"[写入 Excel 出错] {e}")
+    profiling.checkpoint("Excel 导出")
+    if own_store:
+        store.close()
 
     elapsed = time.time() - start
-    print(f"全部完成，耗时 {elapsed:.1f} 秒，总计写入文件：{OUTPUT_FILE}")
+    print(f"全部完成，耗时 {elapsed:.1f} 秒，总计写入文件：{output_file}")
 
 
 if __name__ == "__main__":
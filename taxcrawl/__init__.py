@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+各地税务局爬虫的公共组件 (存储 / 导出 / 调度等)
+站点脚本本身仍是仓库根目录下的 "xxx f.py"
+"""
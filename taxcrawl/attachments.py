@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+附件下载 (asyncio + httpx)
+- 有界并发：Semaphore 控制同时在下的文件数
+- 流式写盘：按块写入并同时计算 sha256，不把整个文件读进内存
+- 内容寻址：文件按 sha256 存放 (objects/ab/abcd....pdf)，各篇共用的表格只存一份
+- 断点续传：没下完的 .part 文件下次用 HTTP Range 接着下；206 的 Content-Range 对不上就从头下
+- 读写文件放到线程里 (asyncio.to_thread)，不阻塞同一事件循环里的其他下载 / 抓取
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from urllib.parse import urlparse
+
+from taxcrawl.client import make_client
+
+CHUNK_SIZE = 64 * 1024
+CONCURRENCY = 8
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 60
+CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+def _part_path(root, url):
+    return os.path.join(root, "partial", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+
+def _object_path(root, sha256, url):
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return os.path.join(root, "objects", sha256[:2], sha256 + ext)
+
+
+def _resume_state(part):
+    """已下载部分重新喂给哈希，返回 (hasher, 已有字节数)"""
+    hasher = hashlib.sha256()
+    offset = 0
+    if os.path.exists(part):
+        with open(part, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                offset += len(chunk)
+    return hasher, offset
+
+
+def _range_start(resp):
+    """206 响应的 Content-Range 起点，没有 / 认不出返回 None"""
+    m = CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+    return int(m.group(1)) if m else None
+
+
+async def _fetch_to_part(client, url, part):
+    hasher, offset = await asyncio.to_thread(_resume_state, part)
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    async with client.stream("GET", url, headers=headers, timeout=REQUEST_TIMEOUT) as resp:
+        if offset and resp.status_code == 416:
+            # 服务器说范围不合法：.part 已经是完整文件
+            return hasher.hexdigest(), offset
+        resp.raise_for_status()
+        mode = "ab"
+        if offset and resp.status_code == 206 and _range_start(resp) != offset:
+            # 返回的不是我们要的那一段，接上去文件就坏了：丢掉 .part，重新从头下载
+            mode = None
+        elif offset and resp.status_code != 206:
+            # 不支持 Range，只能从头再来
+            hasher, offset, mode = hashlib.sha256(), 0, "wb"
+        if mode is not None:
+            f = await asyncio.to_thread(open, part, mode)
+            try:
+                async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+                    hasher.update(chunk)
+                    offset += len(chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            return hasher.hexdigest(), offset
+    await asyncio.to_thread(os.remove, part)
+    return await _fetch_to_part(client, url, part)
+
+
+def _store_object(part, dest):
+    if os.path.exists(dest):
+        os.remove(part)  # 相同内容已经有一份了
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(part, dest)
+
+
+async def download_one(client, semaphore, url, root):
+    """下载单个附件，返回 (sha256, 大小, 路径)；失败返回 None (.part 保留给下次续传)"""
+    part = _part_path(root, url)
+    await asyncio.to_thread(os.makedirs, os.path.dirname(part), exist_ok=True)
+    async with semaphore:
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                sha256, size = await _fetch_to_part(client, url, part)
+                break
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    print(f"   ❌ 附件下载失败: {url} -> {e}")
+                    return None
+                await asyncio.sleep(attempt)
+
+    dest = _object_path(root, sha256, url)
+    await asyncio.to_thread(_store_object, part, dest)
+    return sha256, size, dest
+
+
+def _pending(urls, store):
+    """去重后还需要下载的链接：库里有记录且文件还在的跳过"""
+    todo = []
+    for url in dict.fromkeys(u for u in urls if u):
+        known = store.attachment_file(url)
+        if known and os.path.exists(known["path"]):
+            continue
+        todo.append(url)
+    return todo
+
+
+async def download_attachments(urls, root, store, concurrency=CONCURRENCY, client=None):
+    """批量下载，已记录在库里且文件还在的跳过。返回 (新下载数, 去重命中数, 失败数)"""
+    todo = await asyncio.to_thread(_pending, urls, store)
+    if not todo:
+        print("📎 附件：没有需要下载的新文件")
+        return 0, 0, 0
+
+    print(f"📎 附件：待下载 {len(todo)} 个 (并发 {concurrency})")
+    semaphore = asyncio.Semaphore(concurrency)
+    seen_hashes = set()
+    done = dup = failed = 0
+
+    async def run(c):
+        nonlocal done, dup, failed
+        tasks = [asyncio.ensure_future(download_one(c, semaphore, u, root)) for u in todo]
+        for url, task in zip(todo, tasks):
+            res = await task
+            if res is None:
+                failed += 1
+                continue
+            sha256, size, path = res
+            if sha256 in seen_hashes:
+                dup += 1
+            seen_hashes.add(sha256)
+            store.save_attachment_file(url, sha256, size, path)
+            done += 1
+            if done % 20 == 0:
+                print(f"   ▶️  已下载 {done}/{len(todo)}")
+
+    if client is None:
+        async with make_client(headers=HEADERS, follow_redirects=True) as c:
+            await run(c)
+            c.pool_metrics.report()
+    else:
+        await run(client)
+
+    print(f"📎 附件完成：成功 {done} (其中内容重复 {dup})，失败 {failed}")
+    return done, dup, failed
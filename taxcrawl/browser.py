@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+浏览器标签页池 (DrissionPage)
+- 一个浏览器里常驻 N 个标签页，每个标签页一个线程，详情页并行抓
+- 标签页抓满 recycle_after 页 (或 JS 堆超过 max_heap_mb) 就关掉换新的，防止越跑越占内存
+- 结束时打印每个标签页的吞吐量
+- func 抛异常算该条失败 (计入失败数)；回收时开不出新标签页，该线程退出，剩下的由其他标签页做完，
+  一个都不剩时 run() 抛 RuntimeError，不会悄悄少产出
+
+用法:
+    pool = TabPool(page, size=4)
+    for item, result, error in pool.run(fetch, items):   # fetch(tab, item) 在工作线程里执行
+        ...                                               # 结果回到调用线程，入库 / 导出都在这里做
+    pool.close()    # 关掉所有标签页并打印各标签页吞吐量
+
+标签页在多次 run() 之间保留 (常驻)，不用每批重开。
+"""
+
+import queue
+import threading
+import time
+
+RECYCLE_AFTER = 200
+MAX_HEAP_MB = 512
+
+_DONE = object()
+
+
+def _drain(q):
+    while True:
+        try:
+            yield q.get_nowait()
+        except queue.Empty:
+            return
+
+
+class TabStats:
+    def __init__(self, slot):
+        self.slot = slot
+        self.pages = 0
+        self.errors = 0
+        self.recycles = 0
+        self.busy = 0.0
+        self.since_recycle = 0
+
+    def line(self, elapsed):
+        rate = self.pages / elapsed * 60 if elapsed else 0
+        avg = self.busy / self.pages if self.pages else 0
+        return (f"  标签页#{self.slot}: {self.pages} 页 ({rate:.1f} 页/分钟, 平均 {avg:.2f} 秒/页), "
+                f"失败 {self.errors}, 回收 {self.recycles} 次")
+
+
+class TabPool:
+    def __init__(self, page, size=4, recycle_after=RECYCLE_AFTER, max_heap_mb=MAX_HEAP_MB):
+        self.page = page
+        self.size = max(1, size)
+        self.recycle_after = recycle_after
+        self.max_heap_mb = max_heap_mb
+        self.stats = [TabStats(i + 1) for i in range(self.size)]
+        self.tabs = [None] * self.size
+        self._started = None
+        self._lost = []  # 本轮 run() 里回收失败的 (标签页号, 异常)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _heap_mb(self, tab):
+        try:
+            used = tab.run_js("return performance.memory ? performance.memory.usedJSHeapSize : 0")
+            return (used or 0) / 1e6
+        except Exception:
+            return 0
+
+    def _new_tab(self):
+        return self.page.new_tab()
+
+    def _close_tab(self, slot):
+        try:
+            if self.tabs[slot] is not None: self.tabs[slot].close()
+        except Exception:
+            pass
+        self.tabs[slot] = None
+
+    def _worker(self, slot, func, tasks, results):
+        stats = self.stats[slot]
+        try:
+            while True:
+                item = tasks.get()
+                if item is _DONE:
+                    return
+                start = time.time()
+                try:
+                    results.put((item, func(self.tabs[slot], item), None))
+                except Exception as e:
+                    stats.errors += 1
+                    results.put((item, None, e))
+                stats.pages += 1
+                stats.busy += time.time() - start
+                stats.since_recycle += 1
+                if stats.since_recycle >= self.recycle_after or \
+                        (self.max_heap_mb and self._heap_mb(self.tabs[slot]) > self.max_heap_mb):
+                    self._close_tab(slot)
+                    try:
+                        self.tabs[slot] = self._new_tab()
+                    except Exception as e:
+                        # 开不出新标签页就退出，剩下的任务由其他标签页做完 (都退出了由 run() 报错)
+                        self._lost.append((stats.slot, e))
+                        return
+                    stats.recycles += 1
+                    stats.since_recycle = 0
+        finally:
+            results.put(_DONE)
+
+    def run(self, func, items):
+        """把 items 分给各标签页执行 func(tab, item)，按完成顺序产出 (item, 结果, 异常或 None)"""
+        items = list(items)
+        if not items:
+            return
+        if self._started is None:
+            self._started = time.time()
+        tasks, results = queue.Queue(), queue.Queue()
+        self._lost = []
+        for item in items:
+            tasks.put(item)
+        workers = min(self.size, len(items))
+        for _ in range(workers):
+            tasks.put(_DONE)
+        # 标签页在调用线程里开好 (已开的直接复用)，开不出来直接报错
+        for slot in range(workers):
+            if self.tabs[slot] is None:
+                self.tabs[slot] = self._new_tab()
+        threads = [threading.Thread(target=self._worker, args=(slot, func, tasks, results), daemon=True)
+                   for slot in range(workers)]
+        for t in threads:
+            t.start()
+        finished = 0
+        while finished < workers:
+            out = results.get()
+            if out is _DONE:
+                finished += 1
+            else:
+                yield out
+        for t in threads:
+            t.join()
+        left = [item for item in _drain(tasks) if item is not _DONE]
+        if left:
+            slot, error = self._lost[-1]
+            raise RuntimeError(f"标签页都开不出来了 (最后是 #{slot})，还有 {len(left)} 条没抓") from error
+
+    def close(self):
+        for slot in range(self.size):
+            self._close_tab(slot)
+        if self._started is not None:
+            self.report()
+
+    def report(self):
+        elapsed = time.time() - self._started if self._started else 0
+        total = sum(s.pages for s in self.stats)
+        print(f"\n📊 标签页池: {self.size} 个标签页, 共 {total} 页, "
+              f"{total / elapsed * 60 if elapsed else 0:.1f} 页/分钟")
+        for s in self.stats:
+            print(s.line(elapsed))
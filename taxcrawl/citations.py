@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+引用关系图：从正文里抽出引用的文号，预先算好存进库
+- 关系：cites (引用/依据)、amends (修改)、abolishes (废止/失效)
+- citations 表按 (引用方) 和 (被引文号) 两个方向都建了索引：
+  "这份文件引用了谁" 和 "谁引用 / 修改 / 废止了这份文件" 都是一次索引查询，不用全文扫描
+- 增量：只处理内容哈希变了的文档
+
+    python -m taxcrawl cite build
+    python -m taxcrawl cite show 财税〔2019〕13号
+"""
+
+import re
+import time
+
+from taxcrawl.normalize import YEAR_BRACKETS, YEAR_BRACKETS_CLOSE, doc_no_prefix, normalize_doc_no
+
+# 正文里的文号：前缀先多吃一些汉字，再用已知发文字 / 停用词切掉 "根据"、"按照" 之类
+TEXT_NO_RE = re.compile(
+    rf"([一-龥 　]{{1,40}}){YEAR_BRACKETS}\s*([0-9０-９]{{4}})\s*{YEAR_BRACKETS_CLOSE}\s*第?\s*([0-9０-９]+)\s*号"
+    r"|([一-龥 　、]{1,60}?(?:公告|通告|令))\s*(?:([0-9０-９]{4})\s*年)?\s*第\s*([0-9０-９]+)\s*号")
+
+# 文号前面常见的词：切到这些词后面
+STOP_WORDS = r"根据|按照|依据|依照|参照|参见|执行|废止|修改|修订|规定|印发|转发|见|及|或|的|对|将|由|经|即|如|为|是|以|了|按"
+STOP_RE = re.compile(rf".*(?:{STOP_WORDS})")
+# 已知发文字前面只能是这些 (否则 "京财税" 会被认成 "财税")
+CONNECTOR_RE = re.compile(rf"(?:{STOP_WORDS}|和|与)$")
+MAX_PREFIX = 30
+
+# "详见 / 参见" 多出现在注释里 ("此处废止，详见《…》")：本文被那份文件改了，不是本文去废止它
+CITE_RE = re.compile(r"根据|按照|依据|依照|参照|详见|参见")
+ABOLISH_RE = re.compile(r"废止|停止执行|失效|作废|不再执行|予以撤销")
+AMEND_RE = re.compile(r"修改|修订|修正|调整为|补充")
+SENTENCE_END_RE = re.compile(r"[。；;\n]")
+CONTEXT_CHARS = 60
+
+RELATIONS = ("cites", "amends", "abolishes")
+
+
+def known_prefixes(doc_nos):
+    """库里已有文号的发文字部分，长的优先匹配"""
+    prefixes = {doc_no_prefix(normalize_doc_no(n)) for n in doc_nos if n}
+    return sorted((p for p in prefixes if len(p) >= 2), key=len, reverse=True)
+
+
+def trim_prefix(raw, known=()):
+    raw = re.sub(r"[\s　、]", "", raw)
+    for p in known:
+        head = raw[:-len(p)]
+        if raw.endswith(p) and (not head or CONNECTOR_RE.search(head)):
+            return p
+    tail = re.sub(r"^[和与]", "", STOP_RE.sub("", raw))
+    return tail[-MAX_PREFIX:]
+
+
+def _prefix_start(m, group, prefix):
+    """trim_prefix 切下来的发文字在原文里的起点 (前缀组会多吃进 "废止"、"详见" 等动词，判关系要从这里往前看)"""
+    found = re.search(r"[\s　、]*".join(map(re.escape, prefix)) + r"[\s　、]*$", m.group(group))
+    return m.start(group) + found.start() if found else m.start()
+
+
+def _default_relation(title):
+    if ABOLISH_RE.search(title or ""):
+        return "abolishes"
+    if AMEND_RE.search(title or ""):
+        return "amends"
+    return "cites"
+
+
+def classify(text, start, title=""):
+    """看文号前面同一句里离它最近的动词；句子里没有就按标题 (如 "关于废止…的公告" 里列出的都是被废止的)"""
+    window = text[max(0, start - CONTEXT_CHARS):start]
+    ends = list(SENTENCE_END_RE.finditer(window))
+    if ends:
+        window = window[ends[-1].end():]
+    best, best_pos = None, -1
+    for relation, regex in (("cites", CITE_RE), ("abolishes", ABOLISH_RE), ("amends", AMEND_RE)):
+        for m in regex.finditer(window):
+            if m.start() > best_pos:
+                best, best_pos = relation, m.start()
+    return best or _default_relation(title)
+
+
+def extract_citations(text, own_no="", title="", known=()):
+    """返回 {(规范文号, 关系)}，不含本文自己的文号"""
+    out = set()
+    for m in TEXT_NO_RE.finditer(text or ""):
+        group = 1 if m.group(1) else 4
+        prefix = trim_prefix(m.group(group), known)
+        if group == 1:
+            doc_no = normalize_doc_no(f"{prefix}〔{m.group(2)}〕{m.group(3)}号") if prefix else ""
+        else:
+            if prefix in ("公告", "通告", "令"):  # 没有发文机关的 "公告2023年第1号" 对不上是谁的
+                continue
+            year = f"{m.group(5)}年" if m.group(5) else ""
+            doc_no = normalize_doc_no(f"{prefix}{year}第{m.group(6)}号")
+        if not doc_no or doc_no == own_no:
+            continue
+        out.add((doc_no, classify(text, _prefix_start(m, group, prefix), title)))
+    return out
+
+
+def build_citations(store, full=False, batch=500):
+    """抽取 (增量) 并入库，返回 (处理篇数, 引用条数)"""
+    start = time.time()
+    known = known_prefixes(store.doc_nos())
+    done = {} if full else store.citation_state()
+    pending, n_docs, n_edges = [], 0, 0
+    for doc in store.iter_documents():
+        if done.get(doc["doc_key"]) == doc["content_hash"]:
+            continue
+        own = normalize_doc_no(doc["doc_no"])
+        edges = extract_citations(doc["body"], own, doc["title"], known)
+        pending.append((doc["doc_key"], own, doc["content_hash"], edges))
+        n_docs += 1
+        n_edges += len(edges)
+        if len(pending) >= batch:
+            store.save_citations(pending)
+            pending = []
+    if pending:
+        store.save_citations(pending)
+    print(f"🔗 引用关系: 处理 {n_docs} 篇，抽出 {n_edges} 条引用，用时 {time.time() - start:.1f} 秒")
+    return n_docs, n_edges
+
+
+def show(store, query):
+    """query 可以是文档键 (beijing:123) 或文号"""
+    doc = store.get(query) if ":" in query else None
+    doc_no = normalize_doc_no(doc["doc_no"]) if doc else normalize_doc_no(query)
+    title = doc["title"] if doc else ""
+    print(f"📄 {doc_no or query} {title}")
+
+    if doc:
+        for e in store.cites(doc["doc_key"]):
+            target = f" -> {e['target_key']} {e['target_title'][:30]}" if e["target_key"] else " (库里没有)"
+            print(f"  ➡️ {e['relation']:<9} {e['doc_no']}{target}")
+    if doc_no:
+        for e in store.cited_by(doc_no):
+            print(f"  ⬅️ {e['relation']:<9} {e['src_key']} {e['doc_no']} {e['title'][:30]}")
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+命令行入口 (适合 cron / 定时任务，不弹窗)
+
+    python -m taxcrawl beijing --regions 山东 --categories 全部 --out 山东_全栏目.xlsx
+    python -m taxcrawl shanghai --out 上海税收政策.xlsx
+    python -m taxcrawl ningbo --headless --out 宁波.xlsx
+    python -m taxcrawl shandong --headless --out 山东.xlsx
+    python -m taxcrawl all --out-dir 输出目录
+    python -m taxcrawl import 税务局文件/*.xlsx
+    python -m taxcrawl sweep --report 有效性变更.csv
+    python -m taxcrawl cite build
+    python -m taxcrawl cite show 财税〔2019〕13号
+    python -m taxcrawl serve --port 8765
+    python -m taxcrawl parquet --out 政策库_parquet
+    python -m taxcrawl normalize --bench 100000
+    python -m taxcrawl --profile 剖析结果 beijing --regions 山东    # 任何子命令都可以加 --profile
+    python -m taxcrawl profile-diff 上次剖析 剖析结果
+
+这里只导入标准库，各站点脚本及其重量级依赖等到对应子命令执行时才加载。
+"""
+
+import argparse
+import os
+import sys
+
+
+def _all_or_list(values):
+    """["全部"] -> "全部"，其余原样 (交给站点脚本的 parse_config)"""
+    if values is None:
+        return None
+    return "全部" if values == ["全部"] else values
+
+
+def _beijing_queue_worker(queue_path, slots):
+    # 子进程入口：放在可导入的模块里，Windows 的 spawn 方式也能找到
+    from taxcrawl.sites import load_site
+
+    load_site("beijing").run_worker(queue_path, slots=slots)
+
+
+def cmd_beijing(args):
+    from taxcrawl.sites import load_site
+
+    site = load_site("beijing")
+    if not args.queue:
+        site.run(_all_or_list(args.regions), _all_or_list(args.categories), args.out)
+        return
+
+    # 队列模式：投递任务 -> 起 N 个 worker 进程 -> 全部结束后导出
+    import multiprocessing
+
+    from taxcrawl.store import PolicyStore
+    from taxcrawl.taskqueue import TaskQueue
+
+    if args.join and not os.environ.get("TAXCRAWL_DB"):
+        # 结果按文档写进库，由投递任务的那台机器导出；不指向同一个库文件，这台机器抓的就都丢在本机
+        raise ValueError("--join 需要用 --db (或 TAXCRAWL_DB) 指向投递机器上的同一个库文件 (共享盘)")
+    regions = site.parse_config(_all_or_list(args.regions) or site.TARGET_REGIONS_CONFIG, site.REGION_MAP)
+    categories = site.parse_config(_all_or_list(args.categories) or site.TARGET_CATEGORIES_CONFIG, site.CATEGORY_MAP)
+    if not args.join:
+        with TaskQueue(args.queue) as queue:
+            added = site.seed_queue(queue, regions, categories)
+            print(f"📥 队列 {args.queue}: 新投递 {added} 个任务, 当前 {queue.stats()}")
+
+    procs = [multiprocessing.Process(target=_beijing_queue_worker, args=(args.queue, args.slots))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    with TaskQueue(args.queue) as queue:
+        print(f"📊 队列状态: {queue.stats()}")
+    if not args.join:
+        with PolicyStore() as store:
+            site.save_to_excel_safe(store, args.out or site.default_filename(regions, categories))
+
+
+def cmd_shanghai(args):
+    import asyncio
+
+    from taxcrawl.sites import load_site
+
+    site = load_site("shanghai")
+    asyncio.run(site.main(args.out))
+
+
+def cmd_ningbo(args):
+    from taxcrawl.sites import load_site
+
+    site = load_site("ningbo")
+    site.main(args.out, headless=args.headless, download=not args.no_attachments, tabs=args.tabs)
+
+
+def cmd_shandong(args):
+    from taxcrawl.sites import load_site
+
+    site = load_site("shandong")
+    site.main(args.out, headless=args.headless, tabs=args.tabs)
+
+
+def cmd_all(args):
+    import asyncio
+
+    from taxcrawl.orchestrator import run_all
+
+    results = asyncio.run(run_all(args.out_dir, sites=args.sites, headless=not args.show_browser))
+    if any(err for _, _, err in results):
+        raise RuntimeError("部分站点失败")
+
+
+def cmd_compress(args):
+    from taxcrawl.store import PolicyStore
+
+    with PolicyStore() as store:
+        if not args.no_train:
+            dict_id = store.train_body_dictionary(sample_limit=args.samples)
+            print(f"📖 已训练正文字典 (id={dict_id})")
+        raw, stored = store.recompress()
+        ratio = raw / stored if stored else 0
+        print(f"🗜️  正文 {raw / 1e6:.1f} MB -> {stored / 1e6:.1f} MB (压缩比 {ratio:.1f}x)")
+
+
+def cmd_import(args):
+    import glob
+
+    from taxcrawl.importer import import_paths
+    from taxcrawl.sites import ROOT
+    from taxcrawl.store import PolicyStore
+
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT, "税务局文件", "*.xlsx")))
+    if not paths:
+        raise FileNotFoundError("没有找到要导入的 xlsx")
+    with PolicyStore() as store:
+        total = import_paths(paths, store)
+        print(f"✅ 导入完成: {total}，库内共 {store.count()} 篇")
+
+
+def cmd_sweep(args):
+    from taxcrawl.sweep import run_sweep
+
+    run_sweep(args.sites, regions=_all_or_list(args.regions), categories=_all_or_list(args.categories),
+              headless=not args.show_browser, report_path=args.report)
+
+
+def cmd_cite(args):
+    from taxcrawl.citations import build_citations, show
+    from taxcrawl.store import PolicyStore
+
+    with PolicyStore() as store:
+        if args.action == "build":
+            build_citations(store, full=args.full)
+        else:
+            if not args.query:
+                raise ValueError("cite show 需要文号或文档键")
+            show(store, args.query)
+
+
+def cmd_serve(args):
+    from taxcrawl.service import serve
+    from taxcrawl.store import DEFAULT_DB
+
+    serve(DEFAULT_DB, host=args.host, port=args.port, verbose=args.verbose)
+
+
+def cmd_parquet(args):
+    from taxcrawl.columnar import export_parquet
+    from taxcrawl.store import PolicyStore
+
+    with PolicyStore() as store:
+        export_parquet(store, args.out, sites=args.sites)
+
+
+def cmd_normalize(args):
+    from taxcrawl.cleaning import benchmark, run_normalize
+    from taxcrawl.store import PolicyStore
+
+    with PolicyStore() as store:
+        if args.bench:
+            benchmark(store, args.bench)
+        else:
+            run_normalize(store, full=args.full, chunk_size=args.chunk)
+
+
+def cmd_profile_diff(args):
+    from taxcrawl.profiling import compare
+
+    print(compare(args.old, args.new, top=args.top))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="taxcrawl", description="各地税务局政策抓取")
+    parser.add_argument("--db", help="统一存储库路径 (默认 ~/Desktop/税务政策库.sqlite3，也可用环境变量 TAXCRAWL_DB)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="剖析模式：CPU (含工作线程) + 内存快照，结果写到 DIR，可与上次运行 diff")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("beijing", help="全国税务局知识库 (北京智能咨询接口)")
+    p.add_argument("--regions", nargs="+", help='地区，如 山东 北京；"全部" 表示全国')
+    p.add_argument("--categories", nargs="+", help='栏目，如 政策法规 问题解答；"全部" 表示所有栏目')
+    p.add_argument("--out", help="输出 Excel 路径 (默认当前目录下 地区_栏目.xlsx)")
+    p.add_argument("--queue", help="任务队列文件 (SQLite)，启用多进程 / 多机分片抓取")
+    p.add_argument("--workers", type=int, default=4, help="队列模式下本机 worker 进程数")
+    p.add_argument("--slots", type=int, default=4, help="每个 worker 同时处理的页数")
+    p.add_argument("--join", action="store_true", help="只加入已有队列干活 (其他机器用，需要 --db 指向共享的库)，不投递、不导出")
+    p.set_defaults(func=cmd_beijing)
+
+    p = sub.add_parser("shanghai", help="上海税务局政策法规库")
+    p.add_argument("--out", help="输出 Excel 路径")
+    p.set_defaults(func=cmd_shanghai)
+
+    p = sub.add_parser("ningbo", help="宁波税务局政策法规库 (浏览器)")
+    p.add_argument("--out", help="输出 Excel 路径")
+    p.add_argument("--headless", action="store_true", help="无界面浏览器")
+    p.add_argument("--no-attachments", action="store_true", help="不下载附件")
+    p.add_argument("--tabs", type=int, help="详情页并行标签页数 (默认 4)")
+    p.set_defaults(func=cmd_ningbo)
+
+    p = sub.add_parser("shandong", help="山东税务局政策文件 (浏览器)")
+    p.add_argument("--out", help="输出 Excel 路径")
+    p.add_argument("--headless", action="store_true", help="无界面浏览器")
+    p.add_argument("--tabs", type=int, help="详情页并行标签页数 (默认 2)")
+    p.set_defaults(func=cmd_shandong)
+
+    p = sub.add_parser("compress", help="用库内正文训练 zstd 字典并重新压缩所有正文")
+    p.add_argument("--samples", type=int, default=5000, help="训练样本篇数")
+    p.add_argument("--no-train", action="store_true", help="不重新训练，只用现有字典重压")
+    p.set_defaults(func=cmd_compress)
+
+    p = sub.add_parser("import", help="把历史 Excel 一次性导入统一存储库 (默认 税务局文件/*.xlsx)")
+    p.add_argument("paths", nargs="*", help="xlsx 文件路径")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("sweep", help="有效性巡检：只重读状态字段，更新变了的，列出新废止/失效的文件")
+    p.add_argument("--sites", nargs="+", default=["beijing", "shandong"], choices=["beijing", "shandong"])
+    p.add_argument("--regions", nargs="+", help="北京接口的地区 (默认脚本配置)")
+    p.add_argument("--categories", nargs="+", help="北京接口的栏目 (默认脚本配置)")
+    p.add_argument("--report", help="变更明细 CSV 路径")
+    p.add_argument("--show-browser", action="store_true", help="显示浏览器窗口 (默认无界面)")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("cite", help="引用关系图：build 从正文抽取文号引用 (增量)，show 查看某文件引用了谁、被谁引用/修改/废止")
+    p.add_argument("action", choices=["build", "show"])
+    p.add_argument("query", nargs="?", help="show 的对象：文号 (如 财税〔2019〕13号) 或文档键 (如 beijing:123)")
+    p.add_argument("--full", action="store_true", help="build 时全部重算 (默认只处理正文变了的)")
+    p.set_defaults(func=cmd_cite)
+
+    p = sub.add_parser("serve", help="本地只读查询服务 (HTTP/JSON)：按地区/栏目/有效性/日期/发文单位/文号筛选，可与爬虫同时运行")
+    p.add_argument("--host", default="127.0.0.1", help="监听地址 (默认只允许本机访问)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--verbose", action="store_true", help="打印每个请求及耗时")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("parquet", help="导出 Parquet (按 站点/地区 分区，分类列字典编码，正文单独存)，给 pandas 分析用")
+    p.add_argument("--out", default="政策库_parquet", help="输出目录")
+    p.add_argument("--sites", nargs="+", choices=["beijing", "shanghai", "ningbo", "shandong"], help="默认全部站点")
+    p.set_defaults(func=cmd_parquet)
+
+    p = sub.add_parser("normalize", help="批量规范化 日期/文号/发文单位 (向量化，结果存 normalized 表和 documents_normalized 视图)")
+    p.add_argument("--full", action="store_true", help="全部重算 (默认只处理内容变了的)")
+    p.add_argument("--chunk", type=int, default=20000, help="每块读多少篇")
+    p.add_argument("--bench", type=int, metavar="N", help="不写库，把库里数据放大到 N 条测速度 (和逐行版本对比)")
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser("profile-diff", help="对比两次 --profile 的结果 (目录或 .prof)，按耗时占比变化排序")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--top", type=int, default=40)
+    p.set_defaults(func=cmd_profile_diff)
+
+    p = sub.add_parser("all", help="四个站点一起并发跑 (共用连接池和存储)")
+    p.add_argument("--out-dir", default=".", help="各站点 Excel 的输出目录")
+    p.add_argument("--sites", nargs="+", default=["beijing", "shanghai", "ningbo", "shandong"],
+                   choices=["beijing", "shanghai", "ningbo", "shandong"])
+    p.add_argument("--show-browser", action="store_true", help="显示浏览器窗口 (默认无界面)")
+    p.set_defaults(func=cmd_all)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        # 站点脚本里 PolicyStore() 的默认路径读这个环境变量
+        os.environ["TAXCRAWL_DB"] = os.path.abspath(args.db)
+    profiler = None
+    if args.profile:
+        from taxcrawl.profiling import Profiler
+
+        profiler = Profiler(args.profile, args.command).start()
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        print("\n⛔ 已中断")
+        return 130
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+        print(f"❌ {args.command} 运行失败", file=sys.stderr)
+        return 1
+    finally:
+        if profiler:
+            profiler.stop()  # 中断 / 出错也写出结果，慢到手动停下的那次正是要看的
+    return 0
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 客户端工厂 (北京、上海、调度器、附件下载共用)
+- 按域名挂独立连接池 (httpx mounts)：各站点的连接数、keep-alive 时长分开配，一个站点慢不会占满别人的连接
+- 装了 h2 (pip install h2) 就开 HTTP/2：服务器支持时几百个并发请求复用几条连接，
+  不再是几百次 TCP + TLS 握手；服务器不支持时自动退回 HTTP/1.1 连接池
+- 连接复用统计：用 httpcore 的 trace 扩展记下每个域名新建了几条 TCP / TLS 连接、跑了多少请求
+- 可叠加 PoliteTransport：按域名的并发上限 + 最小请求间隔 (调度器四站并发时用)
+
+    client = make_client(headers=HEADERS)            # 单站脚本
+    client = make_client(polite=True)                # 调度器：共用连接池 + 礼貌预算
+    ...
+    client.pool_metrics.report()
+"""
+
+import asyncio
+import time
+
+import httpx
+
+try:
+    import h2  # noqa: F401  只用来判断能不能开 HTTP/2
+except ImportError:  # 可选依赖
+    h2 = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 域名 -> (最大并发, 两次请求最小间隔秒)
+HOST_BUDGETS = {
+    "znhd.beijing.chinatax.gov.cn": (20, 0.0),
+    "shanghai.chinatax.gov.cn": (50, 0.0),
+    "ningbo.chinatax.gov.cn": (4, 0.2),
+    "shandong.chinatax.gov.cn": (2, 0.5),
+}
+DEFAULT_BUDGET = (8, 0.1)
+
+# 域名 -> (最大连接数, keep-alive 秒)。HTTP/2 下一条连接就能跑上百个并发请求，这里的上限主要给 HTTP/1.1 回退用
+HOST_POOLS = {
+    "znhd.beijing.chinatax.gov.cn": (20, 30.0),
+    "shanghai.chinatax.gov.cn": (50, 30.0),
+    "ningbo.chinatax.gov.cn": (8, 15.0),
+    "shandong.chinatax.gov.cn": (2, 15.0),
+}
+DEFAULT_POOL = (10, 5.0)
+
+
+def http2_available():
+    return h2 is not None
+
+
+# ---------- 礼貌预算 ----------
+
+class HostBudget:
+    def __init__(self, concurrency, interval):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def acquire(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self._lock:
+                wait = self._next_start - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = time.monotonic() + self.interval
+
+    def release(self):
+        self.semaphore.release()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读完 / 关闭时才归还额度，流式下载也算在并发里"""
+
+    def __init__(self, stream, release):
+        self.stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self._release:
+                self._release()
+                self._release = None
+
+
+class PoliteTransport(httpx.AsyncBaseTransport):
+    """包在真正的传输层外面，按目标域名排队"""
+
+    def __init__(self, inner, budgets=None, default=DEFAULT_BUDGET):
+        self.inner = inner
+        self.budgets = HOST_BUDGETS if budgets is None else budgets
+        self.default = default
+        self._hosts = {}
+
+    def budget_for(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = HostBudget(*self.budgets.get(host, self.default))
+        return self._hosts[host]
+
+    async def handle_async_request(self, request):
+        budget = self.budget_for(request.url.host)
+        await budget.acquire()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            budget.release()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            budget.release()  # 响应体已在内存里
+        else:
+            response.stream = _ReleasingStream(response.stream, budget.release)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+# ---------- 连接复用统计 ----------
+
+class PoolMetrics:
+    """{域名: {requests, http2, tcp, tls, failed}}；全在一个事件循环里更新，不用加锁"""
+
+    FIELDS = ("requests", "http2", "tcp", "tls", "failed")
+
+    def __init__(self):
+        self.hosts = {}
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = dict.fromkeys(self.FIELDS, 0)
+        return self.hosts[host]
+
+    def tracer(self, host):
+        counts = self._host(host)
+
+        async def trace(name, info):
+            if name == "connection.connect_tcp.complete":
+                counts["tcp"] += 1
+            elif name == "connection.start_tls.complete":
+                counts["tls"] += 1
+        return trace
+
+    def record(self, host, response=None):
+        counts = self._host(host)
+        counts["requests"] += 1
+        if response is None:
+            counts["failed"] += 1
+        elif response.extensions.get("http_version") == b"HTTP/2":
+            counts["http2"] += 1
+
+    def report(self):
+        if not self.hosts:
+            return
+        print("🔌 连接复用统计:")
+        for host, c in sorted(self.hosts.items()):
+            per_conn = c["requests"] / c["tcp"] if c["tcp"] else float(c["requests"])
+            print(f"   {host:<32} 请求 {c['requests']:>6} (HTTP/2 {c['http2']:>6})  新建连接 {c['tcp']:>4}  "
+                  f"TLS 握手 {c['tls']:>4}  每连接 {per_conn:>6.1f} 个请求" + (f"  失败 {c['failed']}" if c["failed"] else ""))
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """给每个请求挂上 trace 回调，统计新建连接 / TLS 握手 / 协议版本"""
+
+    def __init__(self, inner, metrics):
+        self.inner = inner
+        self.metrics = metrics
+
+    async def handle_async_request(self, request):
+        host = request.url.host
+        request.extensions = {**request.extensions, "trace": self.metrics.tracer(host)}
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            self.metrics.record(host)
+            raise
+        self.metrics.record(host, response)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+# ---------- 工厂 ----------
+
+def make_transport(max_connections, keepalive_expiry, http2=True, polite=False, budgets=None, metrics=None):
+    inner = httpx.AsyncHTTPTransport(
+        verify=False, http2=http2 and http2_available(),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=keepalive_expiry))
+    transport = PoliteTransport(inner, budgets) if polite else inner
+    return MeteredTransport(transport, metrics) if metrics is not None else transport
+
+
+def make_client(headers=None, polite=False, budgets=None, pools=None, http2=True, **kwargs):
+    """
+    headers : 默认只带 User-Agent
+    polite  : 叠加按域名的并发上限 / 请求间隔 (budgets 默认 HOST_BUDGETS)
+    pools   : {域名: (最大连接数, keep-alive 秒)}，默认 HOST_POOLS；其余域名用 DEFAULT_POOL
+    其余参数 (cookies、timeout 等) 原样交给 httpx.AsyncClient。
+    统计在 client.pool_metrics 上
+    """
+    metrics = PoolMetrics()
+    pools = HOST_POOLS if pools is None else pools
+
+    def transport(max_connections, keepalive_expiry):
+        return make_transport(max_connections, keepalive_expiry, http2=http2, polite=polite, budgets=budgets,
+                              metrics=metrics)
+
+    client = httpx.AsyncClient(
+        transport=transport(*DEFAULT_POOL),
+        mounts={f"all://{host}": transport(*pool) for host, pool in pools.items()},
+        headers=headers or {"User-Agent": USER_AGENT},
+        verify=False,
+        **kwargs)
+    client.pool_metrics = metrics
+    return client
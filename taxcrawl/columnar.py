@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Parquet 列式导出 (给 pandas / DuckDB 做分析，比 read_excel 快两个数量级)
+- 按 site / region 分区 (Hive 目录格式 site=beijing/region=北京/)，按站点、地区筛选时只读对应目录
+- 栏目、有效性、发文单位这类重复值多的列存成字典编码，pandas 读出来直接是 category
+- 正文单独一套文件 (bodies/)，按 doc_key 关联；只看元数据时根本不碰正文
+- 边读库边写，每个分区攒够一批写一个 row group，内存不随库大小增长
+- 先写到临时目录，全部成功后再替换旧的导出
+
+    python -m taxcrawl parquet --out 政策库_parquet
+    pd.read_parquet("政策库_parquet/documents", columns=["title", "status"], filters=[("region", "=", "北京")])
+
+依赖 pyarrow (pip install pyarrow)
+"""
+
+import datetime
+import os
+import re
+import shutil
+import time
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖
+    pa = pq = None
+
+ROW_GROUP_SIZE = 5000
+# 空地区 (宁波、山东的表没有地区列) 的分区名；不用 null 分区，pyarrow 合并带 null 的分区字典会报错
+EMPTY_PARTITION = "未知"
+DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+# 目录名里只转义路径分隔符这类字符，中文原样保留 (pyarrow 读的时候按 URI 解码)
+UNSAFE_PATH_RE = re.compile(r'[/\\=%:*?"<>|]')
+
+
+def available():
+    return pa is not None
+
+
+def _dict_type():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def document_schema():
+    # site / region 是分区键，在目录名里，不重复存进文件
+    return pa.schema([
+        ("doc_key", pa.string()),
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("category", _dict_type()),
+        ("doc_no", pa.string()),
+        ("pub_date", pa.string()),
+        ("pub_day", pa.date32()),  # pub_date 能解析成日期的，方便按日期筛选 / 排序
+        ("publisher", _dict_type()),
+        ("status", _dict_type()),
+        ("update_time", pa.string()),
+        ("version", pa.int32()),
+        ("last_changed", pa.timestamp("s")),
+    ])
+
+
+def body_schema():
+    return pa.schema([
+        ("doc_key", pa.string()),
+        ("body", pa.large_string()),
+        ("extra", pa.string()),
+    ])
+
+
+def _day(value):
+    m = DATE_RE.match(value or "")
+    if not m:
+        return None
+    try:
+        return datetime.date(*map(int, m.groups()))
+    except ValueError:
+        return None
+
+
+def _partition(**values):
+    return os.path.join(*(f"{k}={UNSAFE_PATH_RE.sub(lambda m: quote(m.group()), v) if v else EMPTY_PARTITION}"
+                          for k, v in values.items()))
+
+
+class _PartitionedWriter:
+    """每个分区一个 ParquetWriter，攒够 ROW_GROUP_SIZE 行写一个 row group"""
+
+    def __init__(self, root, schema, row_group_size=ROW_GROUP_SIZE):
+        self.root = root
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.writers = {}
+        self.buffers = {}
+        self.counts = {}
+
+    def append(self, partition, row):
+        buf = self.buffers.setdefault(partition, [])
+        buf.append(row)
+        if len(buf) >= self.row_group_size:
+            self._flush(partition)
+
+    def _flush(self, partition):
+        rows = self.buffers.get(partition)
+        if not rows:
+            return
+        writer = self.writers.get(partition)
+        if writer is None:
+            folder = os.path.join(self.root, partition)
+            os.makedirs(folder, exist_ok=True)
+            writer = self.writers[partition] = pq.ParquetWriter(
+                os.path.join(folder, "part-0.parquet"), self.schema, compression="zstd")
+        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+        self.counts[partition] = self.counts.get(partition, 0) + len(rows)
+        self.buffers[partition] = []
+
+    def close(self):
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+
+
+def export_parquet(store, out_dir, sites=None, row_group_size=ROW_GROUP_SIZE):
+    """
+    导出到 out_dir/documents (元数据) 和 out_dir/bodies (正文)，返回 {站点: 篇数}
+    sites: 只导出这些站点，默认全部
+    """
+    if pa is None:
+        raise RuntimeError("需要 pyarrow：pip install pyarrow")
+    start = time.time()
+    out_dir = os.path.abspath(out_dir)
+    tmp_dir = out_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+
+    docs = _PartitionedWriter(os.path.join(tmp_dir, "documents"), document_schema(), row_group_size)
+    bodies = _PartitionedWriter(os.path.join(tmp_dir, "bodies"), body_schema(), row_group_size)
+    counts = {}
+    try:
+        for site in sites or [None]:
+            for doc in store.iter_documents(site):
+                docs.append(_partition(site=doc["site"], region=doc["region"] or ""), {
+                    "doc_key": doc["doc_key"],
+                    "url": doc["url"],
+                    "title": doc["title"],
+                    # 字典列不放 null：跨分区合并字典时 pyarrow 不支持带 null 的字典
+                    "category": doc["category"] or "",
+                    "doc_no": doc["doc_no"],
+                    "pub_date": doc["pub_date"],
+                    "pub_day": _day(doc["pub_date"]),
+                    "publisher": doc["publisher"] or "",
+                    "status": doc["status"] or "",
+                    "update_time": doc["update_time"],
+                    "version": doc["version"],
+                    "last_changed": datetime.datetime.fromtimestamp(int(doc["last_changed"]))
+                    if doc["last_changed"] else None,
+                })
+                bodies.append(_partition(site=doc["site"]),
+                              {"doc_key": doc["doc_key"], "body": doc["body"], "extra": doc["extra"]})
+                counts[doc["site"]] = counts.get(doc["site"], 0) + 1
+    finally:
+        docs.close()
+        bodies.close()
+
+    # 只替换我们自己导出的目录，防止 --out 指错把别的东西删了
+    if os.path.exists(out_dir):
+        if not os.path.isdir(os.path.join(out_dir, "documents")):
+            raise FileExistsError(f"{out_dir} 已存在且不是 Parquet 导出目录")
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    print(f"📦 Parquet 导出完成: {out_dir}  {counts}，{len(docs.counts)} 个分区，用时 {time.time() - start:.1f} 秒")
+    return counts
+
+
+def load(out_dir, columns=None, filters=None, bodies=False):
+    """
+    读回 pandas DataFrame：columns 只读需要的列，filters 按分区 / 列过滤 (见 pyarrow.parquet.read_table)
+    bodies=True 时按 doc_key 拼上正文
+    """
+    if pa is None:
+        raise RuntimeError("需要 pyarrow：pip install pyarrow")
+    if columns is not None and "doc_key" not in columns and bodies:
+        columns = ["doc_key"] + list(columns)
+    table = pq.read_table(os.path.join(out_dir, "documents"), columns=columns, filters=filters,
+                          partitioning="hive")
+    df = table.to_pandas()
+    if bodies:
+        keys = [("doc_key", "in", list(df["doc_key"]))] if filters else None
+        body = pq.read_table(os.path.join(out_dir, "bodies"), columns=["doc_key", "body"], filters=keys,
+                             partitioning="hive").to_pandas()
+        df = df.merge(body[["doc_key", "body"]], on="doc_key", how="left")
+    return df
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+正文压缩 (zstd + 自训练字典)
+税务文件套话极多 ("国家税务总局关于…的公告"、固定条款、附件表格)，
+用我们自己语料训练的字典压缩，比通用压缩率高得多；每条记录单独一帧，可随机读取。
+
+- 存储格式：压缩后为 BLOB (zstd 帧，帧头自带字典 id)；过短或没装 zstandard 时原样存 TEXT
+- 依赖 zstandard (pip install zstandard)，没装时自动退化为不压缩
+"""
+
+import threading
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+LEVEL = 10
+MIN_SIZE = 64  # 太短的正文压缩不划算
+DICT_SIZE = 112 * 1024
+SAMPLE_LIMIT = 5000
+
+
+def available():
+    return zstandard is not None
+
+
+def train_dictionary(samples, dict_size=DICT_SIZE):
+    """用正文样本训练字典，返回 (dict_id, 字典字节)"""
+    if zstandard is None:
+        raise RuntimeError("需要 zstandard：pip install zstandard")
+    data = [s.encode("utf-8") for s in samples if s]
+    d = zstandard.train_dictionary(dict_size, data)
+    return d.dict_id(), d.as_bytes()
+
+
+class BodyCodec:
+    def __init__(self, level=LEVEL, loader=None):
+        self.level = level
+        self.loader = loader  # dict_id -> 字典字节 / None：别的进程 (taxcrawl compress) 后来训练的字典按需读进来
+        self._dicts = {}  # dict_id -> ZstdCompressionDict
+        self.active_id = 0
+        self._compressor = None
+        self._local = threading.local()  # 解压器不是线程安全的，每个线程各一份
+
+    def add_dict(self, data):
+        d = zstandard.ZstdCompressionDict(data)
+        self._dicts[d.dict_id()] = d
+        return d.dict_id()
+
+    def use(self, dict_id):
+        """之后写入的正文用这个字典压缩 (0 = 不用字典)"""
+        self.active_id = dict_id
+        self._compressor = None
+
+    def encode(self, text):
+        if zstandard is None or not text or len(text) < MIN_SIZE:
+            return text
+        if self._compressor is None:
+            d = self._dicts.get(self.active_id)
+            self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=d) if d \
+                else zstandard.ZstdCompressor(level=self.level)
+        return self._compressor.compress(text.encode("utf-8"))
+
+    def decode(self, value):
+        if not isinstance(value, bytes):
+            return value
+        if zstandard is None:
+            raise RuntimeError("库里的正文已压缩，需要 zstandard：pip install zstandard")
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        cache = self._local.__dict__.setdefault("dctx", {})
+        if dict_id not in cache:
+            d = self._dicts.get(dict_id)
+            if dict_id and d is None and self.loader is not None:
+                data = self.loader(dict_id)
+                if data:
+                    self.add_dict(data)
+                    d = self._dicts.get(dict_id)
+            if dict_id and d is None:
+                raise KeyError(f"缺少压缩字典 {dict_id}")
+            cache[dict_id] = zstandard.ZstdDecompressor(dict_data=d) if d else zstandard.ZstdDecompressor()
+        return cache[dict_id].decompress(value).decode("utf-8")
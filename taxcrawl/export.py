@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+流式 Excel 导出
+- openpyxl write_only 模式：行写完即落盘，导出 10 万+ 篇内存也不涨
+- 多个 Sheet 一趟写完 (按行路由到对应 Sheet)
+- Excel 单元格上限 32767 字符：长正文拆到 "正文(续1)"... 溢出列，再放不下就整篇另存 txt
+- 读回时 (importer) 用 join_overflow 把溢出列、txt 拼回原文
+"""
+
+import os
+import re
+
+CELL_LIMIT = 32767
+OVERFLOW_COLUMNS = 2  # 每个长文本列额外准备几个溢出列
+LONG_TEXT_COLUMNS = ("正文", "正文内容")
+
+# openpyxl 不接受的控制字符
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+OVERFLOW_RE = re.compile(r"^(.+)\(续(\d+)\)$")
+SIDE_NOTE_RE = re.compile(r"…\[全文 (\d+) 字，见 ([^\]]+)\]$")
+
+
+def overflow_names(col, n=OVERFLOW_COLUMNS):
+    return [f"{col}(续{i})" for i in range(1, n + 1)]
+
+
+def overflow_groups(header):
+    """表头 -> {长文本列: [它的溢出列 (按序号)]}；没有溢出列时返回空 dict"""
+    groups = {}
+    for name in header:
+        m = OVERFLOW_RE.match(name or "")
+        if m and m.group(1) in header:
+            groups.setdefault(m.group(1), []).append((int(m.group(2)), name))
+    return {col: [name for _, name in sorted(names)] for col, names in groups.items()}
+
+
+def join_overflow(rec, groups, folder=""):
+    """
+    导出时拆开的长文本拼回去：溢出列按序接到原列后面并从 rec 里去掉；
+    整篇另存 txt 的 (末尾带 "…[全文 N 字，见 …]") 从 folder 下读回全文，读不到就保留拼接结果
+    """
+    for col, names in groups.items():
+        text = str(rec.get(col) or "") + "".join(str(rec.pop(name, "") or "") for name in names)
+        m = SIDE_NOTE_RE.search(text)
+        if m:
+            try:
+                with open(os.path.join(folder, m.group(2)), encoding="utf-8", newline="") as f:
+                    full = f.read()
+                if len(full) == int(m.group(1)):
+                    text = full
+            except OSError:
+                pass
+        rec[col] = text
+    return rec
+
+
+def clean_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:  # NaN
+        return ""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+class StreamingExcelWriter:
+    """
+    用法:
+        with StreamingExcelWriter(path, {"Sheet1": cols}) as w:
+            w.append("Sheet1", row_dict)
+    先写到临时文件，关闭时再替换目标文件，中途失败不会留下半个 Excel
+    """
+
+    def __init__(self, filepath, sheets, long_text=LONG_TEXT_COLUMNS, overflow_columns=OVERFLOW_COLUMNS):
+        from openpyxl import Workbook
+
+        self.filepath = filepath
+        self.tmp_path = filepath + ".tmp.xlsx"
+        self.side_dir = os.path.splitext(filepath)[0] + "_长文本"
+        self.overflow_columns = overflow_columns
+        self.wb = Workbook(write_only=True)
+        self.sheets = {}
+        self.counts = {}
+        for name, columns in sheets.items():
+            ws = self.wb.create_sheet(title=name[:31])
+            long_cols = [c for c in columns if c in long_text]
+            header = list(columns)
+            for c in long_cols:
+                header += overflow_names(c, overflow_columns)
+            ws.append(header)
+            self.sheets[name] = (ws, list(columns), long_cols)
+            self.counts[name] = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def _split_long(self, sheet, row_no, col, text):
+        """返回 [主单元格, 溢出1, 溢出2...]，超出容量时整篇写 txt"""
+        cells = [text[i:i + CELL_LIMIT] for i in range(0, len(text), CELL_LIMIT)] or [""]
+        if len(cells) <= 1 + self.overflow_columns:
+            return cells + [""] * (1 + self.overflow_columns - len(cells))
+
+        os.makedirs(self.side_dir, exist_ok=True)
+        side_file = os.path.join(self.side_dir, f"{sheet[:31]}_{col}_{row_no}.txt")
+        with open(side_file, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        note = f"…[全文 {len(text)} 字，见 {os.path.basename(self.side_dir)}/{os.path.basename(side_file)}]"
+        cells = cells[:1 + self.overflow_columns]
+        cells[-1] = cells[-1][:CELL_LIMIT - len(note)] + note
+        return cells
+
+    def append(self, sheet, row):
+        ws, columns, long_cols = self.sheets[sheet]
+        self.counts[sheet] += 1
+        values = [clean_cell(row.get(c, "")) for c in columns]
+        extra = []
+        for c in long_cols:
+            i = columns.index(c)
+            text = str(values[i])
+            if len(text) > CELL_LIMIT:
+                parts = self._split_long(sheet, self.counts[sheet] + 1, c, text)
+            else:
+                parts = [text] + [""] * self.overflow_columns
+            values[i] = parts[0]
+            extra += parts[1:]
+        ws.append(values + extra)
+
+    def close(self):
+        self.wb.save(self.tmp_path)
+        os.replace(self.tmp_path, self.filepath)
+
+
+def export_excel(filepath, sheets, rows, **kwargs):
+    """
+    sheets: {Sheet名: 列名列表}
+    rows  : 可迭代的 (Sheet名, 行dict)，一般直接从库里边读边写
+    返回每个 Sheet 的行数
+    """
+    with StreamingExcelWriter(filepath, sheets, **kwargs) as w:
+        for sheet, row in rows:
+            w.append(sheet, row)
+    return w.counts
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+抓取前沿检查点：列表游标 + 当前窗口还没抓完的详情链接
+- 存在 PolicyStore 的 meta 表里，每次 checkpoint 是一条 SQLite 事务，要么全写进去要么没写
+- 重启后从游标处接着翻列表，先把上次没抓完的详情补上
+- fingerprint (栏目 id、每窗口条数等) 变了说明分页方式变了，旧游标作废
+"""
+
+
+class Frontier:
+    def __init__(self, store, name, fingerprint=None):
+        self.store = store
+        self.key = f"frontier:{name}"
+        self.fingerprint = fingerprint
+        state = store.get_meta(self.key) or {}
+        if state.get("fingerprint") != fingerprint:
+            state = {}
+        self.cursor = state.get("cursor")
+        self.pending = [tuple(p) for p in state.get("pending", [])]
+
+    def checkpoint(self, cursor, pending=()):
+        """记录：列表已处理到 cursor；pending 是这之前还没抓完的 (标题, 链接)"""
+        self.cursor = cursor
+        self.pending = [tuple(p) for p in pending]
+        self.store.set_meta(self.key, {"cursor": cursor, "pending": self.pending, "fingerprint": self.fingerprint})
+
+    def clear(self):
+        """整轮抓完：下次从头开始 (新文件在列表最前面)"""
+        self.cursor, self.pending = None, []
+        self.store.set_meta(self.key, None)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+历史 Excel 一次性导入
+- 用 python-calamine (Rust 实现) 流式读 xlsx，比 openpyxl 快一个数量级；没装时退回 openpyxl 只读模式
+- 按表头认站点，各站点的列映射到统一字段 (见 store.FIELD_MAP)，认不出的列进 extra
+- 导出时拆到 "正文(续N)" 溢出列、另存 txt 的长正文拼回原文再入库
+- 分批 executemany 入库；库里已有的文档不覆盖 (以爬虫抓到的为准)
+- 文档键规则与各站点脚本的 doc_key 一致，导入后断点续抓直接用库，不再解析 Excel
+
+    python -m taxcrawl import                     # 默认导入 税务局文件/*.xlsx
+    python -m taxcrawl import 北京_全栏目.xlsx
+"""
+
+import datetime
+import os
+import re
+import time
+
+from taxcrawl.export import join_overflow, overflow_groups
+from taxcrawl.urls import canonical_url
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # 可选依赖
+    CalamineWorkbook = None
+
+
+# ---------- 读 ----------
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d") if value.time() == datetime.time() else value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_sheets(path):
+    """逐个 sheet 产出 (sheet 名, 行迭代器)，每行是字符串列表"""
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(path)
+        for name in wb.sheet_names:
+            yield name, ([_cell(v) for v in row] for row in wb.get_sheet_by_name(name).iter_rows())
+        return
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield ws.title, ([_cell(v) for v in row] for row in ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+
+# ---------- 站点识别 ----------
+
+def _beijing_key(rec):
+    m = re.search(r"id=(\d+)", rec.get("链接", ""))
+    return f"beijing:{m.group(1)}" if m else None
+
+
+def _url_key(site, canonical=False):
+    def key(rec):
+        url = rec.get("链接", "")
+        return f"{site}:{canonical_url(url) if canonical else url}" if url else None
+    return key
+
+
+# (站点, 表头必须包含的列, 表头不能包含的列, 文档键, 不入库的列)
+SCHEMAS = [
+    # 宁波新格式的 "附件" sheet：只有附件，没有标题
+    ("ningbo", {"链接", "附件链接", "附件文件名"}, {"标题"}, None, set()),
+    # 宁波老格式：一附件一行，同一篇正文重复多次
+    ("ningbo", {"链接", "附件链接", "附件文件名"}, set(), _url_key("ningbo"), {"附件链接", "附件文件名", "本地文件"}),
+    # 宁波新格式的 "政策" sheet
+    ("ningbo", {"链接", "附件数"}, set(), _url_key("ningbo"), {"附件数"}),
+    ("beijing", {"链接", "地区", "栏目", "生效日期"}, set(), _beijing_key, set()),
+    ("shandong", {"链接", "发文机构", "有效性", "是否涉税法律"}, set(), _url_key("shandong"), set()),
+    ("shanghai", {"链接", "发文单位", "栏目"}, {"地区"}, _url_key("shanghai", canonical=True), set()),
+]
+
+
+def detect(header):
+    cols = set(header)
+    for schema in SCHEMAS:
+        if schema[1] <= cols and not schema[2] & cols:
+            return schema
+    return None
+
+
+# ---------- 导入 ----------
+
+def _records(rows, header, schema, folder, attachments):
+    """一个 sheet 的行 -> (文档键, 记录)；附件行收集进 attachments，bulk_insert 写完文档后再写"""
+    _, _, _, key_of, drop = schema
+    overflow = overflow_groups(header)
+    seen = set()
+    for values in rows:
+        rec = dict(zip(header, values))
+        if overflow:
+            join_overflow(rec, overflow, folder)
+        url = rec.get("链接", "")
+        if rec.get("附件链接"):
+            attachments.setdefault(url, []).append({"文件名": rec.get("附件文件名", ""), "链接": rec["附件链接"]})
+        if key_of is None:
+            continue
+        key = key_of(rec)
+        if not key or key in seen:  # 老宁波表同一篇有多行，只取第一行
+            continue
+        seen.add(key)
+        yield key, {k: v for k, v in rec.items() if k not in drop}
+
+
+def import_workbook(path, store, site=None):
+    """
+    导入一个工作簿的所有可识别 sheet；site 指定时只导入该站点的 sheet。
+    返回 {站点: 新入库篇数}
+    """
+    result = {}
+    folder = os.path.dirname(os.path.abspath(path))  # 另存的长文本 txt 相对工作簿所在目录
+    for sheet, rows in iter_sheets(path):
+        header = next(rows, None)
+        schema = detect(header or [])
+        if schema is None:
+            print(f"   ⚠️ {os.path.basename(path)} / {sheet}: 认不出是哪个站点的表，跳过")
+            continue
+        name = schema[0]
+        if site and name != site:
+            continue
+
+        attachments = {}
+        n = store.bulk_insert(name, _records(rows, header, schema, folder, attachments), attachments=attachments)
+        result[name] = result.get(name, 0) + n
+        n_att = sum(map(len, attachments.values()))
+        print(f"   📥 {os.path.basename(path)} / {sheet}: {name} 新入库 {n} 篇" + (f", 附件 {n_att} 个" if n_att else ""))
+    return result
+
+
+def import_paths(paths, store):
+    total = {}
+    for path in paths:
+        start = time.time()
+        for name, n in import_workbook(path, store).items():
+            total[name] = total.get(name, 0) + n
+        print(f"   ⏱️ {os.path.basename(path)} 用时 {time.time() - start:.2f} 秒")
+    return total
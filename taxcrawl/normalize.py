@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+文号 / 日期 / 发文单位规范化 (单条版本；整列批量处理见 cleaning.py)
+各站点、各篇正文里同一个文号写法五花八门：
+    财税〔2019〕13号 / 财税[2019]13号 / 财税【2019】13号 / 财税（2019）013号 / 财税 〔２０１９〕 13 号
+    财政部 税务总局公告2019年第39号 / 财政部、税务总局公告2019年第 39 号
+统一成 "财税〔2019〕13号"、"财政部税务总局公告2019年第39号" 这种形式，才能互相对上。
+日期统一成 2019-01-05；发文单位多个机关之间统一用一个空格隔开。
+"""
+
+import datetime
+import re
+
+# 全角数字 / 空白 (cleaning.py 的批量版本也用这几个)
+# 正则只用 [0-9] 和写明的空白字符：pandas 的 pyarrow 字符串列用 RE2，\d \s 只认 ASCII
+FULLWIDTH = str.maketrans("０１２３４５６７８９", "0123456789")
+SPACES = "[\\s\u2000-\u200b\u3000\xa0\ufeff]+"
+JOINERS = r"[、，,·]"
+_SPACES_RE = re.compile(SPACES)
+_JOINERS_RE = re.compile(JOINERS)
+
+# 年份两边的各种括号
+YEAR_BRACKETS = r"[〔\[【（(［]"
+YEAR_BRACKETS_CLOSE = r"[〕\]】）)］]"
+
+# 2019年1月5日 / 2019/1/5 / 2019.01.05 / 2019-01-05 10:00:00 / 20190105
+DATE = r"([0-9]{4}) *[-/.年] *([0-9]{1,2}) *[-/.月] *([0-9]{1,2})"
+COMPACT_DATE = r"^([0-9]{4})([0-9]{2})([0-9]{2})$"
+_DATE_RE = re.compile(DATE)
+_COMPACT_DATE_RE = re.compile(COMPACT_DATE)
+
+# 财税〔2019〕13号
+BRACKET_NO = rf"([一-龥]{{1,40}}){YEAR_BRACKETS}([0-9]{{4}}){YEAR_BRACKETS_CLOSE}第?0*([0-9]+)号"
+BRACKET_NO_RE = re.compile(BRACKET_NO)
+# 国家税务总局公告2023年第1号 / 国家税务总局令第48号
+NOTICE_PREFIX = r"([一-龥]{0,40}?(?:公告|通告|令))"
+NOTICE_NO_RE = re.compile(rf"{NOTICE_PREFIX}(?:([0-9]{{4}})年)?第0*([0-9]+)号")
+
+
+def _squash(text):
+    text = (text or "").translate(FULLWIDTH)
+    return _JOINERS_RE.sub("", _SPACES_RE.sub("", text))
+
+
+def normalize_doc_no(doc_no):
+    """单个文号 -> 规范写法；认不出格式的只去空白、统一全角数字"""
+    text = _squash(doc_no)
+    if not text:
+        return ""
+    m = BRACKET_NO_RE.fullmatch(text)
+    if m:
+        return f"{m.group(1)}〔{m.group(2)}〕{int(m.group(3))}号"
+    m = NOTICE_NO_RE.fullmatch(text)
+    if m:
+        year = f"{m.group(2)}年" if m.group(2) else ""
+        return f"{m.group(1)}{year}第{int(m.group(3))}号"
+    return text
+
+
+def normalize_date(value):
+    """-> "YYYY-MM-DD"，认不出 / 不是合法日期的返回空串"""
+    text = (value or "").translate(FULLWIDTH)
+    m = _DATE_RE.search(text) or _COMPACT_DATE_RE.match(text.strip())
+    if not m:
+        return ""
+    try:
+        return datetime.date(*map(int, m.groups())).isoformat()
+    except ValueError:
+        return ""
+
+
+def normalize_publisher(value):
+    """联合发文的机关之间统一一个空格：财政部、税务总局 -> 财政部 税务总局"""
+    return _SPACES_RE.sub(" ", _JOINERS_RE.sub(" ", value or "")).strip()
+
+
+def doc_no_prefix(doc_no):
+    """规范文号里的发文字 / 发文机关部分 ("财税"、"国家税务总局公告")，用来在正文里切出文号"""
+    m = BRACKET_NO_RE.fullmatch(doc_no) or NOTICE_NO_RE.fullmatch(doc_no)
+    return m.group(1) if m else ""
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+四站合一调度
+- 一个进程、一个事件循环：北京 / 上海 (httpx 异步) 直接并发跑
+- 宁波 / 山东 (DrissionPage 阻塞) 丢进工作线程，不卡事件循环
+- 共用一个 httpx 客户端：按域名的连接池 + HTTP/2 + 礼貌预算 (并发上限 + 最小请求间隔)，见 client.py
+- 共用一个 PolicyStore
+总耗时 ≈ 最慢的那个站点，而不是四个相加
+"""
+
+import asyncio
+import os
+import time
+
+from taxcrawl.client import make_client
+from taxcrawl.sites import load_site
+from taxcrawl.store import PolicyStore
+
+
+def make_shared_client():
+    """四站共用：按域名的连接池 + HTTP/2 + 礼貌预算 (见 client.py)"""
+    return make_client(polite=True, follow_redirects=True)
+
+
+async def _timed(name, coro):
+    start = time.time()
+    try:
+        await coro
+        return name, time.time() - start, None
+    except Exception as e:
+        return name, time.time() - start, e
+
+
+async def run_all(out_dir, sites=("beijing", "shanghai", "ningbo", "shandong"), headless=True, store=None):
+    """并发跑所有站点，返回 [(站点, 耗时, 异常或 None), ...]"""
+    os.makedirs(out_dir, exist_ok=True)
+    own_store = store is None
+    store = store or PolicyStore()
+    jobs = []
+    async with make_shared_client() as client:
+        for name in sites:
+            site = load_site(name)
+            if name == "beijing":
+                regions = site.parse_config(site.TARGET_REGIONS_CONFIG, site.REGION_MAP)
+                categories = site.parse_config(site.TARGET_CATEGORIES_CONFIG, site.CATEGORY_MAP)
+                out = os.path.join(out_dir, site.default_filename(regions, categories))
+                coro = site.main(regions, categories, out, client=client, store=store)
+            elif name == "shanghai":
+                out = os.path.join(out_dir, os.path.basename(site.OUTPUT_FILE))
+                coro = site.main(out, client=client, store=store)
+            elif name == "ningbo":
+                out = os.path.join(out_dir, os.path.basename(site.OUTPUT_FILE))
+                coro = asyncio.to_thread(site.main, out, headless=headless, store=store)
+            elif name == "shandong":
+                out = os.path.join(out_dir, site.FILE_NAME)
+                coro = asyncio.to_thread(site.main, out, headless=headless, store=store)
+            else:
+                raise ValueError(f"未知站点: {name}")
+            jobs.append(_timed(name, coro))
+
+        results = await asyncio.gather(*jobs)
+        client.pool_metrics.report()
+
+    if own_store:
+        store.close()
+    print("\n" + "=" * 60)
+    for name, elapsed, err in results:
+        print(f"  {'❌' if err else '✅'} {name:<9} {elapsed:8.1f} 秒" + (f"  {err}" if err else ""))
+    print("=" * 60)
+    return results
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+性能剖析模式 (--profile 目录)：跑慢了能看出是网络、BeautifulSoup、正则还是 Excel 写入
+- CPU：主线程 (asyncio 事件循环) 和之后启动的工作线程 (标签页池、to_thread) 各挂一个 cProfile，结束时合并
+- 内存：tracemalloc，在各脚本的关键阶段 (checkpoint) 拍快照，记下占用最多的代码行和比上一阶段多出来的
+- 输出固定文件名、不带时间戳、路径去掉本机前缀，两次运行的结果可以直接 diff：
+
+    python -m taxcrawl --profile prof_旧 beijing ...
+    python -m taxcrawl --profile prof_新 beijing ...
+    python -m taxcrawl profile-diff prof_旧 prof_新    # 按耗时占比的变化排序，回归一眼可见
+
+    <站点>.prof         cProfile 原始数据 (snakeviz / pstats 可以打开)
+    <站点>_cpu.txt      按自身耗时、累计耗时、模块汇总的排行
+    <站点>_memory.txt   各阶段内存快照
+多进程队列模式 (beijing --queue) 的 worker 子进程不在剖析范围内。
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+
+TOP = 40
+MEMORY_TOP = 15
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB = os.path.normcase(sysconfig.get_paths()["stdlib"])
+
+_active = None  # 正在运行的 Profiler
+
+
+def checkpoint(label):
+    """各脚本在关键阶段调用；没开 --profile 时什么也不做"""
+    if _active is not None:
+        _active.checkpoint(label)
+
+
+def short_path(filename):
+    """去掉本机路径前缀：项目内用相对路径，第三方库从包名开始，标准库加 stdlib/"""
+    if filename.startswith(("<", "~")):
+        return filename
+    path = os.path.normcase(os.path.abspath(filename))
+    parts = path.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return "/".join(parts[len(parts) - parts[::-1].index("site-packages"):])
+    if path.startswith(os.path.normcase(ROOT) + os.sep):
+        return os.path.relpath(path, os.path.normcase(ROOT)).replace("\\", "/")
+    if path.startswith(_STDLIB + os.sep):
+        return "stdlib/" + os.path.relpath(path, _STDLIB).replace("\\", "/")
+    return os.path.basename(path)
+
+
+def _func_name(key):
+    filename, lineno, name = key
+    if filename == "~":  # 内置函数
+        return name
+    return f"{short_path(filename)}:{lineno}({name})"
+
+
+def _module(key):
+    """模块汇总用：第三方库 / 标准库取包名，项目内取文件名"""
+    filename = key[0]
+    if filename == "~":
+        return "<内置>"
+    short = short_path(filename)
+    if short.startswith("stdlib/"):
+        return "stdlib/" + short.split("/")[1].removesuffix(".py")
+    return short.split("/")[0] if "/" in short and not short.startswith("taxcrawl/") else short
+
+
+class Profiler:
+    def __init__(self, out_dir, name, top=TOP, memory=True):
+        self.out_dir = out_dir
+        self.name = name
+        self.top = top
+        self.memory = memory
+        self._main = cProfile.Profile()
+        self._threads = []  # [(线程名, Profile, Thread)]
+        self._lock = threading.Lock()
+        self._snapshots = []  # [(标签, 耗时, 当前, 峰值, 快照)]
+        self._start = None
+
+    # ---------- 开始 / 结束 ----------
+    def start(self):
+        global _active
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        threading.setprofile(self._bootstrap_thread)
+        self._main.enable()
+        _active = self
+        self.checkpoint("开始")
+        return self
+
+    def _bootstrap_thread(self, frame, event, arg):
+        # 新线程的第一个事件：换成这个线程自己的 cProfile (enable 会替换掉当前这个钩子)
+        sys.setprofile(None)
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Python 3.12+ 的 cProfile 基于 sys.monitoring，全进程只能开一个，工作线程已算进主线程的统计里
+            return
+        with self._lock:
+            self._threads.append((threading.current_thread().name, prof, threading.current_thread()))
+
+    def stop(self):
+        global _active
+        self.checkpoint("结束")
+        self._main.disable()
+        threading.setprofile(None)
+        _active = None
+        elapsed = time.perf_counter() - self._start
+
+        stats = pstats.Stats(self._main)
+        threads = [("MainThread", self._main)]
+        still_running = 0
+        with self._lock:
+            for name, prof, thread in self._threads:
+                if thread.is_alive():  # 还在跑的线程不能安全读它的统计
+                    still_running += 1
+                    continue
+                stats.add(prof)
+                threads.append((name, prof))
+
+        base = os.path.join(self.out_dir, self.name)
+        stats.dump_stats(base + ".prof")
+        with open(base + "_cpu.txt", "w", encoding="utf-8") as f:
+            f.write(self.cpu_report(stats, threads, elapsed, still_running))
+        if self.memory:
+            with open(base + "_memory.txt", "w", encoding="utf-8") as f:
+                f.write(self.memory_report())
+            tracemalloc.stop()
+        print(f"📈 剖析结果已写入 {os.path.abspath(self.out_dir)} ({self.name}_cpu.txt / {self.name}_memory.txt / "
+              f"{self.name}.prof)")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- 内存 ----------
+    def checkpoint(self, label):
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        # 这里只拍快照 (C 实现，快)；过滤、统计留到结束后再做，免得算进 CPU 剖析
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            self._snapshots.append((label, time.perf_counter() - self._start, current, peak, snapshot))
+
+    def memory_report(self):
+        lines = [f"# {self.name} 内存快照 (tracemalloc，按代码行)", ""]
+        previous = None
+        noise = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+        for i, (label, at, current, peak, snapshot) in enumerate(self._snapshots):
+            snapshot = snapshot.filter_traces(noise)
+            lines.append(f"## [{i}] {label}  (+{at:.1f}s)  当前 {current / 1e6:.1f} MB  峰值 {peak / 1e6:.1f} MB")
+            lines.append("   占用最多:")
+            for stat in snapshot.statistics("lineno")[:MEMORY_TOP]:
+                frame = stat.traceback[0]
+                lines.append(f"   {stat.size / 1e6:>9.2f} MB {stat.count:>9}  {short_path(frame.filename)}:{frame.lineno}")
+            if previous is not None:
+                lines.append("   比上一阶段增加最多:")
+                for stat in snapshot.compare_to(previous, "lineno")[:MEMORY_TOP]:
+                    if stat.size_diff <= 0:
+                        break
+                    frame = stat.traceback[0]
+                    lines.append(f"   {stat.size_diff / 1e6:>+9.2f} MB {stat.count_diff:>+9}  "
+                                 f"{short_path(frame.filename)}:{frame.lineno}")
+            lines.append("")
+            previous = snapshot
+        return "\n".join(lines)
+
+    # ---------- CPU ----------
+    def cpu_report(self, stats, threads, elapsed, still_running=0):
+        lines = [f"# {self.name} CPU 剖析  墙钟 {elapsed:.1f}s", "", "## 线程"]
+        for name, prof in threads:
+            st = pstats.Stats(prof)
+            lines.append(f"   {name:<40} {st.total_tt:>9.3f}s")
+        if still_running:
+            lines.append(f"   (另有 {still_running} 个线程结束时仍在运行，未计入)")
+
+        entries = stats.stats  # {(文件, 行, 函数): (原生调用数, 调用数, 自身耗时, 累计耗时, 调用者)}
+        lines += ["", f"## 自身耗时 Top {self.top} (tottime)", f"{'排名':>4} {'自身s':>9} {'累计s':>9} {'调用次数':>10}  函数"]
+        ranked = sorted(entries.items(), key=lambda kv: (-kv[1][2], _func_name(kv[0])))[:self.top]
+        for rank, (key, (cc, nc, tt, ct, _)) in enumerate(ranked, 1):
+            lines.append(f"{rank:>4} {tt:>9.3f} {ct:>9.3f} {nc:>10}  {_func_name(key)}")
+
+        lines += ["", f"## 累计耗时 Top {self.top} (cumtime，含下层调用)",
+                  f"{'排名':>4} {'累计s':>9} {'自身s':>9} {'调用次数':>10}  函数"]
+        ranked = sorted(entries.items(), key=lambda kv: (-kv[1][3], _func_name(kv[0])))[:self.top]
+        for rank, (key, (cc, nc, tt, ct, _)) in enumerate(ranked, 1):
+            lines.append(f"{rank:>4} {ct:>9.3f} {tt:>9.3f} {nc:>10}  {_func_name(key)}")
+
+        # 按模块汇总自身耗时：一眼看出是 bs4、re、openpyxl 还是 ssl / selectors (等网络)
+        modules = {}
+        for key, (cc, nc, tt, ct, _) in entries.items():
+            modules[_module(key)] = modules.get(_module(key), 0.0) + tt
+        total = sum(modules.values()) or 1.0
+        lines += ["", "## 按模块汇总 (自身耗时)"]
+        for name, tt in sorted(modules.items(), key=lambda kv: (-kv[1], kv[0]))[:self.top]:
+            lines.append(f"   {tt:>9.3f}s {tt / total:>6.1%}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- 两次运行对比 ----------
+
+def _shares(path):
+    """.prof -> {函数: (自身耗时占比, 调用次数)}；用占比比较，机器快慢、网络快慢不影响排名"""
+    entries = pstats.Stats(path).stats
+    total = sum(v[2] for v in entries.values()) or 1.0
+    out = {}
+    for key, (cc, nc, tt, ct, _) in entries.items():
+        name = _func_name(key)
+        share, calls = out.get(name, (0.0, 0))
+        out[name] = (share + tt / total, calls + nc)
+    return out
+
+
+def _prof_files(path):
+    if os.path.isdir(path):
+        return {os.path.basename(p)[:-5]: os.path.join(path, p) for p in sorted(os.listdir(path)) if p.endswith(".prof")}
+    return {os.path.basename(path)[:-5]: path}
+
+
+def compare(old, new, top=TOP):
+    """old / new：剖析目录或 .prof 文件，返回对比报告文本"""
+    old_files, new_files = _prof_files(old), _prof_files(new)
+    if len(old_files) == 1 and len(new_files) == 1:
+        pairs = [(next(iter(new_files)), next(iter(old_files.values())), next(iter(new_files.values())))]
+    else:
+        pairs = [(name, old_files[name], new_files[name]) for name in new_files if name in old_files]
+    if not pairs:
+        raise FileNotFoundError(f"{old} 和 {new} 里没有同名的 .prof 可以对比")
+
+    lines = []
+    for name, old_path, new_path in pairs:
+        before, after = _shares(old_path), _shares(new_path)
+        rows = []
+        for func in set(before) | set(after):
+            b, a = before.get(func, (0.0, 0)), after.get(func, (0.0, 0))
+            rows.append((a[0] - b[0], b[0], a[0], b[1], a[1], func))
+        rows.sort(key=lambda r: (-abs(r[0]), r[5]))
+        lines += [f"# {name}: 自身耗时占比变化 Top {top} (正数 = 新的一次更热)",
+                  f"{'变化':>8} {'旧占比':>7} {'新占比':>7} {'旧调用':>10} {'新调用':>10}  函数"]
+        for delta, b, a, bc, ac, func in rows[:top]:
+            lines.append(f"{delta:>+8.1%} {b:>7.1%} {a:>7.1%} {bc:>10} {ac:>10}  {func}")
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+本地只读查询服务 (HTTP/JSON)，不用再打开几十 MB 的 Excel 找文件
+- 只用标准库 ThreadingHTTPServer；每个请求从连接池借一个只读 SQLite 连接 (mode=ro)，
+  爬虫同时在写库也不受影响 (WAL)
+- 筛选条件都有索引 (见 store.SCHEMA)：地区、栏目、有效性、发布日期区间、发文单位、文号前缀
+- 按 (发布日期, 文档键) 倒序的游标分页，翻到再后面也是一次索引定位，不用 OFFSET
+- 库文件没变时直接按 ETag 回 304 / 返回缓存的响应，不查库
+
+    python -m taxcrawl serve --port 8765
+
+    GET /documents?region=北京&status=全文有效&from=2023-01-01&doc_no=财税〔2023〕&limit=50
+    GET /documents?cursor=<上一页返回的 next>
+    GET /documents/beijing:547326        # 单篇：正文、附件、引用关系
+    GET /stats
+
+单篇路径里的文档键要 URL 编码 (urllib.parse.quote(key, safe="")):
+上海、山东、宁波的键本身是链接 ("shanghai:https://…/")，斜杠、问号、末尾的 "/" 都是键的一部分
+"""
+
+import base64
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+CACHE_SIZE = 256
+
+# 列表里不带正文 (单篇接口才有)
+LIST_COLUMNS = ["doc_key", "site", "url", "title", "region", "category", "doc_no", "pub_date", "publisher",
+                "status", "update_time"]
+
+# 查询参数 -> 列；可重复传 (region=北京&region=山东)
+EXACT_FILTERS = {"site": "site", "region": "region", "category": "category", "status": "status"}
+PREFIX_FILTERS = {"publisher": "publisher", "doc_no": "doc_no"}
+
+_MAX_CHAR = "\U0010ffff"
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# ---------- 查询 ----------
+
+def encode_cursor(row):
+    raw = json.dumps([row["pub_date"] or "", row["doc_key"]], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        pub_date, doc_key = json.loads(raw)
+        return str(pub_date), str(doc_key)
+    except (ValueError, TypeError) as e:
+        raise BadRequest(f"cursor 无效: {cursor}") from e
+
+
+def build_query(params):
+    """params: parse_qs 的结果 -> (sql, args, limit)"""
+    where, args = [], []
+    for name, column in EXACT_FILTERS.items():
+        values = [v for v in params.get(name, []) if v]
+        if len(values) == 1:
+            where.append(f"{column} = ?")
+            args.append(values[0])
+        elif values:
+            where.append(f"{column} IN ({','.join('?' * len(values))})")
+            args += values
+    for name, column in PREFIX_FILTERS.items():
+        # 前缀匹配写成区间，能走索引 (LIKE 默认不区分大小写，用不上普通索引)；
+        # 库里的值保留中间的空格 ("国家税务总局 最高人民法院")，这里只去掉首尾空白
+        values = [v.strip() for v in params.get(name, []) if v.strip()]
+        if values:
+            where.append("(" + " OR ".join(f"({column} >= ? AND {column} < ?)" for _ in values) + ")")
+            for v in values:
+                args += [v, v + _MAX_CHAR]
+    if params.get("from", [""])[0]:
+        where.append("pub_date >= ?")
+        args.append(params["from"][0])
+    if params.get("to", [""])[0]:
+        # "2023-12-31" 也要包含当天带时间的 "2023-12-31 10:00:00"
+        where.append("pub_date <= ?")
+        args.append(params["to"][0] + _MAX_CHAR)
+    if params.get("cursor", [""])[0]:
+        where.append("(pub_date, doc_key) < (?, ?)")
+        args += decode_cursor(params["cursor"][0])
+
+    try:
+        limit = min(int(params.get("limit", [DEFAULT_LIMIT])[0]), MAX_LIMIT)
+    except ValueError as e:
+        raise BadRequest("limit 必须是整数") from e
+    if limit < 1:
+        raise BadRequest("limit 必须大于 0")
+
+    sql = (f"SELECT {', '.join(LIST_COLUMNS)} FROM documents"
+           + (" WHERE " + " AND ".join(where) if where else "")
+           + " ORDER BY pub_date DESC, doc_key DESC LIMIT ?")
+    return sql, args + [limit + 1], limit
+
+
+def search(store, params):
+    sql, args, limit = build_query(params)
+    rows = store.query(sql, args)
+    return {"items": rows[:limit], "next": encode_cursor(rows[limit - 1]) if len(rows) > limit else None}
+
+
+def document(store, doc_key):
+    from taxcrawl.normalize import normalize_doc_no
+
+    doc = store.get(doc_key)
+    if doc is None:
+        return None
+    for k in ("content_hash", "first_seen", "last_seen", "last_changed"):
+        doc.pop(k, None)
+    if doc.get("extra"):
+        try:
+            doc["extra"] = json.loads(doc["extra"])
+        except ValueError:
+            pass
+    doc["attachments"] = store.attachments_of(doc["url"]) if doc.get("url") else []
+    doc["cites"] = store.cites(doc_key)
+    doc["cited_by"] = store.cited_by(normalize_doc_no(doc["doc_no"])) if doc.get("doc_no") else []
+    return doc
+
+
+def stats(store):
+    rows = store.site_stats()
+    return {"sites": rows, "total": sum(r["n"] for r in rows)}
+
+
+# ---------- 连接池 / 缓存 ----------
+
+class ReaderPool:
+    """只读连接池：ThreadingHTTPServer 每个连接一个线程，连接用完归还，不跟着线程生灭"""
+
+    def __init__(self, path):
+        from taxcrawl.store import PolicyStore
+
+        self.path = path
+        self._lock = threading.Lock()
+        first = PolicyStore.read_only(path)
+        self.codec = first.codec
+        self._idle = [first]
+
+    def acquire(self):
+        from taxcrawl.store import PolicyStore
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return PolicyStore.read_only(self.path, codec=self.codec)
+
+    def release(self, store):
+        with self._lock:
+            self._idle.append(store)
+
+    def close(self):
+        with self._lock:
+            for store in self._idle:
+                store.close()
+            self._idle = []
+
+    def version(self):
+        """库的版本：主文件 + WAL 的修改时间和大小，任何一次提交都会变"""
+        parts = []
+        for suffix in ("", "-wal"):
+            try:
+                st = os.stat(self.path + suffix)
+                parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+            except OSError:
+                parts.append("-")
+        return "/".join(parts)
+
+
+class ResponseCache:
+    """(库版本, 请求路径) -> (ETag, 响应体)；库一变旧条目自然失效"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = collections.OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+# ---------- HTTP ----------
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "taxcrawl"
+
+    def do_GET(self):
+        start = time.perf_counter()
+        pool, cache = self.server.pool, self.server.cache
+        key = (pool.version(), self.path)
+        etag = '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + '"'
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self._send(304, b"", etag)
+            return
+        cached = cache.get(key)
+        if cached is not None:
+            self._send(200, cached, etag)
+            return
+
+        try:
+            status, payload = self._route()
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            # 不回应直接断开连接，客户端只会看到莫名其妙的连接错误
+            traceback.print_exc()
+            status, payload = 500, {"error": f"服务器内部错误: {e}"}
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if status == 200:
+            cache.put(key, body)
+        self._send(status, body, etag if status == 200 else None)
+        if self.server.verbose:
+            print(f"   🔎 {self.path} -> {status} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    def _route(self):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        params = parse_qs(url.query)
+        collection = path.rstrip("/")  # 末尾的 "/" 只对集合接口忽略，文档键原样保留
+        store = self.server.pool.acquire()
+        try:
+            if collection == "/documents":
+                return 200, search(store, params)
+            if path.startswith("/documents/"):
+                doc = document(store, path[len("/documents/"):])
+                return (200, doc) if doc else (404, {"error": "没有这篇文档"})
+            if collection == "/stats":
+                return 200, stats(store)
+            return 404, {"error": f"没有这个接口: {path}"}
+        finally:
+            self.server.pool.release(store)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # 每次都来验证，库没变就 304
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):  # 默认每个请求打一行到 stderr，太吵
+        pass
+
+
+def serve(path, host="127.0.0.1", port=DEFAULT_PORT, verbose=False):
+    from taxcrawl.store import PolicyStore
+
+    # 用可写连接开一次：建表 / 补上查询用的索引 (老库升级)
+    PolicyStore(path).close()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.pool = ReaderPool(path)
+    server.cache = ResponseCache()
+    server.verbose = verbose
+    print(f"🌐 查询服务已启动: http://{host}:{port}/documents  (库: {path}，Ctrl+C 停止)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        server.pool.close()
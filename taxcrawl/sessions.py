@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+会话保险箱：按域名把浏览器 cookie (含防火墙放行令牌，如 wzws_cid) 存成 JSON，
+下次启动先装回浏览器、用一个轻量请求验证还有效，就不用再过一遍 "安全检查" / 等页面。
+
+- 存放位置：环境变量 TAXCRAWL_SESSIONS，默认 ~/.taxcrawl/sessions/<域名>.json
+- 写文件先写临时文件再替换，中途被杀不会留下半个 JSON
+"""
+
+import json
+import os
+import time
+
+DEFAULT_DIR = os.environ.get("TAXCRAWL_SESSIONS") or os.path.join(os.path.expanduser("~"), ".taxcrawl", "sessions")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+MAX_AGE = 7 * 24 * 3600  # 超过一周的会话直接作废
+
+# 防火墙 / 挑战页的特征
+CHALLENGE_MARKERS = ("wzws", "安全检查")
+
+
+def looks_ok(resp):
+    return resp.status_code < 400 and not any(m in resp.text for m in CHALLENGE_MARKERS)
+
+
+class SessionVault:
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_DIR
+
+    def _path(self, host):
+        return os.path.join(self.root, host.replace(":", "_") + ".json")
+
+    def load(self, host):
+        """未过期的 cookie 列表，没有 / 已过期返回 []"""
+        try:
+            with open(self._path(host), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if time.time() - data.get("saved_at", 0) > MAX_AGE:
+            return []
+        now = time.time()
+        # expires 为 -1 / 缺省的是会话 cookie，照样带上 (防火墙令牌多半是这种)
+        return [c for c in data.get("cookies", []) if not (c.get("expires") or 0) > 0 or c["expires"] > now]
+
+    def save(self, host, cookies):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(host)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"host": host, "saved_at": time.time(), "cookies": cookies}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    def drop(self, host):
+        try:
+            os.remove(self._path(host))
+        except OSError:
+            pass
+
+    # ---------- 验证 ----------
+    def validate(self, cookies, probe_url, ok=looks_ok):
+        """带着 cookie 发一个轻量请求，返回是否仍然有效"""
+        import httpx
+
+        jar = {c["name"]: c["value"] for c in cookies}
+        try:
+            with httpx.Client(headers={"User-Agent": USER_AGENT}, cookies=jar, verify=False,
+                              follow_redirects=True, timeout=10) as client:
+                return bool(ok(client.get(probe_url)))
+        except Exception:
+            return False
+
+    # ---------- 浏览器 (DrissionPage) ----------
+    def restore(self, page, host, probe_url, ok=looks_ok):
+        """把存好的 cookie 装进浏览器；验证通过返回 True，失效的顺手删掉"""
+        cookies = self.load(host)
+        if not cookies:
+            return False
+        if not self.validate(cookies, probe_url, ok):
+            print(f"🍪 {host} 的会话已失效，重新建立")
+            self.drop(host)
+            return False
+        page.set.cookies(cookies)
+        print(f"🍪 已恢复 {host} 的会话 ({len(cookies)} 个 cookie)，跳过首次加载等待")
+        return True
+
+    def capture(self, page, host):
+        """把浏览器当前 cookie 存下来 (在成功拿到数据之后调用)"""
+        try:
+            cookies = [c for c in page.cookies(all_domains=True, all_info=True)
+                       if host.endswith(str(c.get("domain", "")).lstrip("."))]
+        except Exception as e:
+            print(f"⚠️ 保存会话失败: {e}")
+            return
+        if cookies:
+            self.save(host, cookies)
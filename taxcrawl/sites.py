@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+按需加载站点脚本
+脚本文件名带空格 ("beijing f.py")，不能直接 import，这里按路径加载。
+只有真正要跑的站点才会被加载，它依赖的 pandas / DrissionPage 等也才会被导入。
+"""
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SITES = {
+    "beijing": "beijing f.py",
+    "shanghai": "shanghai f.py",
+    "ningbo": "ningbo f.py",
+    "shandong": "shandong f.py",
+}
+
+
+def load_site(name):
+    module_name = f"taxcrawl_site_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, SITES[name]))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
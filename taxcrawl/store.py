@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+"""
+统一存储层 (SQLite)
+- documents: 每篇文档一行，只保留最新版本 + 内容哈希
+- versions : 内容每变化一次记一版，delta 只保存"从新版还原旧版"所需的字段
+- attachments: 附件单独一张表，按文档链接关联，正文不再随附件行重复
+- 正文用 zstd + 自训练字典压缩存储 (见 compress.py)，读出时自动解压
+- 增量判定：更新时间 / 有效性 没变的文档直接跳过，变了才重新入库
+- citations: 正文里抽出的文号引用 (见 citations.py)，正反两个方向都有索引
+- normalized: 批量规范化后的日期 / 文号 / 发文单位 (见 cleaning.py)，原始值不动
+"""
+
+import difflib
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from taxcrawl import compress
+from taxcrawl.compress import BodyCodec
+
+DEFAULT_DB = os.environ.get("TAXCRAWL_DB") or os.path.join(os.path.expanduser("~"), "Desktop", "税务政策库.sqlite3")
+
+# 各站点 Excel 列名 -> 统一字段
+FIELD_MAP = {
+    "地区": "region",
+    "栏目": "category",
+    "标题": "title",
+    "文号": "doc_no", "发文字号": "doc_no",
+    "发布日期": "pub_date", "发文日期": "pub_date",
+    "发文单位": "publisher", "发文机构": "publisher",
+    "有效性": "status",
+    "生效日期": "status",  # 北京的"生效日期"列里放的其实是 yxx 翻译后的有效性
+    "更新时间": "update_time",
+    "正文": "body", "正文内容": "body",
+    "链接": "url",
+}
+
+# 参与内容哈希的字段 (更新时间只是元数据，不算内容)
+TRACKED_FIELDS = ["title", "region", "category", "doc_no", "pub_date", "publisher", "status", "body", "extra"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_key      TEXT PRIMARY KEY,
+    site         TEXT NOT NULL,
+    url          TEXT,
+    title        TEXT,
+    region       TEXT,
+    category     TEXT,
+    doc_no       TEXT,
+    pub_date     TEXT,
+    publisher    TEXT,
+    status       TEXT,
+    update_time  TEXT,
+    body         TEXT,
+    extra        TEXT,
+    content_hash TEXT,
+    version      INTEGER DEFAULT 1,
+    first_seen   REAL,
+    last_seen    REAL,
+    last_changed REAL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_site ON documents(site);
+CREATE INDEX IF NOT EXISTS idx_documents_url ON documents(url);
+-- 查询服务 (service.py) 的筛选 + 按发布日期倒序分页
+CREATE INDEX IF NOT EXISTS idx_documents_pub ON documents(pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_site_pub ON documents(site, pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_region ON documents(region, pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category, pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status, pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_publisher ON documents(publisher, pub_date, doc_key);
+CREATE INDEX IF NOT EXISTS idx_documents_doc_no ON documents(doc_no);
+CREATE TABLE IF NOT EXISTS versions (
+    doc_key      TEXT NOT NULL,
+    version      INTEGER NOT NULL,
+    content_hash TEXT,
+    update_time  TEXT,
+    status       TEXT,
+    saved_at     REAL,
+    delta        TEXT,
+    PRIMARY KEY (doc_key, version)
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    doc_url TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    name    TEXT,
+    url     TEXT,
+    PRIMARY KEY (doc_url, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_attachments_url ON attachments(url);
+-- 展平视图：一附件一行 (老的宁波表格式)，只在查询/导出时拼出来
+CREATE VIEW IF NOT EXISTS attachment_rows AS
+    SELECT d.*, a.name AS attachment_name, a.url AS attachment_url
+    FROM documents d LEFT JOIN attachments a ON a.doc_url = d.url;
+CREATE TABLE IF NOT EXISTS attachment_files (
+    url           TEXT PRIMARY KEY,
+    sha256        TEXT,
+    size          INTEGER,
+    path          TEXT,
+    downloaded_at REAL
+);
+CREATE TABLE IF NOT EXISTS dictionaries (
+    dict_id INTEGER PRIMARY KEY,
+    data    BLOB,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+-- 引用图：src 引用 / 修改 / 废止了文号 dst_no (规范化后的文号)
+CREATE TABLE IF NOT EXISTS citations (
+    src_key  TEXT NOT NULL,
+    dst_no   TEXT NOT NULL,
+    relation TEXT NOT NULL,  -- cites / amends / abolishes
+    PRIMARY KEY (src_key, dst_no, relation)
+);
+CREATE INDEX IF NOT EXISTS idx_citations_dst ON citations(dst_no, relation);
+-- 每篇文档的规范文号 + 抽取时的内容哈希 (增量用)
+CREATE TABLE IF NOT EXISTS citation_docs (
+    doc_key      TEXT PRIMARY KEY,
+    doc_no       TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_citation_docs_no ON citation_docs(doc_no);
+-- 规范化结果单独存：改 documents 会让内容哈希和站点原文对不上，下次抓取又被当成变化
+CREATE TABLE IF NOT EXISTS normalized (
+    doc_key      TEXT PRIMARY KEY,
+    pub_date     TEXT,
+    doc_no       TEXT,
+    publisher    TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_normalized_doc_no ON normalized(doc_no);
+CREATE INDEX IF NOT EXISTS idx_normalized_pub ON normalized(pub_date);
+CREATE VIEW IF NOT EXISTS documents_normalized AS
+    SELECT d.doc_key, d.site, d.url, d.title, d.region, d.category,
+           COALESCE(NULLIF(n.doc_no, ''), d.doc_no) AS doc_no,
+           COALESCE(NULLIF(n.pub_date, ''), d.pub_date) AS pub_date,
+           COALESCE(NULLIF(n.publisher, ''), d.publisher) AS publisher,
+           d.status, d.update_time
+    FROM documents d LEFT JOIN normalized n ON n.doc_key = d.doc_key;
+"""
+
+
+def content_hash(doc):
+    payload = json.dumps([doc.get(f) or "" for f in TRACKED_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_document(record):
+    """把站点的中文列 dict 转成统一字段，认不出的列放进 extra"""
+    doc, extra = {}, {}
+    for k, v in record.items():
+        if v is None or (isinstance(v, float) and v != v):  # NaN
+            v = ""
+        field = FIELD_MAP.get(k)
+        if field:
+            doc[field] = str(v)
+        else:
+            extra[k] = v
+    doc["extra"] = json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else ""
+    return doc
+
+
+def to_row(doc, columns):
+    """统一字段 -> 站点的中文列 (导出 Excel 用)"""
+    extra = json.loads(doc["extra"]) if doc.get("extra") else {}
+    row = {}
+    for col in columns:
+        field = FIELD_MAP.get(col)
+        row[col] = (doc.get(field) or "") if field else extra.get(col, "")
+    return row
+
+
+# ---------- 版本差异 ----------
+
+def _line_patch(src, dst):
+    """生成把 src 变成 dst 的行级补丁 [[i1, i2, 替换行], ...]"""
+    a, b = src.splitlines(True), dst.splitlines(True)
+    ops = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    return [[i1, i2, b[j1:j2]] for tag, i1, i2, j1, j2 in ops if tag != "equal"]
+
+
+def _apply_patch(text, patch):
+    lines = text.splitlines(True)
+    for i1, i2, repl in reversed(patch):
+        lines[i1:i2] = repl
+    return "".join(lines)
+
+
+def reverse_delta(old, new):
+    """记录从新版还原旧版所需的信息：普通字段存旧值，正文存行级补丁"""
+    delta = {}
+    for f in TRACKED_FIELDS:
+        o, n = old.get(f) or "", new.get(f) or ""
+        if o == n:
+            continue
+        if f == "body" and o and n:
+            delta[f] = {"patch": _line_patch(n, o)}
+        else:
+            delta[f] = o
+    return delta
+
+
+def apply_reverse_delta(doc, delta):
+    old = dict(doc)
+    for f, v in delta.items():
+        if isinstance(v, dict) and "patch" in v:
+            old[f] = _apply_patch(doc.get(f) or "", v["patch"])
+        else:
+            old[f] = v
+    return old
+
+
+class PolicyStore:
+    """线程安全的文档库：写操作串行，读操作靠 WAL 不阻塞"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.codec = self._load_codec()
+
+    def _load_codec(self):
+        codec = BodyCodec(loader=self._dictionary)
+        if compress.available():
+            for dict_id, data in self.conn.execute("SELECT dict_id, data FROM dictionaries"):
+                codec.add_dict(data)
+            codec.use(self.get_meta("body_dict_id", 0))
+        return codec
+
+    def _dictionary(self, dict_id):
+        """打开连接之后才训练出来的字典 (解码时遇到不认识的 dict_id 再来库里找)"""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM dictionaries WHERE dict_id=?", (dict_id,)).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def read_only(cls, path=DEFAULT_DB, codec=None):
+        """
+        只读连接 (查询服务用)：mode=ro 打开，不建表、不写，可以和正在写库的爬虫并发 (WAL)。
+        codec 可以在多个连接间共用 (解压器按线程各一份)
+        """
+        self = cls.__new__(cls)
+        self.path = path
+        self._lock = threading.RLock()
+        uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.codec = codec or self._load_codec()
+        return self
+
+    def _doc(self, row):
+        doc = dict(row)
+        if "body" in doc:
+            doc["body"] = self.codec.decode(doc["body"])
+        return doc
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 增量判定 ----------
+    def get(self, doc_key):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM documents WHERE doc_key=?", (doc_key,)).fetchone()
+        return self._doc(row) if row else None
+
+    def needs_fetch(self, doc_key, update_time=None, status=None):
+        """新文档、更新时间变了、有效性变了 -> 需要(重新)抓取"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT update_time, status FROM documents WHERE doc_key=?", (doc_key,)).fetchone()
+        if row is None:
+            return True
+        if update_time is not None and str(update_time) != (row["update_time"] or ""):
+            return True
+        if status is not None and str(status) != (row["status"] or ""):
+            return True
+        return False
+
+    def keys(self, site):
+        with self._lock:
+            return {r[0] for r in self.conn.execute("SELECT doc_key FROM documents WHERE site=?", (site,))}
+
+    def count(self, site=None):
+        with self._lock:
+            if site:
+                return self.conn.execute("SELECT COUNT(*) FROM documents WHERE site=?", (site,)).fetchone()[0]
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # ---------- 写入 ----------
+    def save(self, site, doc_key, record):
+        """
+        入库一条记录 (站点中文列 dict)。
+        返回 "new" / "changed" / "unchanged"
+        """
+        doc = to_document(record)
+        h = content_hash(doc)
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT * FROM documents WHERE doc_key=?", (doc_key,)).fetchone()
+            if old is None:
+                self._insert(site, doc_key, doc, h, now)
+                self.conn.execute(
+                    "INSERT INTO versions VALUES (?,?,?,?,?,?,?)",
+                    (doc_key, 1, h, doc.get("update_time", ""), doc.get("status", ""), now, None))
+                self.conn.commit()
+                return "new"
+
+            old = self._doc(old)
+            if old["content_hash"] == h:
+                # 内容没变，只刷新时间戳 (更新时间可能被站点改了)
+                self.conn.execute(
+                    "UPDATE documents SET update_time=?, last_seen=? WHERE doc_key=?",
+                    (doc.get("update_time", old["update_time"]), now, doc_key))
+                self.conn.commit()
+                return "unchanged"
+
+            version = (old["version"] or 1) + 1
+            delta = reverse_delta(old, doc)
+            self.conn.execute(
+                "INSERT INTO versions VALUES (?,?,?,?,?,?,?)",
+                (doc_key, version, h, doc.get("update_time", ""), doc.get("status", ""), now,
+                 json.dumps(delta, ensure_ascii=False)))
+            self._update(doc_key, doc, h, version, now)
+            self.conn.commit()
+            return "changed"
+
+    INSERT_SQL = (
+        "INSERT {} INTO documents (doc_key, site, url, title, region, category, doc_no, pub_date, publisher, "
+        "status, update_time, body, extra, content_hash, version, first_seen, last_seen, last_changed) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,1,?,?,?)")
+
+    def _insert_values(self, site, doc_key, doc, h, now):
+        return (doc_key, site, doc.get("url", ""), doc.get("title", ""), doc.get("region", ""),
+                doc.get("category", ""), doc.get("doc_no", ""), doc.get("pub_date", ""), doc.get("publisher", ""),
+                doc.get("status", ""), doc.get("update_time", ""), self.codec.encode(doc.get("body", "")),
+                doc.get("extra", ""), h, now, now, now)
+
+    def update_fields(self, doc_key, **fields):
+        """
+        只改几个元数据字段 (如 status)，正文等其余字段不动；照常记一版 delta。
+        返回改之前的文档，没有这篇或值没变返回 None
+        """
+        bad = set(fields) - set(TRACKED_FIELDS) | set(fields) & {"body", "extra"}
+        if bad:
+            raise ValueError(f"update_fields 不能改这些字段: {sorted(bad)}")
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM documents WHERE doc_key=?", (doc_key,)).fetchone()
+            if row is None:
+                return None
+            old = self._doc(row)
+            doc = {f: old.get(f) or "" for f in TRACKED_FIELDS}
+            doc.update({k: str(v) for k, v in fields.items()})
+            h = content_hash(doc)
+            if h == old["content_hash"]:
+                return None
+            version = (old["version"] or 1) + 1
+            self.conn.execute(
+                "INSERT INTO versions VALUES (?,?,?,?,?,?,?)",
+                (doc_key, version, h, old["update_time"], doc.get("status", ""), now,
+                 json.dumps(reverse_delta(old, doc), ensure_ascii=False)))
+            sets = ", ".join(f"{k}=?" for k in fields)
+            self.conn.execute(
+                f"UPDATE documents SET {sets}, content_hash=?, version=?, last_seen=?, last_changed=? WHERE doc_key=?",
+                (*(doc[k] for k in fields), h, version, now, now, doc_key))
+            self.conn.commit()
+        return old
+
+    def statuses(self, site):
+        """{doc_key: 有效性}，有效性巡检比对用 (不读正文)"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT doc_key, status FROM documents WHERE site=?", (site,)).fetchall())
+
+    def _insert(self, site, doc_key, doc, h, now):
+        self.conn.execute(self.INSERT_SQL.format(""), self._insert_values(site, doc_key, doc, h, now))
+
+    def bulk_insert(self, site, items, attachments=None, batch=1000):
+        """
+        批量导入：只插入库里还没有的文档 (已有的以库为准)，每批一个事务。
+        items: 可迭代的 (doc_key, 中文列 dict)；attachments: {文档链接: [{"文件名":..., "链接":...}]}
+        返回新插入的篇数
+        """
+        inserted = 0
+        now = time.time()
+        items = iter(items)
+        while True:
+            chunk = list(itertools.islice(items, batch))
+            if not chunk:
+                break
+            docs, versions = [], []
+            for key, record in chunk:
+                doc = to_document(record)
+                h = content_hash(doc)
+                docs.append(self._insert_values(site, key, doc, h, now))
+                versions.append((key, 1, h, doc.get("update_time", ""), doc.get("status", ""), now, None))
+            with self._lock:
+                before = self.conn.total_changes
+                self.conn.executemany(self.INSERT_SQL.format("OR IGNORE"), docs)
+                inserted += self.conn.total_changes - before
+                self.conn.executemany("INSERT OR IGNORE INTO versions VALUES (?,?,?,?,?,?,?)", versions)
+                self.conn.commit()
+        if attachments:
+            with self._lock:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO attachments VALUES (?,?,?,?)",
+                    [(doc_url, i, a.get("文件名", ""), a.get("链接", ""))
+                     for doc_url, items in attachments.items() for i, a in enumerate(items)])
+                self.conn.commit()
+        return inserted
+
+    def _update(self, doc_key, doc, h, version, now):
+        self.conn.execute(
+            "UPDATE documents SET url=?, title=?, region=?, category=?, doc_no=?, pub_date=?, publisher=?, "
+            "status=?, update_time=?, body=?, extra=?, content_hash=?, version=?, last_seen=?, last_changed=? "
+            "WHERE doc_key=?",
+            (doc.get("url", ""), doc.get("title", ""), doc.get("region", ""), doc.get("category", ""),
+             doc.get("doc_no", ""), doc.get("pub_date", ""), doc.get("publisher", ""), doc.get("status", ""),
+             doc.get("update_time", ""), self.codec.encode(doc.get("body", "")), doc.get("extra", ""), h, version,
+             now, now, doc_key))
+
+    # ---------- 读取 ----------
+    def iter_documents(self, site=None, batch=500):
+        """按批游标读取，不一次性把整库读进内存"""
+        sql = "SELECT * FROM documents" + (" WHERE site=?" if site else "") + " ORDER BY rowid"
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(sql, (site,) if site else ())
+            rows = cur.fetchmany(batch)
+        while rows:
+            for r in rows:
+                yield self._doc(r)
+            with self._lock:
+                rows = cur.fetchmany(batch)
+
+    def history(self, doc_key):
+        """从最新版倒推出所有历史版本 (新 -> 旧)；旧版本的更新时间、有效性取自当时记下的 versions 行"""
+        doc = self.get(doc_key)
+        if not doc:
+            return []
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT version, content_hash, update_time, status, delta, saved_at FROM versions "
+                "WHERE doc_key=? ORDER BY version DESC",
+                (doc_key,)).fetchall()
+        out = []
+        for i, r in enumerate(rows):
+            version = dict(doc, version=r["version"], saved_at=r["saved_at"])
+            if i:  # 最新版用 documents 里的值 (内容没变时更新时间也会刷新)
+                version.update(content_hash=r["content_hash"], update_time=r["update_time"] or "",
+                               status=r["status"] or "")
+            out.append(version)
+            if r["delta"]:
+                doc = apply_reverse_delta(doc, json.loads(r["delta"]))
+        return out
+
+    def query(self, sql, args=()):
+        """只读查询 (筛选条件由调用方拼好，如 service.build_query)，返回 dict 列表"""
+        with self._lock:
+            return [dict(r) for r in self.conn.execute(sql, args).fetchall()]
+
+    def site_stats(self):
+        """各站点的篇数和最新发布日期"""
+        return self.query("SELECT site, COUNT(*) AS n, MAX(pub_date) AS latest FROM documents GROUP BY site")
+
+    # ---------- 正文压缩 ----------
+    def train_body_dictionary(self, sample_limit=compress.SAMPLE_LIMIT, dict_size=compress.DICT_SIZE):
+        """从库里随机抽正文训练字典，之后写入的正文都用它压缩；返回 dict_id"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT body FROM documents WHERE body IS NOT NULL AND body != '' ORDER BY RANDOM() LIMIT ?",
+                (sample_limit,)).fetchall()
+        samples = [self.codec.decode(r[0]) for r in rows]
+        dict_id, data = compress.train_dictionary(samples, dict_size)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO dictionaries VALUES (?,?,?)", (dict_id, data, time.time()))
+            self.conn.commit()
+            self.codec.add_dict(data)
+            self.codec.use(dict_id)
+            self.set_meta("body_dict_id", dict_id)
+        return dict_id
+
+    def recompress(self, batch=500):
+        """用当前字典重写所有正文，返回 (原始字节, 压缩后字节)"""
+        raw = stored = 0
+        with self._lock:
+            keys = [r[0] for r in self.conn.execute("SELECT doc_key FROM documents")]
+        for i in range(0, len(keys), batch):
+            chunk = keys[i:i + batch]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT doc_key, body FROM documents WHERE doc_key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                updates = []
+                for key, body in rows:
+                    text = self.codec.decode(body) or ""
+                    encoded = self.codec.encode(text)
+                    raw += len(text.encode("utf-8"))
+                    stored += len(encoded) if isinstance(encoded, bytes) else len(encoded.encode("utf-8"))
+                    updates.append((encoded, key))
+                self.conn.executemany("UPDATE documents SET body=? WHERE doc_key=?", updates)
+                self.conn.commit()
+        return raw, stored
+
+    # ---------- 附件 ----------
+    def save_attachments(self, doc_url, items):
+        """整体替换某篇文档的附件列表 items=[{"文件名":..., "链接":...}]"""
+        with self._lock:
+            self.conn.execute("DELETE FROM attachments WHERE doc_url=?", (doc_url,))
+            self.conn.executemany(
+                "INSERT INTO attachments VALUES (?,?,?,?)",
+                [(doc_url, i, a.get("文件名", ""), a.get("链接", "")) for i, a in enumerate(items)])
+            self.conn.commit()
+
+    def iter_attachments(self, site=None, batch=500):
+        sql = ("SELECT a.doc_url, a.seq, a.name, a.url, f.sha256, f.path FROM attachments a"
+               " LEFT JOIN attachment_files f ON f.url = a.url"
+               + (" JOIN documents d ON d.url = a.doc_url WHERE d.site=?" if site else "")
+               + " ORDER BY a.doc_url, a.seq")
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(sql, (site,) if site else ())
+            rows = cur.fetchmany(batch)
+        while rows:
+            for r in rows:
+                yield dict(r)
+            with self._lock:
+                rows = cur.fetchmany(batch)
+
+    def attachment_counts(self, site):
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT a.doc_url, COUNT(*) FROM attachments a JOIN documents d ON d.url = a.doc_url "
+                "WHERE d.site=? GROUP BY a.doc_url", (site,)).fetchall())
+
+    def attachments_of(self, doc_url):
+        with self._lock:
+            rows = self.conn.execute("SELECT name, url FROM attachments WHERE doc_url=? ORDER BY seq",
+                                     (doc_url,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def attachment_file(self, url):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM attachment_files WHERE url=?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def save_attachment_file(self, url, sha256, size, path):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO attachment_files VALUES (?,?,?,?,?)",
+                              (url, sha256, size, path, time.time()))
+            self.conn.commit()
+
+    # ---------- 引用图 ----------
+    def doc_nos(self):
+        """库里出现过的所有文号 (原样，去重)"""
+        with self._lock:
+            return [r[0] for r in self.conn.execute("SELECT DISTINCT doc_no FROM documents WHERE doc_no != ''")]
+
+    def citation_state(self):
+        """{doc_key: 抽取引用时的内容哈希}"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT doc_key, content_hash FROM citation_docs").fetchall())
+
+    def save_citations(self, items):
+        """items: [(doc_key, 规范文号, 内容哈希, {(被引文号, 关系)})]，整篇替换"""
+        with self._lock:
+            keys = [(k,) for k, _, _, _ in items]
+            self.conn.executemany("DELETE FROM citations WHERE src_key=?", keys)
+            self.conn.executemany("INSERT OR REPLACE INTO citation_docs VALUES (?,?,?)",
+                                  [(k, no, h) for k, no, h, _ in items])
+            self.conn.executemany("INSERT OR IGNORE INTO citations VALUES (?,?,?)",
+                                  [(k, dst, rel) for k, _, _, edges in items for dst, rel in edges])
+            self.conn.commit()
+
+    def cites(self, doc_key):
+        """这篇引用了哪些文号，能在库里找到的带上目标文档"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT c.dst_no AS doc_no, c.relation, t.doc_key AS target_key, d.title AS target_title "
+                "FROM citations c LEFT JOIN citation_docs t ON t.doc_no = c.dst_no "
+                "LEFT JOIN documents d ON d.doc_key = t.doc_key "
+                "WHERE c.src_key=? ORDER BY c.relation, c.dst_no", (doc_key,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def cited_by(self, doc_no, relation=None):
+        """谁引用 / 修改 / 废止了这个文号 (doc_no 须是规范文号)"""
+        sql = ("SELECT c.src_key, c.relation, d.title, d.doc_no FROM citations c "
+               "JOIN documents d ON d.doc_key = c.src_key WHERE c.dst_no=?"
+               + (" AND c.relation=?" if relation else "") + " ORDER BY c.relation, d.pub_date DESC")
+        with self._lock:
+            rows = self.conn.execute(sql, (doc_no, relation) if relation else (doc_no,)).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------- 规范化 ----------
+    def normalize_batch(self, after, limit, full=False):
+        """rowid > after 的下一批文档 (rid, 文档键, 日期, 文号, 发文单位, 内容哈希)；full=False 时只取规范化以后又变了的"""
+        return self.query(
+            "SELECT d.rowid AS rid, d.doc_key, d.pub_date, d.doc_no, d.publisher, d.content_hash FROM documents d"
+            + ("" if full else " LEFT JOIN normalized n ON n.doc_key = d.doc_key")
+            + " WHERE d.rowid > ?"
+            + ("" if full else " AND n.content_hash IS NOT d.content_hash")
+            + " ORDER BY d.rowid LIMIT ?", (after, limit))
+
+    def save_normalized(self, rows):
+        """rows: [(doc_key, 日期, 文号, 发文单位, 内容哈希)]"""
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO normalized VALUES (?,?,?,?,?)", rows)
+            self.conn.commit()
+
+    # ---------- 杂项 ----------
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?,?)", (key, json.dumps(value, ensure_ascii=False)))
+            self.conn.commit()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+有效性巡检：只重读各站点的状态字段 (北京列表接口的 yxx、山东详情页的 xxgkbg 表)，
+和库里比对，变了的只改 status 并记一版，不重抓正文。
+结束时单独列出新变成 全文废止 / 全文失效 的文件 (合规最关心的)。
+
+    python -m taxcrawl sweep                    # 北京 + 山东
+    python -m taxcrawl sweep --sites beijing --report 有效性变更.csv
+"""
+
+import csv
+import time
+
+DEAD_STATUSES = ("全文废止", "全文失效")
+
+
+class Change:
+    __slots__ = ("doc_key", "title", "url", "old", "new")
+
+    def __init__(self, doc_key, title, url, old, new):
+        self.doc_key, self.title, self.url, self.old, self.new = doc_key, title, url, old, new
+
+    @property
+    def newly_dead(self):
+        return self.new in DEAD_STATUSES and self.old not in DEAD_STATUSES
+
+
+def apply_status(store, doc_key, status, known):
+    """
+    known: {doc_key: 库里的有效性} (store.statuses)。
+    有效性变了就入库并返回 Change，没变 / 库里没有这篇返回 None
+    """
+    if not status or doc_key not in known or (known[doc_key] or "") == status:
+        return None
+    old = store.update_fields(doc_key, status=status)
+    if old is None:
+        return None
+    known[doc_key] = status
+    return Change(doc_key, old["title"], old["url"], old["status"] or "", status)
+
+
+def report(changes, path=None):
+    dead = [c for c in changes if c.newly_dead]
+    print("\n" + "=" * 60)
+    print(f"🔍 有效性变更 {len(changes)} 篇，其中新废止/失效 {len(dead)} 篇")
+    for c in dead:
+        print(f"  ⛔ [{c.new}] {c.title[:40]}  ({c.old or '空'} -> {c.new})  {c.url}")
+    for c in changes:
+        if not c.newly_dead:
+            print(f"  🔁 [{c.new}] {c.title[:40]}  ({c.old or '空'} -> {c.new})")
+    print("=" * 60)
+    if path:
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["文档", "标题", "链接", "原有效性", "新有效性", "新废止/失效"])
+            for c in changes:
+                w.writerow([c.doc_key, c.title, c.url, c.old, c.new, "是" if c.newly_dead else ""])
+        print(f"📝 变更明细已写入 {path}")
+    return dead
+
+
+def run_sweep(sites=("beijing", "shandong"), regions=None, categories=None, headless=True, report_path=None,
+              store=None):
+    """regions / categories 只对北京有效，默认用脚本里的配置"""
+    import asyncio
+
+    from taxcrawl.sites import load_site
+    from taxcrawl.store import PolicyStore
+
+    own_store = store is None
+    store = store or PolicyStore()
+    changes = []
+    try:
+        for name in sites:
+            site = load_site(name)
+            start = time.time()
+            if name == "beijing":
+                found = asyncio.run(site.sweep_status(
+                    site.parse_config(regions or site.TARGET_REGIONS_CONFIG, site.REGION_MAP),
+                    site.parse_config(categories or site.TARGET_CATEGORIES_CONFIG, site.CATEGORY_MAP),
+                    store=store))
+            elif name == "shandong":
+                found = site.sweep_status(headless=headless, store=store)
+            else:
+                raise ValueError(f"{name} 不支持有效性巡检 (没有状态字段)")
+            print(f"✅ {name}: 变更 {len(found)} 篇，用时 {time.time() - start:.1f} 秒")
+            changes += found
+    finally:
+        if own_store:
+            store.close()
+    report(changes, report_path)
+    return changes
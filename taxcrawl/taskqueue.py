@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+带租约的任务队列 (SQLite 文件)
+- 任务单位：(地区, 栏目, 页码)
+- claim 时领取租约，处理中定期 heartbeat 续约；租约过期自动回到待领取
+- 多个进程 / 多台机器指向同一个文件即可分摊抓取 (共享盘要支持文件锁)
+- 结果按文档 id 入库 (PolicyStore.save)，重复处理也不会重复入库
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    region      TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',  -- pending / leased / done / failed
+    owner       TEXT,
+    lease_until REAL,
+    attempts    INTEGER DEFAULT 0,
+    error       TEXT,
+    updated     REAL,
+    UNIQUE (region, category, page)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def new_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class TaskQueue:
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # isolation_level=None：事务自己用 BEGIN IMMEDIATE 控制
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 投递 ----------
+    def add(self, units):
+        """units: 可迭代的 (地区, 栏目, 页码)；已存在的忽略，返回新增数"""
+        now = time.time()
+        cur = self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (region, category, page, updated) VALUES (?,?,?,?)",
+            [(r, c, p, now) for r, c, p in units])
+        return cur.rowcount
+
+    def requeue(self, units):
+        """重新投递：没有的新增，已完成 / 已失败的放回待领取 (重试次数清零)；处理中的不动"""
+        units = list(units)
+        now = time.time()
+        self.add(units)
+        self.conn.executemany(
+            "UPDATE tasks SET state='pending', owner=NULL, lease_until=NULL, attempts=0, error=NULL, updated=? "
+            "WHERE region=? AND category=? AND page=? AND state IN ('done', 'failed')",
+            [(now, r, c, p) for r, c, p in units])
+
+    # ---------- 领取 / 续约 / 完成 ----------
+    def claim(self, worker_id):
+        """
+        领取一个任务 (顺便把过期租约放回队列，和 fail 一样超过重试次数的标记 failed)，没有可领的返回 None
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 每次领取已经算过一次 attempts；一领就把 worker 搞崩的任务不会无限循环
+            self.conn.execute(
+                "UPDATE tasks SET state=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, owner=NULL, "
+                "lease_until=NULL, error=CASE WHEN attempts >= ? THEN '租约过期' ELSE error END, updated=? "
+                "WHERE state='leased' AND lease_until < ?",
+                (self.max_attempts, self.max_attempts, now, now))
+            row = self.conn.execute(
+                "SELECT * FROM tasks WHERE state='pending' ORDER BY page, id LIMIT 1").fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET state='leased', owner=?, lease_until=?, attempts=attempts+1, updated=? "
+                "WHERE id=?", (worker_id, now + self.lease_seconds, now, row["id"]))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return dict(row)
+
+    def heartbeat(self, task_id, worker_id):
+        """续约；租约已被别人接手时返回 False"""
+        cur = self.conn.execute(
+            "UPDATE tasks SET lease_until=?, updated=? WHERE id=? AND owner=? AND state='leased'",
+            (time.time() + self.lease_seconds, time.time(), task_id, worker_id))
+        return cur.rowcount == 1
+
+    def complete(self, task_id, worker_id):
+        self.conn.execute(
+            "UPDATE tasks SET state='done', lease_until=NULL, error=NULL, updated=? WHERE id=? AND owner=?",
+            (time.time(), task_id, worker_id))
+
+    def fail(self, task_id, worker_id, error=""):
+        """失败：没超过重试次数就放回队列，否则标记 failed"""
+        self.conn.execute(
+            "UPDATE tasks SET state=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner=NULL, lease_until=NULL, error=?, updated=? WHERE id=? AND owner=?",
+            (self.max_attempts, str(error)[:500], time.time(), task_id, worker_id))
+
+    # ---------- 共享参数 (所有 worker 一致) ----------
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?,?)", (key, json.dumps(value)))
+
+    def setdefault_meta(self, key, value):
+        """先写者为准，返回最终生效的值"""
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES (?,?)", (key, json.dumps(value)))
+        return self.get_meta(key)
+
+    # ---------- 状态 ----------
+    def has_open(self):
+        """还有待领取或处理中的任务吗"""
+        return self.conn.execute(
+            "SELECT 1 FROM tasks WHERE state IN ('pending', 'leased') LIMIT 1").fetchone() is not None
+
+    def stats(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+链接规范化 / 去重键
+同一篇文件经常从不同入口拿到不同写法的链接：相对/绝对、http/https、带 #锚点、
+默认端口、不同栏目目录 (zzs/.../t20230105_12345.html 和 qysds/.../t20230105_12345.html)。
+- canonical_url: 规范化链接 (入库 doc_key 用)
+- dedup_key    : 能从路径里认出文章 id (TRS 的 tYYYYMMDD_NNN) 就用文章 id，否则用规范化链接
+"""
+
+import posixpath
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+# TRS 发布系统的文章文件名：t20230105_12345.html
+ARTICLE_ID_RE = re.compile(r"/(t\d{8}_\d+)\.s?html?$", re.I)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+INDEX_PAGES = ("index.html", "index.htm", "index.shtml")
+
+
+def canonical_url(url, base=None):
+    """
+    规范化：补全相对链接、统一 https、域名小写、去默认端口、去锚点、
+    合并重复斜杠和 ./ ../、去掉目录默认页 index.html、查询参数排序
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url  # mailto: / javascript: 之类原样返回
+
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in DEFAULT_PORTS.values():  # 统一成 https 后默认端口都去掉
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.rsplit("/", 1)[-1].lower() in INDEX_PAGES:
+        path = path.rsplit("/", 1)[0] + "/"
+    elif trailing and not path.endswith("/"):
+        path += "/"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def article_id(url):
+    """路径里的文章 id (如 t20230105_12345)，认不出返回空串"""
+    m = ARTICLE_ID_RE.search(urlsplit(url).path) if url else None
+    return m.group(1).lower() if m else ""
+
+
+def dedup_key(url, base=None):
+    """去重键：同一域名下文章 id 相同即视为同一篇"""
+    url = canonical_url(url, base)
+    aid = article_id(url)
+    return f"{urlsplit(url).hostname}#{aid}" if aid else url
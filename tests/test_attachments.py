@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import os
+
+import httpx
+
+from taxcrawl.attachments import _part_path, download_attachments, download_one
+from taxcrawl.store import PolicyStore
+
+URL = "https://example.com/files/表格.pdf"
+CONTENT = bytes(range(256)) * 1000
+
+
+def server(mode="range", content=CONTENT):
+    """
+    mode: range = 支持 Range；ignore = 忽略 Range 总回 200；wrong = 回 206 但内容从 0 开始。
+    每次请求的 Range 头记在 seen 里
+    """
+    seen = []
+
+    def handler(request):
+        rng = request.headers.get("Range")
+        seen.append(rng)
+        if rng and mode == "range":
+            start = int(rng[len("bytes="):-1])
+            if start >= len(content):
+                return httpx.Response(416)
+            return httpx.Response(206, content=content[start:],
+                                  headers={"Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"})
+        if rng and mode == "wrong":
+            return httpx.Response(206, content=content,
+                                  headers={"Content-Range": f"bytes 0-{len(content) - 1}/{len(content)}"})
+        return httpx.Response(200, content=content)
+
+    return httpx.MockTransport(handler), seen
+
+
+def download(root, transport, url=URL):
+    async def go():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await download_one(client, asyncio.Semaphore(1), url, str(root))
+    return asyncio.run(go())
+
+
+def write_part(root, data, url=URL):
+    part = _part_path(str(root), url)
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    with open(part, "wb") as f:
+        f.write(data)
+    return part
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_download_is_content_addressed(tmp_path):
+    transport, seen = server()
+    sha256, size, path = download(tmp_path, transport)
+    assert sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert size == len(CONTENT)
+    assert path == os.path.join(str(tmp_path), "objects", sha256[:2], sha256 + ".pdf")
+    assert read(path) == CONTENT
+    assert seen == [None]
+    assert not os.path.exists(_part_path(str(tmp_path), URL))
+
+
+def test_resume_continues_from_partial_file(tmp_path):
+    write_part(tmp_path, CONTENT[:100000])
+    transport, seen = server("range")
+    sha256, size, path = download(tmp_path, transport)
+    assert seen == ["bytes=100000-"]
+    assert (sha256, size) == (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT))
+    assert read(path) == CONTENT
+
+
+def test_server_without_range_support_restarts_from_zero(tmp_path):
+    write_part(tmp_path, CONTENT[:100000])
+    transport, seen = server("ignore")
+    sha256, size, path = download(tmp_path, transport)
+    assert seen == ["bytes=100000-"]
+    assert size == len(CONTENT)
+    assert read(path) == CONTENT
+
+
+def test_mismatched_content_range_restarts_from_zero(tmp_path):
+    write_part(tmp_path, CONTENT[:100000])
+    transport, seen = server("wrong")
+    sha256, size, path = download(tmp_path, transport)
+    assert seen == ["bytes=100000-", None]
+    assert (sha256, size) == (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT))
+    assert read(path) == CONTENT
+
+
+def test_416_means_partial_file_is_already_complete(tmp_path):
+    write_part(tmp_path, CONTENT)
+    transport, _ = server("range")
+    sha256, size, path = download(tmp_path, transport)
+    assert (sha256, size) == (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT))
+    assert read(path) == CONTENT
+
+
+def test_same_content_under_two_urls_is_stored_once(tmp_path):
+    transport, _ = server()
+    urls = ["https://example.com/a.pdf", "https://example.com/b.pdf"]
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        async def go():
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await download_attachments(urls, str(tmp_path / "files"), store, client=client)
+        assert asyncio.run(go()) == (2, 1, 0)
+        a, b = (store.attachment_file(u) for u in urls)
+        assert a["path"] == b["path"] and a["sha256"] == b["sha256"]
+        # 再跑一次：库里有记录、文件也在，不再下载
+        assert asyncio.run(go()) == (0, 0, 0)
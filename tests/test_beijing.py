@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+import pytest
+
+from taxcrawl.sites import load_site
+from taxcrawl.store import PolicyStore
+from taxcrawl.taskqueue import TaskQueue
+
+beijing = load_site("beijing")
+
+
+class FakeListApi:
+    """列表接口：共 total 条；cap = 服务器实际允许的最大页大小 (超过就按 cap 返回)"""
+
+    def __init__(self, total, cap=1000):
+        self.total, self.cap, self.calls = total, cap, 0
+
+    async def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        size = min(json["PageSize"], self.cap)
+        start = (json["PageNumber"] - 1) * size
+        items = [{"id": str(i)} for i in range(start, min(start + size, self.total))]
+        data = {"Response": {"Data": {"List": items, "Total": self.total}}}
+        return type("Resp", (), {"json": lambda self: data})()
+
+
+@pytest.fixture
+def store(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as s:
+        yield s
+
+
+def negotiate(api, store):
+    return asyncio.run(beijing.negotiate_page_size(api, store, "r", "c"))
+
+
+def test_largest_accepted_size_is_negotiated_and_cached(store):
+    api = FakeListApi(total=2500)
+    assert negotiate(api, store) == 1000
+    calls = api.calls
+    assert negotiate(api, store) == 1000
+    assert api.calls == calls  # 第二次直接用缓存
+
+
+def test_server_cap_is_detected(store):
+    assert negotiate(FakeListApi(total=2500, cap=200), store) == 200
+
+
+def test_server_ignoring_page_size_falls_back_to_default(store):
+    assert negotiate(FakeListApi(total=2500, cap=beijing.PAGE_SIZE), store) == beijing.PAGE_SIZE
+
+
+def test_no_data_is_not_cached(store):
+    api = FakeListApi(total=0)
+    assert negotiate(api, store) is None
+    assert store.get_meta(f"page_size:{beijing.LIST_API}") is None
+
+
+def test_size_not_proven_by_a_full_page_is_not_cached(store):
+    # 只有 300 条：1000 没法验证是否封顶，本次可用但不缓存
+    assert negotiate(FakeListApi(total=300), store) == 1000
+    assert store.get_meta(f"page_size:{beijing.LIST_API}") is None
+
+
+def test_crawl_renegotiates_when_cached_size_is_capped(store, tmp_path):
+    store.set_meta(f"page_size:{beijing.LIST_API}", {"size": 1000, "at": beijing.time.time()})
+    api = FakeListApi(total=2500, cap=200)
+    asyncio.run(beijing.main(["北京"], ["政策法规"], str(tmp_path / "out.xlsx"), client=api, store=store))
+    assert store.count("beijing") == 2500
+    assert store.get_meta(f"page_size:{beijing.LIST_API}")["size"] == 200
+
+
+def test_failing_page_is_retried_then_raised(store, monkeypatch):
+    calls = []
+
+    class Flaky:
+        async def post(self, url, json=None, **kwargs):
+            calls.append(json["PageNumber"])
+            raise httpx.ConnectTimeout("timeout")
+
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr(beijing.asyncio, "sleep", no_sleep)
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(beijing.fetch_page_and_details(Flaky(), 3, store, 1, 2, "北京", "政策法规"))
+    assert calls == [3] * beijing.LIST_RETRIES
+
+
+def test_queue_task_requeues_combo_when_size_is_capped(store, tmp_path):
+    with TaskQueue(str(tmp_path / "q.sqlite3")) as queue:
+        queue.set_meta("page_size", 1000)
+        beijing.seed_queue(queue, ["北京"], ["政策法规"])
+        task = queue.claim("w")
+        asyncio.run(beijing.run_queue_task(FakeListApi(total=2500, cap=200), store, queue, task))
+        assert queue.get_meta("page_size") == 200
+        assert queue.stats()["pending"] == 12  # 第 2~13 页；第 1 页还在本 worker 手里
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from taxcrawl.browser import TabPool
+
+
+class FakeTab:
+    def close(self):
+        pass
+
+    def run_js(self, js):
+        return 0
+
+
+class FakePage:
+    """new_tab 只能成功 tabs 次，之后报错"""
+
+    def __init__(self, tabs):
+        self.left = tabs
+
+    def new_tab(self):
+        if self.left <= 0:
+            raise OSError("浏览器没响应")
+        self.left -= 1
+        return FakeTab()
+
+
+def test_failures_are_counted_per_tab():
+    def func(tab, item):
+        if item % 2:
+            raise ValueError(item)
+        return item * 10
+
+    with TabPool(FakePage(2), size=2) as pool:
+        out = list(pool.run(func, range(6)))
+        assert sorted(r for _, r, e in out if e is None) == [0, 20, 40]
+        assert sum(s.errors for s in pool.stats) == 3
+        assert sum(s.pages for s in pool.stats) == 6
+
+
+def test_lost_tab_leaves_work_to_the_others():
+    # 只能再开 1 个新标签页：一个标签页回收失败退出，剩下的由另一个做完
+    with TabPool(FakePage(3), size=2, recycle_after=2) as pool:
+        out = list(pool.run(lambda tab, item: item, range(6)))
+        assert sorted(r for _, r, _ in out) == list(range(6))
+
+
+def test_run_raises_when_no_tab_is_left():
+    pool = TabPool(FakePage(1), size=1, recycle_after=1)
+    out = []
+    with pytest.raises(RuntimeError) as exc:
+        for row in pool.run(lambda tab, item: item, range(3)):
+            out.append(row)
+    assert [r for _, r, _ in out] == [0]
+    assert isinstance(exc.value.__cause__, OSError)
+    pool.close()
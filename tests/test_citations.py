@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.citations import build_citations, extract_citations, known_prefixes, trim_prefix
+from taxcrawl.store import PolicyStore
+
+
+def test_cites_with_verb_in_sentence():
+    text = "根据《财政部 税务总局关于实施小微企业普惠性税收减免政策的通知》（财税〔2019〕13号）规定，现公告如下。"
+    assert extract_citations(text) == {("财税〔2019〕13号", "cites")}
+
+
+def test_relation_falls_back_to_title():
+    text = "现将国家税务总局公告2019年第5号第二条修改如下："
+    assert extract_citations(text, title="国家税务总局关于修改部分税收规范性文件的公告") == {
+        ("国家税务总局公告2019年第5号", "amends")}
+    assert extract_citations("下列文件：财税〔2015〕1号。", title="关于公布全文废止的税收规范性文件目录的公告") == {
+        ("财税〔2015〕1号", "abolishes")}
+
+
+def test_own_number_and_bare_notice_are_skipped():
+    text = "本公告（财税〔2019〕13号）自发布之日起施行，公告2023年第1号同时废止。"
+    assert extract_citations(text, own_no="财税〔2019〕13号") == set()
+
+
+def test_doc_numbers_are_normalized():
+    assert extract_citations("依据 财税 [2019] 第 013 号") == {("财税〔2019〕13号", "cites")}
+
+
+def test_known_prefix_needs_a_word_boundary():
+    known = known_prefixes(["京财税〔2011〕1号", "财税〔2019〕13号"])
+    assert extract_citations("按照京财税〔2011〕418号执行。", known=known) == {("京财税〔2011〕418号", "cites")}
+    assert trim_prefix("根据财税", known) == "财税"
+    assert trim_prefix("财政部和财税", known) == "财税"
+
+
+def test_verb_swallowed_by_the_prefix_still_counts():
+    assert extract_citations("自2023年1月1日起，废止财税〔2018〕50号第三条。") == {("财税〔2018〕50号", "abolishes")}
+    assert extract_citations("第五条（此条已废止，详见财税〔2020〕8号）") == {("财税〔2020〕8号", "cites")}
+    assert extract_citations("修改国家税务总局公告2018年第31号。") == {("国家税务总局公告2018年第31号", "amends")}
+
+
+def test_build_citations_reads_doc_numbers_through_the_store(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        store.save("beijing", "beijing:1", {"标题": "甲", "文号": "京财税〔2011〕1号", "正文": "按照京财税〔2011〕418号执行。"})
+        store.save("beijing", "beijing:2", {"标题": "乙", "文号": "", "正文": ""})
+        assert store.doc_nos() == ["京财税〔2011〕1号"]
+        assert build_citations(store) == (2, 1)
+        assert [e["doc_no"] for e in store.cites("beijing:1")] == ["京财税〔2011〕418号"]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from taxcrawl.cleaning import benchmark, normalize_frame, run_normalize
+from taxcrawl.normalize import normalize_date, normalize_doc_no, normalize_publisher
+from taxcrawl.store import PolicyStore
+
+DATES = ["2023年1月5日", "2023-01-05 10:00:00", "20230105", "发布日期：2023/1/5", "２０２３年１月５日", "2023 年 1 月 5 日",
+         "", "无", "2023-02-30", "2023.1.5"]
+DOC_NOS = ["财税 [2019] 第013号", "国家税务总局公告２０１９年第０５号", "税总函〔2019〕 356号", "国家税务总局公告第5号",
+           "财税　〔2019〕13号", "", "其他", "京财税【2011】418号"]
+PUBLISHERS = ["国家税务总局、财政部", "国家税务总局　 财政部 ", "国家税务总局 财政部", "", "国家税务总局，海关总署"]
+
+
+def test_vectorized_matches_per_row():
+    n = max(len(DATES), len(DOC_NOS), len(PUBLISHERS))
+    df = pd.DataFrame({
+        "pub_date": (DATES * n)[:n],
+        "doc_no": (DOC_NOS * n)[:n],
+        "publisher": (PUBLISHERS * n)[:n],
+    })
+    out = normalize_frame(df)
+    assert list(out["pub_date"]) == [normalize_date(v) for v in df["pub_date"]]
+    assert list(out["doc_no"]) == [normalize_doc_no(v) for v in df["doc_no"]]
+    assert list(out["publisher"]) == [normalize_publisher(v) for v in df["publisher"]]
+
+
+def test_expected_values():
+    out = normalize_frame(pd.DataFrame({"pub_date": ["２０２３年１月５日"], "doc_no": ["财税 [2019] 第013号"],
+                                        "publisher": ["国家税务总局、财政部"]}))
+    assert out.iloc[0].tolist() == ["2023-01-05", "财税〔2019〕13号", "国家税务总局 财政部"]
+    out = normalize_frame(pd.DataFrame({"pub_date": [None], "doc_no": [None], "publisher": [None]}))
+    assert out.iloc[0].tolist() == ["", "", ""]
+
+
+def test_run_normalize_is_incremental(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        store.save("beijing", "beijing:1", {"标题": "a", "发布日期": "2023年1月5日", "文号": "财税 [2019] 第013号"})
+        store.save("beijing", "beijing:2", {"标题": "b", "发布日期": "20230106"})
+        assert run_normalize(store, chunk_size=1) == 2
+        assert run_normalize(store) == 0
+        store.save("beijing", "beijing:2", {"标题": "b", "发布日期": "2023/1/7"})
+        assert run_normalize(store) == 1
+        rows = store.query("SELECT doc_key, pub_date, doc_no FROM documents_normalized ORDER BY doc_key")
+        assert [tuple(r.values()) for r in rows] == [("beijing:1", "2023-01-05", "财税〔2019〕13号"), ("beijing:2", "2023-01-07", "")]
+
+
+def test_benchmark_matches_per_row_results(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        store.save("beijing", "beijing:1", {"标题": "a", "发布日期": "2023年1月5日", "文号": "财税 [2019] 第013号"})
+        assert benchmark(store, n=10)[2] == 0
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from taxcrawl import compress
+from taxcrawl.store import PolicyStore
+
+pytestmark = pytest.mark.skipif(not compress.available(), reason="需要 zstandard")
+
+
+def body(i):
+    return (f"国家税务总局关于第{i}号事项的公告\n为贯彻落实党中央、国务院决策部署，进一步支持小微企业发展，"
+            f"现就有关税收政策公告如下：一、对月销售额{i * 1000}元以下的增值税小规模纳税人，免征增值税。"
+            f"二、本公告自2023年{i % 12 + 1}月1日起施行。特此公告。") * 3
+
+
+def test_reader_opened_before_training_can_read_new_dictionary(tmp_path):
+    path = str(tmp_path / "t.sqlite3")
+    with PolicyStore(path) as writer, PolicyStore.read_only(path) as reader:
+        for i in range(300):
+            writer.save("beijing", f"beijing:{i}", {"标题": str(i), "正文": body(i)})
+        assert reader.get("beijing:7")["body"] == body(7)
+
+        dict_id = writer.train_body_dictionary(dict_size=8 * 1024)
+        writer.recompress()
+        assert dict_id not in reader.codec._dicts
+
+        assert reader.get("beijing:7")["body"] == body(7)
+        assert dict_id in reader.codec._dicts
+
+
+def test_unknown_dictionary_still_fails_loudly(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        for i in range(300):
+            store.save("beijing", f"beijing:{i}", {"标题": str(i), "正文": body(i)})
+        store.train_body_dictionary(dict_size=8 * 1024)
+        store.recompress()
+        blob = store.conn.execute("SELECT body FROM documents WHERE doc_key='beijing:7'").fetchone()[0]
+        with pytest.raises(KeyError):
+            compress.BodyCodec(loader=lambda dict_id: None).decode(blob)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+
+from openpyxl import load_workbook
+
+from taxcrawl.export import CELL_LIMIT, export_excel
+
+COLUMNS = ["标题", "正文", "链接"]
+
+
+def read_sheets(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return {ws.title: [["" if v is None else v for v in row] for row in ws.iter_rows(values_only=True)]
+                for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def test_rows_are_routed_to_sheets_in_one_pass(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    rows = [("甲", {"标题": "一", "正文": "a", "链接": "u1"}),
+            ("乙", {"标题": "二", "正文": "b", "链接": "u2"}),
+            ("甲", {"标题": "三", "正文": "c", "链接": "u3"})]
+    assert export_excel(path, {"甲": COLUMNS, "乙": COLUMNS}, rows) == {"甲": 2, "乙": 1}
+    sheets = read_sheets(path)
+    assert sheets["甲"][0] == COLUMNS + ["正文(续1)", "正文(续2)"]
+    assert [r[0] for r in sheets["甲"][1:]] == ["一", "三"]
+    assert [r[0] for r in sheets["乙"][1:]] == ["二"]
+    assert not os.path.exists(path + ".tmp.xlsx")
+
+
+def test_long_body_is_split_into_overflow_columns(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    body = ("第一条 纳税人应当依法申报。\n" * 5000)[:70000]
+    export_excel(path, {"Sheet1": COLUMNS}, [("Sheet1", {"标题": "长", "正文": body, "链接": "u"})])
+    header, row = read_sheets(path)["Sheet1"]
+    cells = [row[header.index(c)] for c in ("正文", "正文(续1)", "正文(续2)")]
+    assert all(len(c) <= CELL_LIMIT for c in cells)
+    assert "".join(cells) == body
+
+
+def test_body_too_long_for_cells_goes_to_side_file(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    body = "税" * (CELL_LIMIT * 3 + 10)
+    export_excel(path, {"Sheet1": COLUMNS}, [("Sheet1", {"标题": "超长", "正文": body, "链接": "u"})])
+    header, row = read_sheets(path)["Sheet1"]
+    last = row[header.index("正文(续2)")]
+    assert len(last) <= CELL_LIMIT
+    assert last.endswith(f"…[全文 {len(body)} 字，见 out_长文本/Sheet1_正文_2.txt]")
+    with open(tmp_path / "out_长文本" / "Sheet1_正文_2.txt", encoding="utf-8", newline="") as f:
+        assert f.read() == body
+
+
+def test_illegal_characters_are_stripped(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    export_excel(path, {"Sheet1": COLUMNS}, [("Sheet1", {"标题": "a\x01b\x1fc", "正文": None, "链接": float("nan")})])
+    assert read_sheets(path)["Sheet1"][1][:3] == ["abc", "", ""]
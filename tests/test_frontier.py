@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.frontier import Frontier
+from taxcrawl.store import PolicyStore
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    path = str(tmp_path / "t.sqlite3")
+    with PolicyStore(path) as store:
+        Frontier(store, "shandong", {"column": 1}).checkpoint(300, [("标题甲", "https://a"), ("标题乙", "https://b")])
+    with PolicyStore(path) as store:
+        frontier = Frontier(store, "shandong", {"column": 1})
+        assert frontier.cursor == 300
+        assert frontier.pending == [("标题甲", "https://a"), ("标题乙", "https://b")]
+
+
+def test_changed_fingerprint_discards_old_cursor(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        Frontier(store, "shandong", {"perpage": 100}).checkpoint(300, [("标题", "https://a")])
+        frontier = Frontier(store, "shandong", {"perpage": 50})
+        assert (frontier.cursor, frontier.pending) == (None, [])
+
+
+def test_clear_starts_over(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        frontier = Frontier(store, "shandong")
+        frontier.checkpoint(300)
+        frontier.clear()
+        assert Frontier(store, "shandong").cursor is None
+
+
+def test_shandong_keeps_failed_details_pending(tmp_path, monkeypatch):
+    from taxcrawl.sites import load_site
+
+    shandong = load_site("shandong")
+    record = '<record><![CDATA[<a href="/art/{0}.html">第{0}篇文件标题</a>]]></record>'
+
+    class Page:
+        html = ""
+
+        def get(self, url, **kwargs):
+            # 第 1 个窗口两篇，之后一直被拦截 -> 主循环停下，留下检查点
+            self.html = record.format(1) + record.format(2) if "startrecord=1&" in url else ""
+
+        def new_tab(self):
+            return self
+
+        def close(self):
+            pass
+
+    vault = type("Vault", (), {"capture": lambda self, page, host: None})()
+    monkeypatch.setattr(shandong, "open_browser", lambda headless: (Page(), vault))
+    monkeypatch.setattr(shandong, "init_or_check_excel", lambda path: None)
+    monkeypatch.setattr(shandong, "export_to_excel", lambda store, path: None)
+    monkeypatch.setattr(shandong.time, "sleep", lambda s: None)
+    monkeypatch.setattr(shandong, "extract_detail", lambda tab, url: {"标题": "", "链接": url} if "/1." in url else None)
+
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        shandong.main(str(tmp_path / "out.xlsx"), store=store, tabs=1)
+        frontier = Frontier(store, "shandong", {"columnid": shandong.COLUMN_ID, "batch": shandong.BATCH_SIZE})
+        assert frontier.cursor == 1 + shandong.BATCH_SIZE
+        assert frontier.pending == [("第2篇文件标题", shandong.BASE_URL + "/art/2.html")]
+        assert store.keys("shandong") == {shandong.doc_key(shandong.BASE_URL + "/art/1.html")}
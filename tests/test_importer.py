@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.export import CELL_LIMIT, export_excel
+from taxcrawl.importer import import_workbook
+from taxcrawl.store import PolicyStore, to_row
+
+COLUMNS = ["标题", "发文机构", "发文字号", "发文日期", "有效性", "是否涉税法律", "正文内容", "链接"]
+
+
+def _body(n):
+    text = "".join(f"第{i}条 纳税人应当依法申报。\n" for i in range(n // 10 + 1))
+    return text[:n]
+
+
+def test_long_bodies_survive_export_and_import(tmp_path):
+    bodies = {
+        "shandong:https://example.com/1": _body(100),
+        "shandong:https://example.com/2": _body(70000),  # 拆到 正文内容(续1)(续2)
+        "shandong:https://example.com/3": _body(CELL_LIMIT * 3 + 5000),  # 放不下，整篇另存 txt
+    }
+    path = str(tmp_path / "山东.xlsx")
+    with PolicyStore(str(tmp_path / "src.sqlite3")) as src:
+        for key, body in bodies.items():
+            src.save("shandong", key, {"标题": key[-1], "有效性": "全文有效", "正文内容": body,
+                                       "链接": key[len("shandong:"):]})
+        rows = (("Sheet1", to_row(d, COLUMNS)) for d in src.iter_documents("shandong"))
+        export_excel(path, {"Sheet1": COLUMNS}, rows)
+
+    with PolicyStore(str(tmp_path / "dst.sqlite3")) as dst:
+        assert import_workbook(path, dst) == {"shandong": 3}
+        for key, body in bodies.items():
+            doc = dst.get(key)
+            assert len(doc["body"]) == len(body)
+            assert doc["body"] == body
+            assert "续" not in doc["extra"]
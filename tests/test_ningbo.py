@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+from taxcrawl.sites import load_site
+
+ningbo = load_site("ningbo")
+
+
+def packet(url, method="GET", post=None):
+    return SimpleNamespace(url=url, method=method, request=SimpleNamespace(postData=post))
+
+
+def test_query_page_parameter():
+    source = ningbo.source_from_packet(packet("https://example.com/api/list?col=12&pageNo=2&size=15"))
+    assert (source.where, source.key, source.offset) == ("query", "pageNo", 0)
+    req = source.request(7)
+    assert req["url"] == "https://example.com/api/list"
+    assert req["params"] == {"col": "12", "pageNo": "7", "size": "15"}
+
+
+def test_zero_based_json_page_index():
+    source = ningbo.source_from_packet(
+        packet("https://example.com/api/search", "POST", {"columnId": 12, "pageIndex": 1, "pageSize": 15}))
+    assert (source.where, source.key, source.offset, source.json_body) == ("json", "pageIndex", -1, True)
+    assert source.request(1)["json"] == {"columnId": 12, "pageIndex": 0, "pageSize": 15}
+
+
+def test_form_page_parameter_wins_over_other_numbers():
+    source = ningbo.source_from_packet(packet("https://example.com/list.do", "POST", "typeId=2&curPage=2&rows=20"))
+    assert (source.where, source.key) == ("form", "curPage")
+    assert source.request(5)["data"] == {"typeId": "2", "curPage": "5", "rows": "20"}
+
+
+def test_static_path_pages():
+    source = ningbo.source_from_packet(packet("https://example.com/col/col123/index_1.html"))
+    assert (source.where, source.offset) == ("path", -1)
+    assert source.request(3)["url"] == "https://example.com/col/col123/index_2.html"
+
+
+def test_static_source_first_page_is_target_url():
+    source = ningbo.ListSource("GET", ningbo.TARGET_URL, offset=-1)
+    assert source.request(1)["url"] == ningbo.TARGET_URL
+    assert source.request(2)["url"].endswith("/index_1.html")
+
+
+def test_unrecognized_packet():
+    assert ningbo.source_from_packet(packet("https://example.com/api/list?col=12")) is None
+
+
+def test_extract_links_from_json_and_html():
+    body = {"data": {"list": [{"title": "关于调整某项政策的通知", "url": "/art/2023/1/5/art_1_1.html"},
+                              {"title": "栏目", "url": "/col/index.html"}]}}
+    assert ningbo.extract_links(body, "https://example.com/") == [
+        {"title": "关于调整某项政策的通知", "url": "https://example.com/art/2023/1/5/art_1_1.html"}]
+    html = '<ul><li><a href="/art/2023/2/1/art_1_2.html" title="关于某项税收政策的公告">x</a></li></ul>'
+    assert ningbo.extract_links(html, "https://example.com/")[0]["url"].endswith("art_1_2.html")
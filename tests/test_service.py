@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from urllib.parse import quote
+
+import pytest
+
+from taxcrawl import service
+from taxcrawl.store import PolicyStore
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "t.sqlite3")
+    with PolicyStore(path) as store:
+        store.save("beijing", "beijing:1", {"标题": "联合公告", "发文单位": "国家税务总局 最高人民法院",
+                                            "文号": "国家税务总局 最高人民法院公告2023年第1号", "发布日期": "2023-05-01"})
+        store.save("beijing", "beijing:2", {"标题": "通知", "发文单位": "国家税务总局", "发布日期": "2023-06-01"})
+        store.save("shanghai", "shanghai:https://example.com/zcfw/", {"标题": "目录页", "链接": "https://example.com/zcfw/"})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), service.Handler)
+    httpd.pool = service.ReaderPool(path)
+    httpd.cache = service.ResponseCache()
+    httpd.verbose = False
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.pool.close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_prefix_filters_keep_inner_spaces(server):
+    status, body = get(f"{server}/documents?publisher={quote('国家税务总局 最高人民法院')}")
+    assert status == 200
+    assert [d["doc_key"] for d in body["items"]] == ["beijing:1"]
+    status, body = get(f"{server}/documents?publisher={quote('国家税务总局')}")
+    assert [d["doc_key"] for d in body["items"]] == ["beijing:2", "beijing:1"]
+    status, body = get(f"{server}/documents?doc_no={quote(' 国家税务总局 最高人民法院公告 ')}")
+    assert [d["doc_key"] for d in body["items"]] == ["beijing:1"]
+
+
+def test_unexpected_error_returns_json_500(server, monkeypatch):
+    def broken(store):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "stats", broken)
+    status, body = get(f"{server}/stats")
+    assert status == 500
+    assert "boom" in body["error"]
+    assert get(f"{server}/documents")[0] == 200  # 连接池里的连接照常归还
+
+
+def test_document_key_keeps_trailing_slash(server):
+    status, body = get(f"{server}/documents/{quote('shanghai:https://example.com/zcfw/', safe='')}")
+    assert status == 200
+    assert body["title"] == "目录页"
+    assert get(f"{server}/documents/")[0] == 200  # 集合接口末尾的 "/" 照样忽略
+    status, body = get(f"{server}/stats/")
+    assert body["total"] == 3
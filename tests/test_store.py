@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.store import PolicyStore
+
+
+def test_history_keeps_each_versions_update_time_and_status(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        record = {"标题": "关于某事的通知", "有效性": "全文有效", "更新时间": "2023-01-01", "正文": "第一版"}
+        assert store.save("beijing", "beijing:1", record) == "new"
+        record.update({"有效性": "部分有效", "更新时间": "2023-06-01", "正文": "第二版"})
+        assert store.save("beijing", "beijing:1", record) == "changed"
+        record.update({"有效性": "全文废止", "更新时间": "2024-03-01"})
+        assert store.save("beijing", "beijing:1", record) == "changed"
+
+        history = store.history("beijing:1")
+
+    assert [v["version"] for v in history] == [3, 2, 1]
+    assert [v["update_time"] for v in history] == ["2024-03-01", "2023-06-01", "2023-01-01"]
+    assert [v["status"] for v in history] == ["全文废止", "部分有效", "全文有效"]
+    assert [v["body"] for v in history] == ["第二版", "第二版", "第一版"]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.store import PolicyStore
+from taxcrawl.sweep import apply_status, report
+
+
+def test_apply_status_records_only_real_changes(tmp_path):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        store.save("beijing", "beijing:1", {"标题": "某通知", "链接": "https://a", "有效性": "全文有效", "正文": "正文"})
+        known = store.statuses("beijing")
+
+        assert apply_status(store, "beijing:1", "全文有效", known) is None  # 没变
+        assert apply_status(store, "beijing:1", "", known) is None  # 列表里没给
+        assert apply_status(store, "beijing:404", "全文废止", known) is None  # 库里没有
+
+        change = apply_status(store, "beijing:1", "全文废止", known)
+        assert (change.old, change.new, change.title, change.newly_dead) == ("全文有效", "全文废止", "某通知", True)
+        assert known["beijing:1"] == "全文废止"
+        doc = store.get("beijing:1")
+        assert (doc["status"], doc["version"], doc["body"]) == ("全文废止", 2, "正文")
+
+        assert apply_status(store, "beijing:1", "全文失效", known).newly_dead is False  # 本来就已废止
+
+
+def test_report_lists_newly_dead_first_and_writes_csv(tmp_path, capsys):
+    with PolicyStore(str(tmp_path / "t.sqlite3")) as store:
+        for key, status in (("beijing:1", "全文有效"), ("beijing:2", "全文有效")):
+            store.save("beijing", key, {"标题": key, "链接": key, "有效性": status})
+        known = store.statuses("beijing")
+        changes = [apply_status(store, "beijing:1", "部分有效", known),
+                   apply_status(store, "beijing:2", "全文失效", known)]
+    path = tmp_path / "变更.csv"
+    dead = report(changes, str(path))
+    assert [c.doc_key for c in dead] == ["beijing:2"]
+    lines = path.read_text(encoding="utf-8-sig").splitlines()
+    assert lines[1:] == ["beijing:1,beijing:1,beijing:1,全文有效,部分有效,", "beijing:2,beijing:2,beijing:2,全文有效,全文失效,是"]
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from taxcrawl.taskqueue import TaskQueue
+
+
+def test_expired_lease_stops_after_max_attempts(tmp_path):
+    # lease_seconds=-1：每次领到的租约立刻过期，模拟一领就崩的 worker
+    with TaskQueue(str(tmp_path / "q.sqlite3"), lease_seconds=-1, max_attempts=3) as queue:
+        queue.add([("北京", "政策法规", 1)])
+        claimed = 0
+        while queue.claim("w") is not None:
+            claimed += 1
+            assert claimed <= 3
+        assert queue.claim("w") is None
+        assert queue.stats() == {"failed": 1}
+        assert not queue.has_open()
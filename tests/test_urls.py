@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from taxcrawl.sites import load_site
+from taxcrawl.urls import article_id, canonical_url, dedup_key
+
+shanghai = load_site("shanghai")
+
+
+@pytest.mark.parametrize("url, base, expected", [
+    ("HTTP://Shanghai.ChinaTax.gov.cn:80/zcfw/a.html#top", None, "https://shanghai.chinatax.gov.cn/zcfw/a.html"),
+    ("https://example.com:8443/a//b/./c/../d.html", None, "https://example.com:8443/a/b/d.html"),
+    ("https://example.com/zcfw/index.html", None, "https://example.com/zcfw/"),
+    ("https://example.com/zcfw/", None, "https://example.com/zcfw/"),
+    ("https://example.com/s?b=2&a=1", None, "https://example.com/s?a=1&b=2"),
+    ("../zcfg/t20230105_12345.html", "https://example.com/zcfw/zzs/index.html",
+     "https://example.com/zcfw/zcfg/t20230105_12345.html"),
+    ("javascript:void(0)", None, "javascript:void(0)"),
+    ("", None, ""),
+])
+def test_canonical_url(url, base, expected):
+    assert canonical_url(url, base) == expected
+
+
+def test_dedup_key_prefers_article_id_across_column_folders():
+    a = dedup_key("https://example.com/zcfw/zzs/202301/t20230105_12345.html")
+    b = dedup_key("http://EXAMPLE.com/zcfw/qysds/202301/T20230105_12345.html#x")
+    assert a == b == "example.com#t20230105_12345"
+    assert dedup_key("https://other.com/zzs/t20230105_12345.html") != a
+
+
+def test_dedup_key_without_article_id_is_canonical_url():
+    assert article_id("https://example.com/news/detail.html?id=1") == ""
+    assert dedup_key("https://example.com/news/detail.html?id=1#x") == "https://example.com/news/detail.html?id=1"
+
+
+def test_shanghai_fetches_the_joined_url_and_dedups_on_the_canonical_one():
+    base = "http://shanghai.chinatax.gov.cn/zcfw/zcfgk/"
+    link = shanghai.norm_link(" ../a/index.html#p ", base)
+    assert link == "http://shanghai.chinatax.gov.cn/zcfw/a/index.html#p"
+    fresh = shanghai.take_new([{"链接": link}, {"链接": "https://shanghai.chinatax.gov.cn/zcfw/a/"}], set())
+    assert fresh == [{"链接": link}]
+    assert shanghai.doc_key(link) == "shanghai:https://shanghai.chinatax.gov.cn/zcfw/a/"